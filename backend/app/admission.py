@@ -0,0 +1,291 @@
+import asyncio
+import functools
+import math
+import threading
+import time as _time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Tuple
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+
+# wait/service хугацааны статистикт хадгалах сүүлийн хүсэлтийн тоо
+STATS_WINDOW = 1000
+# сүүлийн seq-ийг нь санах session-ий тоо (хуучин нь LRU-аар гарна)
+MAX_SESSIONS = 10000
+
+
+def _never() -> bool:
+    return False
+
+
+class AdmissionRejected(Exception):
+    """Дүүрсэн үед (эсвэл дараалалд хэт удсан) -> 503 + Retry-After."""
+
+    def __init__(self, gate: str, retry_after: int, reason: str):
+        super().__init__(f"{gate}: {reason}")
+        self.gate = gate
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Superseded(Exception):
+    """Тухайн session-ий шинэ хүсэлт ирсэн тул энэ ажлыг орхисон (queued/running)."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"superseded while {stage}")
+        self.stage = stage
+
+
+class SessionTracker:
+    """
+    Client session бүрийн хамгийн сүүлийн sequence дугаар. ``begin`` returns
+    a ``cancelled()`` check that turns true once a newer request of the same
+    session has arrived; requests without a session are never superseded.
+    Checked from worker threads between model steps, hence the lock.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.dropped = 0
+        self.aborted = 0
+        self._latest: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, session: str | None, seq: int | None) -> Callable[[], bool]:
+        if not session:
+            return _never
+        with self._lock:
+            latest = self._latest.get(session)
+            if seq is None:
+                # client дугаарлаагүй бол ирсэн дарааллаар
+                seq = 1 if latest is None else latest + 1
+            if latest is None or seq > latest:
+                self._latest[session] = seq
+            self._latest.move_to_end(session)
+            while len(self._latest) > self.max_sessions:
+                self._latest.popitem(last=False)
+
+        def cancelled() -> bool:
+            return self._latest.get(session, seq) > seq
+
+        return cancelled
+
+    def count(self, exc: Superseded) -> None:
+        if exc.stage == "queued":
+            self.dropped += 1
+        else:
+            self.aborted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sessions": len(self._latest), "dropped": self.dropped, "aborted": self.aborted}
+
+
+class AdmissionController:
+    """
+    Нэг төрлийн ажлын (симуляци, LLM) зэрэг гүйцэтгэлийн хязгаар ба
+    хязгаартай хүлээх дараалал. Requests beyond ``limit`` wait in FIFO order;
+    when ``queue_size`` are already waiting, or one waits longer than
+    ``timeout`` seconds, it is rejected right away instead of piling up in
+    the threadpool. State is only touched from the event loop, so no lock.
+    ``limit <= 0`` turns the gate off.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = int(limit)
+        self.queue_size = max(int(queue_size), 0)
+        self.timeout = float(timeout)
+        self.active = 0
+        # (future, cancelled) хос; cancelled() болсон хүлээгчийг prune() хасна
+        self._waiters: Deque[Tuple[asyncio.Future, Callable[[], bool]]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_waiting = 0
+        self._waits: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._service: Deque[float] = deque(maxlen=STATS_WINDOW)
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead, served ``limit`` at a time."""
+        service = float(np.mean(self._service)) if self._service else 1.0
+        rounds = (self.waiting + 1) / max(self.limit, 1)
+        return int(min(max(math.ceil(service * rounds), 1), 120))
+
+    async def acquire(self, cancelled: Callable[[], bool] = _never) -> None:
+        if cancelled():
+            raise Superseded("queued")
+        if not self.enabled:
+            return
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after(), "too many requests in queue")
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (fut, cancelled)
+        self._waiters.append(entry)
+        self.max_waiting = max(self.max_waiting, len(self._waiters))
+        t0 = _time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.timeout if self.timeout > 0 else None)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                # the slot was handed over just as we gave up
+                self.release()
+            else:
+                fut.cancel()
+                try:
+                    self._waiters.remove(entry)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise AdmissionRejected(self.name, self.retry_after(), "queue wait timed out") from None
+            raise
+        # release() handed its slot straight to us, so active is unchanged
+        self._admit(_time.perf_counter() - t0)
+
+    def release(self) -> None:
+        if not self.enabled:
+            return
+        while self._waiters:
+            fut, _ = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active = max(self.active - 1, 0)
+
+    def prune(self) -> None:
+        """Шинэ хүсэлтээр орлогдсон хүлээгчдийг дарааллаас хасна (slot авалгүй 409)."""
+        for entry in [w for w in self._waiters if w[1]()]:
+            self._waiters.remove(entry)
+            if not entry[0].done():
+                entry[0].set_exception(Superseded("queued"))
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self._waits.append(waited)
+
+    def record_service(self, seconds: float) -> None:
+        self._service.append(seconds)
+
+    @asynccontextmanager
+    async def slot(self, cancelled: Callable[[], bool] = _never):
+        await self.acquire(cancelled)
+        t0 = _time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_service(_time.perf_counter() - t0)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = np.array(self._waits, dtype=float) * 1000.0
+        service = np.array(self._service, dtype=float) * 1000.0
+
+        def summary(ms: np.ndarray) -> Dict[str, float]:
+            if not ms.size:
+                return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+            p50, p95 = np.percentile(ms, [50, 95])
+            return {"mean": float(ms.mean()), "p50": float(p50), "p95": float(p95), "max": float(ms.max())}
+
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms": summary(waits),
+            "service_ms": summary(service),
+        }
+
+
+def admitted(gate: AdmissionController) -> Callable:
+    """
+    Sync endpoint-ийг async болгож, ``gate``-ийн slot авсны дараа
+    threadpool-д ажиллуулна. functools.wraps keeps the signature FastAPI
+    reads for request parsing.
+    """
+
+    def wrap(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            async with gate.slot():
+                return await run_in_threadpool(func, *args, **kwargs)
+
+        return endpoint
+
+    return wrap
+
+
+class SingleFlight:
+    """
+    Ижил түлхүүртэй зэрэг хүсэлтүүдийг нэг тооцоонд нэгтгэнэ. The first
+    caller starts the work as a task; later callers with the same key await
+    that task instead of running their own, and all get its result (or its
+    exception). The task is shielded, so one client disconnecting does not
+    cancel the run for the others. ``func`` gets a ``cancelled()`` check that
+    is true only once every caller sharing the run has been superseded.
+    Loop-only state, like AdmissionController.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.coalesced = 0
+        self.max_fanout = 0
+        self._calls: Dict[Hashable, Tuple[asyncio.Task, List[Callable[[], bool]]]] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[Callable[[], bool]], Awaitable[Any]],
+        cancelled: Callable[[], bool] = _never,
+    ) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            task, checks = call
+            checks.append(cancelled)
+            self.coalesced += 1
+            self.max_fanout = max(self.max_fanout, len(checks))
+        else:
+            checks = [cancelled]
+            task = asyncio.ensure_future(func(lambda: all(c() for c in list(checks))))
+            self._calls[key] = (task, checks)
+            self.runs += 1
+            task.add_done_callback(functools.partial(self._done, key))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # every awaiting client may have gone away; do not log "never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "max_fanout": self.max_fanout,
+        }
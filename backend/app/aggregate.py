@@ -0,0 +1,135 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .columns import ColumnIndex
+
+
+# хонин толгойд шилжүүлэх коэффициент (model-ийн nvs__24, "... хонин толгойд шилжүүлснээр")
+SHEEP_UNITS: Dict[str, float] = {"Адуу": 7.0, "Үхэр": 6.0, "Тэмээ": 5.0, "Хонь": 1.0, "Ямаа": 0.9}
+LIVESTOCK_DIM = "Бэлчээрийн малын төрөл"
+
+
+class AggregatePlan:
+    """
+    AggregateSpec-үүдийг нэг баганын бүтцэд (ColumnIndex) хөрвүүлнэ.
+
+    Every sum/mean aggregate is a weighted sum of columns, so all of them
+    (any output, any group-by) are columns of one coefficient matrix and
+    ``apply`` evaluates them with a single matmul over the columns they
+    read; dozens of aggregates cost about one. ``max`` specs are a masked
+    max over the gathered [time, group, rest] block. ``columns`` are the
+    model columns the plan reads, in model order; ``apply`` takes exactly
+    those as a [time, column] block.
+    """
+
+    def __init__(self, specs: Sequence[Any], index: ColumnIndex, variable_map: Dict[str, str], dims_by_output: Dict[str, List[Dict[str, Any]]]):
+        self.dims: Dict[str, List[Dict[str, Any]]] = {}
+        # spec бүр: (name, reducer, group shape, positions [group, cell], weights [group, cell])
+        cells: List[Tuple[str, str, Tuple[int, ...], np.ndarray, np.ndarray]] = []
+        for spec in specs:
+            if spec.name in self.dims:
+                raise ValueError(f"Duplicate aggregate name: {spec.name}")
+            if spec.output not in dims_by_output:
+                raise ValueError(f"Unknown output: {spec.output} (one of {', '.join(dims_by_output)})")
+            dims = dims_by_output[spec.output]
+            names = [d["name"] for d in dims]
+            for name in list(spec.group_by) + list(spec.select) + list(_weight_dims(spec.weights)):
+                if name not in names:
+                    raise ValueError(f"{spec.name}: {spec.output} has no dimension {name!r}")
+            if len(set(spec.group_by)) != len(spec.group_by):
+                raise ValueError(f"{spec.name}: repeated group_by dimension")
+
+            # сонгосон утгууд ба жин тэнхлэг бүрээр
+            picks, weights = [], []
+            for d in dims:
+                lookup = {v: i for i, v in enumerate(d["values"])}
+                chosen = spec.select.get(d["name"]) or d["values"]
+                missing = [v for v in chosen if v not in lookup]
+                if missing:
+                    raise ValueError(f"{spec.name}: unknown {d['name']} value(s): {', '.join(missing)}")
+                picks.append([lookup[v] for v in chosen])
+                table = _weight_table(spec.weights, d["name"])
+                if set(table) - set(lookup):
+                    raise ValueError(f"{spec.name}: unknown {d['name']} weight value(s): {', '.join(sorted(set(table) - set(lookup)))}")
+                weights.append(np.array([float(table.get(v, 1.0)) for v in chosen]))
+            vensim_var = variable_map.get(spec.output, spec.output)
+            if dims:
+                positions = index.cube_positions(vensim_var, [d["values"] for d in dims])[np.ix_(*picks)]
+                w = np.ones(positions.shape)
+                for axis, vec in enumerate(weights):
+                    shape = [1] * len(weights)
+                    shape[axis] = len(vec)
+                    w = w * vec.reshape(shape)
+            else:
+                found = index.output_positions(spec.output, {}, False)
+                positions = np.array(found[0] if found else -1, dtype=np.intp)
+                w = np.ones(())
+
+            group_axes = [names.index(g) for g in spec.group_by]
+            order = group_axes + [a for a in range(len(names)) if a not in group_axes]
+            positions, w = positions.transpose(order), w.transpose(order)
+            gshape = positions.shape[:len(group_axes)]
+            positions = positions.reshape(int(np.prod(gshape, dtype=int)), -1)
+            w = np.where(positions >= 0, w.reshape(positions.shape), 0.0)
+            self.dims[spec.name] = [
+                {"name": g, "values": [dims[names.index(g)]["values"][i] for i in picks[names.index(g)]]}
+                for g in spec.group_by
+            ]
+            cells.append((spec.name, spec.reducer, gshape, positions, w))
+
+        used = np.unique(np.concatenate([p[p >= 0] for *_, p, _ in cells])) if cells else np.empty(0, dtype=np.intp)
+        self.positions = used
+        self.columns: List[str] = [index.columns[p] for p in used]
+
+        # sum/mean: нэг coefficient матриц [column, aggregate cell]
+        linear = [c for c in cells if c[1] != "max"]
+        self._matrix = np.zeros((len(used), sum(c[3].shape[0] for c in linear)))
+        self._linear: List[Tuple[str, Tuple[int, ...], slice]] = []
+        start = 0
+        for name, reducer, gshape, positions, w in linear:
+            n = positions.shape[0]
+            if reducer == "mean":
+                count = (positions >= 0).sum(axis=1, keepdims=True)
+                w = np.divide(w, count, out=np.full(w.shape, np.nan), where=count > 0)
+            valid = positions >= 0
+            rows = np.searchsorted(used, positions[valid])
+            cols = start + np.nonzero(valid)[0]
+            np.add.at(self._matrix, (rows, cols), w[valid])
+            self._linear.append((name, gshape, slice(start, start + n)))
+            start += n
+
+        # max: [group, cell] -> багана дахь байрлал, сонгоогүй/байхгүй нүд -inf
+        self._max: List[Tuple[str, Tuple[int, ...], np.ndarray, np.ndarray, np.ndarray]] = []
+        for name, reducer, gshape, positions, w in cells:
+            if reducer == "max":
+                local = np.searchsorted(used, np.where(positions >= 0, positions, used[0] if len(used) else 0))
+                self._max.append((name, gshape, local, w, positions >= 0))
+
+    def apply(self, block: np.ndarray) -> Dict[str, np.ndarray]:
+        """``block``: [time, self.columns] -> aggregate бүр [time, *group_by]."""
+        out: Dict[str, np.ndarray] = {}
+        if self._linear:
+            # нэг matmul бүх sum/mean aggregate-д
+            flat = block @ self._matrix
+            for name, gshape, cols in self._linear:
+                out[name] = flat[:, cols].reshape((block.shape[0],) + gshape)
+        for name, gshape, local, w, valid in self._max:
+            if not block.shape[1]:
+                values = np.full((block.shape[0],) + local.shape, -np.inf)
+            else:
+                values = np.where(valid, block[:, local] * w, -np.inf)
+            out[name] = values.max(axis=-1).reshape((block.shape[0],) + gshape)
+        return out
+
+
+def _weight_dims(weights: Any) -> List[str]:
+    if weights == "sheep_units":
+        return [LIVESTOCK_DIM]
+    return list(weights or {})
+
+
+def _weight_table(weights: Any, dim: str) -> Dict[str, float]:
+    if weights == "sheep_units":
+        return SHEEP_UNITS if dim == LIVESTOCK_DIM else {}
+    return (weights or {}).get(dim, {})
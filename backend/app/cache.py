@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Sequence, Tuple
+
+import pandas as pd
+
+
+def canonical_params(params: Dict[str, float], sliders: Iterable[Any]) -> Dict[str, float]:
+    """
+    Slider-ийн min/max/step-д тааруулж параметрийг хязгаарлаж, бүхэлчилнэ.
+    Unknown keys are kept as plain floats.
+    """
+    defs = {s.key: s for s in sliders}
+    out: Dict[str, float] = {}
+    for key, value in params.items():
+        v = float(value)
+        d = defs.get(key)
+        if d is not None:
+            v = min(max(v, float(d.min)), float(d.max))
+            if d.step and d.step > 0:
+                v = float(d.min) + round((v - float(d.min)) / float(d.step)) * float(d.step)
+                v = min(v, float(d.max))
+            # strip float noise so 0.1 + 0.2 and 0.3 give the same key
+            v = round(v, 10)
+        out[key] = v
+    return out
+
+
+def params_key(model_hash: str, params: Dict[str, float]) -> Tuple[Hashable, ...]:
+    return (model_hash,) + tuple(sorted(params.items()))
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class ResultCache:
+    """LRU cache of full simulation frames, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._items: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Any:
+        return self.get_first([key])[1]
+
+    def get_first(self, keys: Sequence[Hashable]) -> Tuple[Hashable | None, Any]:
+        """
+        (key, value) of the first cached key, else (None, None). One lookup
+        for the hit/miss counters however many fallback keys are probed.
+        """
+        with self._lock:
+            for key in keys:
+                item = self._items.get(key)
+                if item is not None:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return key, item[0]
+            self.misses += 1
+            return None, None
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        if not self.enabled or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._items and (len(self._items) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, size) = self._items.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+
+# ColumnIndex-ийн memo-гийн дээд тоо: түлхүүр нь client-ийн сонголт тул LRU-аар хязгаарлана
+MAX_MEMO_ENTRIES = 4096
+_MISSING = object()
+
+
+class ColumnIndex:
+    """
+    Нэг баганын бүтцэд (PySD-ийн гаралтын баганууд) зориулсан индекс:
+    (vensim_var, subscript сонголт) -> баганын байрлал.
+
+    Selection follows the original ``_extract_series`` rules: exact column,
+    else the ``Var[...]`` column matching most selected values (ties go to
+    the largest name), else the first one by name, else the demo ``out_key``
+    column. Lookups are memoized (LRU, MAX_MEMO_ENTRIES), so each
+    selection is scored once.
+    """
+
+    def __init__(self, columns: Sequence[Any], variable_map: Dict[str, str]):
+        self.columns: List[str] = [str(c) for c in columns]
+        self.variable_map = dict(variable_map)
+        self._position: Dict[str, int] = {c: i for i, c in enumerate(self.columns)}
+        # var -> [(column name, bracket parts, position)] in model order
+        self._subscripted: Dict[str, List[Tuple[str, Tuple[str, ...], int]]] = {}
+        for i, c in enumerate(self.columns):
+            if "[" not in c:
+                continue
+            var, inside = c.split("[", 1)
+            parts = tuple(p.strip() for p in inside.rstrip("]").split(","))
+            self._subscripted.setdefault(var, []).append((c, parts, i))
+        self._memo: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def _recall(self, key: Hashable) -> Any:
+        with self._memo_lock:
+            hit = self._memo.get(key, _MISSING)
+            if hit is not _MISSING:
+                self._memo.move_to_end(key)
+            return hit
+
+    def _remember(self, key: Hashable, value: Any) -> Any:
+        with self._memo_lock:
+            self._memo[key] = value
+            self._memo.move_to_end(key)
+            while len(self._memo) > MAX_MEMO_ENTRIES:
+                self._memo.popitem(last=False)
+        return value
+
+    def matches(self, columns: Sequence[Any]) -> bool:
+        if len(columns) != len(self.columns):
+            return False
+        return all(str(a) == b for a, b in zip(columns, self.columns))
+
+    def var_positions(self, vensim_var: str) -> List[int]:
+        """Every column of ``vensim_var`` (one for a scalar), in model order."""
+        key = ("var", vensim_var)
+        hit = self._recall(key)
+        if hit is _MISSING:
+            if vensim_var in self._position:
+                hit = [self._position[vensim_var]]
+            else:
+                hit = [i for _, _, i in self._subscripted.get(vensim_var, [])]
+            self._remember(key, hit)
+        return hit
+
+    def select(self, out_key: str, vensim_var: str, subsel: Dict[str, str] | None) -> int | None:
+        key = ("sel", out_key, vensim_var, tuple(sorted((subsel or {}).items())))
+        hit = self._recall(key)
+        if hit is not _MISSING:
+            return hit
+        return self._remember(key, self._select(out_key, vensim_var, subsel or {}))
+
+    def _select(self, out_key: str, vensim_var: str, subsel: Dict[str, str]) -> int | None:
+        if vensim_var in self._position:
+            return self._position[vensim_var]
+        candidates = self._subscripted.get(vensim_var)
+        if not candidates:
+            # demo key fallback (demo үед df дээр out_key нэртэй байж болно)
+            return self._position.get(out_key)
+        # deterministic: by column name
+        ordered = sorted(candidates, key=lambda c: c[0])
+        if not subsel:
+            return ordered[0][2]
+        wanted = [str(v) for v in subsel.values()]
+        best = max(ordered, key=lambda c: (sum(1 for v in wanted if v in c[1]), c[0]))
+        return best[2]
+
+    def cube_positions(self, vensim_var: str, coords: Sequence[Sequence[str]]) -> np.ndarray:
+        """
+        ``Var[a,b]`` баганын байрлалууд [len(coords[0]), len(coords[1]), ...]
+        массиваар (coords-ийн дарааллаар); байхгүй нүд -1.
+        """
+        key = ("cube", vensim_var, tuple(tuple(c) for c in coords))
+        hit = self._recall(key)
+        if hit is _MISSING:
+            lookup = [{str(v): i for i, v in enumerate(c)} for c in coords]
+            hit = np.full([len(c) for c in coords], -1, dtype=np.intp)
+            for _, parts, pos in self._subscripted.get(vensim_var, []):
+                if len(parts) == len(lookup) and all(p in m for p, m in zip(parts, lookup)):
+                    hit[tuple(m[p] for p, m in zip(parts, lookup))] = pos
+            self._remember(key, hit)
+        return hit
+
+    def output_positions(self, out_key: str, subsel: Dict[str, str] | None, total: bool) -> List[int]:
+        """Columns behind one output series: all of the variable for totals, else the selected one."""
+        vensim_var = self.variable_map.get(out_key, out_key)
+        if total:
+            return self.var_positions(vensim_var)
+        pos = self.select(out_key, vensim_var, subsel)
+        return [] if pos is None else [pos]
+
+    @staticmethod
+    def gather(values: np.ndarray, groups: List[List[int]]) -> List[np.ndarray | None]:
+        """
+        Нэг fancy-index-ээр бүх бүлгийн баганыг авч, бүлэг бүрийг мөрөөр нэгтгэнэ.
+        Returns one [time] vector per group (None for an empty group).
+        """
+        flat = [p for g in groups for p in g]
+        # row-major, so each row sum runs over contiguous values exactly like
+        # the former df[cols].sum(axis=1) (same rounding)
+        block = np.ascontiguousarray(values[:, flat]) if flat else np.empty((values.shape[0], 0))
+        out: List[np.ndarray | None] = []
+        start = 0
+        for g in groups:
+            if not g:
+                out.append(None)
+            elif len(g) == 1:
+                out.append(block[:, start])
+            else:
+                out.append(block[:, start:start + len(g)].sum(axis=1))
+            start += len(g)
+        return out
@@ -22,6 +22,43 @@ class Settings(BaseSettings):
 
     MODEL_PATH: str = "./models/dornodjinkencopy2.mdl"
     DEMO_MODE_AUTO: int = 1
+    # "pysd" = model.run(), "numpy" = app/kernel.py-ийн хурдан NumPy алхам
+    SIM_ENGINE: str = "pysd"
+    # 0 = симуляцийг API процесс дотор ажиллуулна; N > 0 = N worker процесс
+    SIM_WORKERS: int = 0
+    # worker бүрийг ийм олон run хийсний дараа шинээр эхлүүлнэ (0 = хязгааргүй)
+    SIM_WORKER_MAX_RUNS: int = 500
+    # /api/simulate үр дүнгийн LRU кэш (0 = идэвхгүй)
+    SIM_CACHE_ENTRIES: int = 256
+    SIM_CACHE_MAX_MB: float = 64.0
+    # 2014-2024 түүхэн хэсэгт нөлөөлөхгүй параметрийн run-ийг baseline-ийн stock-оос үргэлжлүүлнэ
+    SIM_REUSE_PREFIX: bool = True
+    # хүсэлтээр FINAL TIME-ийг сунгаж болох хамгийн хожуу он (final_time)
+    SIM_MAX_FINAL_TIME: float = 2100.0
+    # sensitivity зэрэг шинжилгээний нэг хүсэлтэд зөвшөөрөх симуляцийн дээд тоо
+    ANALYSIS_MAX_RUNS: int = 20000
+    # /api/sweep: үүнээс олон цэгтэй торыг JSON-д биш CACHE_DIR доорх .npy файлд бичнэ
+    SWEEP_INLINE_MAX_POINTS: int = 10000
+    # /api/simulate?mode=approx: slider бүрийн тэнхлэг дээрх exact run-ийн дээд тоо (0 = идэвхгүй);
+    # зөвхөн NumPy kernel эсвэл worker pool-той үед fit хийнэ
+    EMULATOR_AXIS_POINTS: int = 0
+    # олон slider хөдөлгөсөн, surrogate-ийг шалгах exact run-ийн тоо
+    EMULATOR_VALIDATION: int = 60
+    # output-ийн тооцоолсон харьцангуй RMS алдаа үүнээс их бол approx биш exact run
+    EMULATOR_MAX_ERROR: float = 0.05
+    # зэрэг ажиллах симуляцийн хүсэлтийн дээд тоо (0 = хязгааргүй), түүнээс цааш хүлээх дарааллын урт
+    SIM_MAX_CONCURRENT: int = 4
+    SIM_QUEUE_SIZE: int = 16
+    # AI (explain, chat_graph) хүсэлтийг тусад нь хязгаарлана: нэг дуудлага 60 с хүртэл үргэлжилдэг
+    LLM_MAX_CONCURRENT: int = 2
+    LLM_QUEUE_SIZE: int = 4
+    # дараалалд үүнээс удаан хүлээсэн хүсэлт 503 авна (секунд)
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    # /api/jobs: урт ажлыг зэрэг ажиллуулах thread-ийн тоо, дууссан job-ийг хадгалах хугацаа (цаг)
+    JOB_WORKERS: int = 1
+    JOB_TTL_HOURS: float = 24.0
+    # baseline snapshot зэрэг дискэн дээрх кэшийн хавтас
+    CACHE_DIR: str = "./.cache"
 
     # ===== OpenAI =====
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
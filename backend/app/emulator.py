@@ -0,0 +1,350 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time as _time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# validation цэгүүдийг сугалах seed (давтагдахуйц metrics)
+VALIDATION_SEED = 7919
+
+
+def axis_values(slider: Any, points: int) -> np.ndarray:
+    """Slider-ийн тэнхлэгийн цэгүүд: бүх step (points-оос цөөн бол), эсвэл жигд ``points`` цэг."""
+    n = int(np.floor((float(slider.max) - float(slider.min)) / float(slider.step) + 1e-9)) + 1
+    return np.linspace(float(slider.min), float(slider.max), max(2, min(n, points)))
+
+
+class AxisSurrogate:
+    """
+    Anchored (cut-HDMR) surrogate around the anchor run (every slider at
+    its SliderDef default).
+
+    Each slider has exact runs along its own axis with the others left
+    alone, so a single moved slider is a linear interpolation between two
+    of them (exact on the grid). Several moved sliders combine their ratios
+    to the baseline, which follows the model's multiplicative growth much
+    better than adding differences; where the baseline is 0 the differences
+    are added.
+    """
+
+    def __init__(self, y0: np.ndarray, axes: List[np.ndarray], ys: List[np.ndarray]):
+        self.y0 = y0
+        self.axes = axes
+        self.ys = ys
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._inv0 = np.where(y0 != 0, 1.0 / y0, 0.0)
+
+    def _bracket(self, i: int, v: float):
+        xs = self.axes[i]
+        j = int(np.clip(np.searchsorted(xs, v), 1, len(xs) - 1))
+        w = float(np.clip((v - xs[j - 1]) / (xs[j] - xs[j - 1]), 0.0, 1.0))
+        return j, w
+
+    def axis(self, i: int, v: float) -> np.ndarray:
+        j, w = self._bracket(i, v)
+        ys = self.ys[i]
+        return ys[j - 1] if w == 0.0 else ys[j] if w == 1.0 else ys[j - 1] * (1.0 - w) + ys[j] * w
+
+    def axis_error(self, i: int, v: float) -> np.ndarray:
+        # linear interpolation error ~ w (1 - w) / 2 * second difference; 0 on grid points
+        j, w = self._bracket(i, v)
+        ys = self.ys[i]
+        if w in (0.0, 1.0) or len(ys) < 3:
+            return np.zeros_like(self.y0)
+        k = min(max(j, 1), len(ys) - 2)
+        return 0.5 * w * (1.0 - w) * (ys[k + 1] - 2.0 * ys[k] + ys[k - 1])
+
+    def predict(self, moved: Dict[int, float]) -> np.ndarray:
+        """moved: axis -> slider value for the sliders set in the request."""
+        if not moved:
+            return self.y0.copy()
+        if len(moved) == 1:
+            return self.axis(*next(iter(moved.items())))
+        ratio = np.ones_like(self.y0)
+        delta = np.zeros_like(self.y0)
+        for i, v in moved.items():
+            yi = self.axis(i, v)
+            ratio *= yi * self._inv0
+            delta += yi - self.y0
+        return np.where(self.y0 != 0, self.y0 * ratio, self.y0 + delta)
+
+
+def fit_metrics(exact: np.ndarray, approx: np.ndarray) -> Dict[str, float]:
+    """exact/approx: any matching shape. Errors are also given relative to the exact RMS."""
+    err = approx - exact
+    rmse = float(np.sqrt(np.mean(err ** 2))) if err.size else 0.0
+    scale = float(np.sqrt(np.mean(exact ** 2))) if exact.size else 0.0
+    ss_tot = float(np.sum((exact - exact.mean()) ** 2)) if exact.size else 0.0
+    return {
+        "rmse": rmse,
+        "max_abs_error": float(np.max(np.abs(err))) if err.size else 0.0,
+        "relative_rmse": rmse / scale if scale > 0 else 0.0,
+        "r2": 1.0 - float(np.sum(err ** 2)) / ss_tot if ss_tot > 0 else 1.0,
+    }
+
+
+class EmulatorFit:
+    """Нэг model hash-д зориулсан surrogate, validation residual-ууд ба metrics."""
+
+    def __init__(
+        self,
+        model_hash: str,
+        keys: List[str],
+        anchor: Dict[str, float],
+        columns: List[str],
+        surrogate: AxisSurrogate,
+        residuals: np.ndarray,
+        residual_moved: np.ndarray,
+        metrics: Dict[str, Any],
+    ):
+        self.model_hash = model_hash
+        self.keys = keys
+        # slider бүрийн SliderDef default (canonical), surrogate-ийн тулгуур цэг
+        self.anchor = anchor
+        self.columns = columns
+        self.surrogate = surrogate
+        # validation: approx - exact [point, time, column] and how many sliders each point moved
+        self.residuals = residuals
+        self.residual_moved = residual_moved
+        self.metrics = metrics
+
+    def covers(self, params: Dict[str, float]) -> bool:
+        """
+        Surrogate-ийн хүрээнд эсэх: params sets every slider and nothing else.
+        A missing slider keeps the model's own (per soum) value, which no axis run
+        holds; a slider that cannot move must sit at its default.
+        """
+        if set(params) != set(self.anchor):
+            return False
+        fixed = set(self.anchor) - set(self.keys)
+        return all(abs(float(params[k]) - self.anchor[k]) <= 1e-9 for k in fixed)
+
+    def moved(self, params: Dict[str, float]) -> Dict[int, float]:
+        # sliders away from the anchor (covers(params) is assumed)
+        return {
+            i: float(params[k])
+            for i, k in enumerate(self.keys)
+            if k in params and abs(float(params[k]) - self.anchor[k]) > 1e-9
+        }
+
+    def predict(self, params: Dict[str, float]) -> np.ndarray:
+        """[time, column] for one (canonical) parameter set."""
+        return self.surrogate.predict(self.moved(params))
+
+    def error_samples(self, params: Dict[str, float]) -> np.ndarray:
+        """
+        [sample, time, column] residuals whose RMS is the error estimate:
+        the interpolation term for one moved slider, otherwise the validation
+        residuals of points that moved the same number of sliders.
+        """
+        moved = self.moved(params)
+        if len(moved) == 1:
+            return self.surrogate.axis_error(*next(iter(moved.items())))[None]
+        if not moved or not len(self.residual_moved):
+            return np.zeros((1,) + self.surrogate.y0.shape)
+        # nearest validated count of moved sliders
+        counts = np.unique(self.residual_moved)
+        m = counts[np.argmin(np.abs(counts - len(moved)))]
+        return self.residuals[self.residual_moved == m]
+
+
+class Emulator:
+    """
+    /api/simulate?mode=approx-ийн ойролцоолох загвар. SliderDef default-аас
+    slider бүрийн тэнхлэгээр exact run хийж (AxisSurrogate), олон slider
+    хөдөлгөсөн санамсаргүй цэгүүдээр шалгана. Fitting runs in a background
+    thread; the result is stored under CACHE_DIR keyed on the model hash and
+    the slider definitions, and is rebuilt when either changes.
+    """
+
+    def __init__(self, axis_points: int, validation: int, cache_dir: str):
+        self.axis_points = int(axis_points)
+        self.validation = int(validation)
+        self.cache_dir = cache_dir
+        self.fit: EmulatorFit | None = None
+        self.state = "disabled" if self.axis_points <= 0 else "idle"
+        self.error: str | None = None
+        self.fit_seconds: float | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.axis_points > 0
+
+    def ready(self, model_hash: str) -> EmulatorFit | None:
+        fit = self.fit
+        return fit if fit is not None and fit.model_hash == model_hash else None
+
+    def refresh(self, engine: Any) -> None:
+        """
+        Fit (or load) in the background unless a fit for this model is ready or running.
+        Only with the NumPy kernel or the worker pool: in-process PySD fitting
+        takes hundreds of runs under the model lock and slows live requests.
+        """
+        if not self.enabled or engine.demo_mode or not engine.model_hash or not engine.sliders:
+            return
+        if engine.kernel is None and engine.pool is None:
+            self.state = "disabled"
+            self.error = "needs the NumPy kernel (SIM_ENGINE=numpy) or the worker pool (SIM_WORKERS)"
+            return
+        with self._lock:
+            if self.ready(engine.model_hash) is not None:
+                return
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.state = "fitting"
+            self.error = None
+            self._thread = threading.Thread(target=self._build, args=(engine,), name="emulator-fit", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        fit = self.fit
+        return {
+            "state": self.state,
+            "error": self.error,
+            "model_hash": fit.model_hash if fit is not None else None,
+            "sliders": fit.keys if fit is not None else [],
+            "fit_seconds": self.fit_seconds,
+            "metrics": fit.metrics if fit is not None else None,
+        }
+
+    def _signature(self, engine: Any, columns: List[str]) -> str:
+        blob = json.dumps(
+            {
+                "sliders": [[s.key, float(s.min), float(s.max), float(s.step), float(s.default)] for s in engine.sliders],
+                "columns": columns,
+                "axis_points": self.axis_points,
+                "validation": self.validation,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, model_hash: str, signature: str) -> Path:
+        return Path(self.cache_dir).expanduser() / f"emulator-{model_hash[:16]}-{signature}.npz"
+
+    def _build(self, engine: Any) -> None:
+        t0 = _time.perf_counter()
+        try:
+            fit = self._load_or_fit(engine)
+            self.fit = fit
+            self.fit_seconds = _time.perf_counter() - t0
+            self.state = "ready"
+            logger.info(
+                "Emulator ready in %.1fs (%d axis runs, validation relative RMSE %s)",
+                self.fit_seconds,
+                fit.metrics.get("axis_runs", 0),
+                {k: round(m["relative_rmse"], 4) for k, m in fit.metrics.get("validation", {}).items()},
+            )
+        except Exception as e:
+            logger.exception("Emulator fit failed")
+            self.state = "failed"
+            self.error = str(e)
+
+    def _load_or_fit(self, engine: Any) -> EmulatorFit:
+        model_hash = engine.model_hash
+        # a slider with min == max cannot move
+        sliders = [s for s in engine.sliders if float(s.max) > float(s.min)]
+        keys = [s.key for s in sliders]
+        anchor = engine.canonical_params({s.key: float(s.default) for s in engine.sliders})
+        columns = engine.emulated_columns()
+        path = self._path(model_hash, self._signature(engine, columns))
+
+        if path.exists():
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    splits = np.cumsum(data["axis_sizes"])[:-1]
+                    surrogate = AxisSurrogate(
+                        data["y0"],
+                        np.split(data["axis_x"], splits),
+                        np.split(data["axis_y"], splits),
+                    )
+                    return EmulatorFit(
+                        model_hash, keys, anchor, columns, surrogate,
+                        data["residuals"], data["residual_moved"], json.loads(str(data["metrics"])),
+                    )
+            except Exception as e:
+                logger.warning("Emulator file %s is unreadable, refitting: %s", path.name, e)
+
+        y0 = engine.run_columns([anchor], columns)[0]
+        axes, ys = [], []
+        for s in sliders:
+            params_list = [engine.canonical_params({**anchor, s.key: float(v)}) for v in axis_values(s, self.axis_points)]
+            axes.append(np.array([p[s.key] for p in params_list]))
+            ys.append(engine.run_columns(params_list, columns))
+        surrogate = AxisSurrogate(y0, axes, ys)
+        fit = EmulatorFit(
+            model_hash, keys, anchor, columns, surrogate,
+            np.empty((0,) + y0.shape), np.empty(0, dtype=int), {},
+        )
+
+        # validation: random points that move 2..d sliders anywhere in their range
+        rng = np.random.default_rng(VALIDATION_SEED)
+        checks: List[Dict[str, float]] = []
+        for i in range(self.validation if len(keys) > 1 else 0):
+            p: Dict[str, float] = dict(anchor)
+            for j in rng.choice(len(keys), size=2 + i % (len(keys) - 1), replace=False):
+                p[keys[j]] = float(rng.uniform(sliders[j].min, sliders[j].max))
+            checks.append(engine.canonical_params(p))
+        if checks:
+            exact = engine.run_columns(checks, columns)
+            approx = np.stack([fit.predict(p) for p in checks])
+            fit.residuals = approx - exact
+            fit.residual_moved = np.array([len(fit.moved(p)) for p in checks], dtype=int)
+            fit.metrics["validation"] = self._by_output(engine, columns, exact, approx)
+            fit.metrics["validation_by_moved"] = {
+                str(m): {
+                    k: v["relative_rmse"]
+                    for k, v in self._by_output(
+                        engine, columns, exact[fit.residual_moved == m], approx[fit.residual_moved == m]
+                    ).items()
+                }
+                for m in np.unique(fit.residual_moved).tolist()
+            }
+        fit.metrics["axis_runs"] = int(sum(len(a) for a in axes)) + 1
+        fit.metrics["validation_points"] = len(checks)
+
+        self._save(path, surrogate, fit)
+        return fit
+
+    @staticmethod
+    def _by_output(engine: Any, columns: List[str], exact: np.ndarray, approx: np.ndarray) -> Dict[str, Dict[str, float]]:
+        # every column (soum x livestock type) of each output variable, all years
+        out: Dict[str, Dict[str, float]] = {}
+        for key, (positions, total) in engine.emulated_groups(columns).items():
+            a, b = exact[..., positions], approx[..., positions]
+            if total:
+                a, b = a.sum(axis=-1), b.sum(axis=-1)
+            out[key] = fit_metrics(a, b)
+        return out
+
+    def _save(self, path: Path, surrogate: AxisSurrogate, fit: EmulatorFit) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.stem + ".tmp.npz")
+            np.savez(
+                tmp,
+                y0=surrogate.y0,
+                axis_sizes=np.array([len(a) for a in surrogate.axes]),
+                axis_x=np.concatenate(surrogate.axes),
+                axis_y=np.concatenate(surrogate.ys),
+                residuals=fit.residuals,
+                residual_moved=fit.residual_moved,
+                metrics=np.array(json.dumps(fit.metrics)),
+            )
+            os.replace(tmp, path)
+            for old in path.parent.glob("emulator-*.npz"):
+                if old != path:
+                    old.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Could not write emulator file: %s", e)
@@ -0,0 +1,88 @@
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .sensitivity import slider_bounds
+
+
+DEFAULT_PERCENTILES = [5.0, 25.0, 50.0, 75.0, 95.0]
+
+
+def sample_distribution(spec: Any, lo: float, hi: float, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Нэг slider-ийн k утга. low/high өгөөгүй бол slider-ийн min/max;
+    normal-ийн mean өгөөгүй бол мужийн дунд. Values outside the slider
+    range are clipped later by canonical_params.
+    """
+    low = lo if spec.low is None else float(spec.low)
+    high = hi if spec.high is None else float(spec.high)
+    if high < low:
+        raise ValueError(f"{spec.kind}: high must be >= low")
+    if spec.kind == "uniform":
+        return rng.uniform(low, high, k)
+    if spec.kind == "triangular":
+        mode = (low + high) / 2.0 if spec.mode is None else float(spec.mode)
+        if not low <= mode <= high:
+            raise ValueError("triangular: mode must lie between low and high")
+        if high == low:
+            return np.full(k, low)
+        return rng.triangular(low, mode, high, k)
+    if spec.kind == "normal":
+        mean = (low + high) / 2.0 if spec.mean is None else float(spec.mean)
+        sd = (high - low) / 6.0 if spec.sd is None else float(spec.sd)
+        if sd < 0:
+            raise ValueError("normal: sd must be >= 0")
+        return rng.normal(mean, sd, k)
+    raise ValueError(f"Unknown distribution kind: {spec.kind}")
+
+
+def percentile_bands(y: np.ndarray, percentiles: Sequence[float]) -> Dict[str, np.ndarray]:
+    """y: [K, time] -> {"p5": [time], ..., "mean": [time]} in one reduction per statistic."""
+    q = np.percentile(y, list(percentiles), axis=0)
+    bands = {f"p{p:g}": q[i] for i, p in enumerate(percentiles)}
+    bands["mean"] = y.mean(axis=0)
+    return bands
+
+
+def run_ensemble(
+    engine: Any,
+    sliders: Sequence[Any],
+    distributions: Dict[str, Any],
+    samples: int,
+    seed: int,
+    percentiles: Sequence[float],
+    fixed: Dict[str, float],
+    subscripts: Dict[str, Dict[str, str]],
+    outputs: List[str] | None,
+    progress: Callable[[int, int], None] | None = None,
+) -> Dict[str, Any]:
+    """
+    Тодорхойгүй slider-уудаас K багц параметр сугалж, нэг batch болгон
+    ажиллуулаад output, он бүрийн percentile-ийн зурвасыг буцаана.
+    """
+    if not percentiles or any(not 0.0 <= float(p) <= 100.0 for p in percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+    keys = list(distributions)
+    lo, hi = slider_bounds(sliders, keys)
+    rng = np.random.default_rng(seed)
+    # one column per slider, drawn in request order so a seed is reproducible
+    draws = np.column_stack([
+        sample_distribution(distributions[k], lo[i], hi[i], samples, rng)
+        for i, k in enumerate(keys)
+    ])
+
+    params_list = []
+    for row in draws:
+        p = dict(fixed)
+        p.update(zip(keys, (float(v) for v in row)))
+        params_list.append(engine.canonical_params(p))
+
+    time, arrays = engine.simulate_arrays(params_list, subscripts, outputs, progress)
+    return {
+        "samples": samples,
+        "seed": seed,
+        "sliders": keys,
+        "percentiles": [float(p) for p in percentiles],
+        "time": time,
+        "bands": {k: percentile_bands(y, percentiles) for k, y in arrays.items()},
+    }
@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import ColumnIndex
+
+
+def time_mask(times: Any, timestamps: List[float]) -> np.ndarray:
+    # хадгалсан он float нарийвчлалаар таарах эсэх (PySD-ийн time нь t0 + n*dt)
+    return np.isin(np.round(np.asarray(times, dtype=float), 9), np.round(np.asarray(timestamps, dtype=float), 9))
+
+
+class StopPlan:
+    """
+    StopCondition-уудыг баганын байрлалд хөрвүүлнэ (AggregatePlan-тай ижил).
+
+    ``total_below``: the output summed over all its cells is below
+    ``threshold``; ``any_below``: some cell (сум, малын төрөл) is, e.g. a
+    negative stock with threshold 0. ``columns`` are the model columns the
+    conditions read, in model order; ``positions`` their place in ``index``.
+    """
+
+    def __init__(self, conditions: Sequence[Any], index: ColumnIndex, outputs: Sequence[str]):
+        found: List[List[int]] = []
+        for i, cond in enumerate(conditions):
+            positions = []
+            if cond.output in outputs:
+                # demo frame: output бүр нэг багана (output key-ээр)
+                positions = index.output_positions(cond.output, {}, True) or index.output_positions(cond.output, {}, False)
+            if not positions:
+                raise ValueError(f"stop_when[{i}]: unknown output {cond.output} (one of {', '.join(outputs)})")
+            found.append(positions)
+        self.positions = np.array(sorted({p for positions in found for p in positions}), dtype=np.intp)
+        self.columns: List[str] = [index.columns[p] for p in self.positions]
+        # нөхцөл бүр: (kind, self.columns дахь байрлал, threshold)
+        self._tests = [
+            (cond.kind, np.searchsorted(self.positions, positions), float(cond.threshold))
+            for cond, positions in zip(conditions, found)
+        ]
+        self.key: Tuple[Any, ...] = tuple((c.kind, c.output, float(c.threshold)) for c in conditions)
+
+    def check(self, block: np.ndarray) -> np.ndarray:
+        """``block``: [time, self.columns] -> мөр бүрт биелсэн эхний нөхцөлийн дугаар, эсвэл -1."""
+        hit = np.full(block.shape[0], -1)
+        # сүүлээс нь: олон нөхцөл биелвэл хамгийн бага дугаар үлдэнэ
+        for i, (kind, local, threshold) in reversed(list(enumerate(self._tests))):
+            values = block[:, local]
+            met = values.sum(axis=1) < threshold if kind == "total_below" else (values < threshold).any(axis=1)
+            hit[met] = i
+        return hit
+
+
+class Horizon:
+    """
+    Нэг хүсэлтийн run-ийн хугацааны хүрээ (ModelEngine.horizon бүтээнэ).
+
+    ``timestamps``: saved times to return, None = every saved time of the
+    model; the last one is the run's final_time and may lie past the
+    baseline's. ``initial_time``: integration starts from the baseline's
+    stock in that year. ``stop``: the run halts at the first saved year
+    (from ``initial_time`` on) that meets a condition; ``grid`` are all the
+    saved years of the horizon, which such a run saves so each is tested.
+    """
+
+    def __init__(
+        self,
+        timestamps: List[float] | None,
+        grid: List[float] | None = None,
+        initial_time: float | None = None,
+        stop: StopPlan | None = None,
+    ):
+        self.timestamps = timestamps
+        self.grid = grid
+        self.initial_time = initial_time
+        self.stop = stop
+
+    def key(self) -> Tuple[Any, ...]:
+        return (
+            tuple(self.timestamps or ()),
+            self.initial_time,
+            self.stop.key if self.stop is not None else (),
+        )
+
+    @property
+    def saved(self) -> List[float] | None:
+        """Run-ийн хадгалах онууд (PySD return_timestamps); None = бүгд."""
+        return self.grid if self.stop is not None else self.timestamps
+
+    def ends_by(self, time: float) -> bool:
+        saved = self.saved
+        return not saved or saved[-1] <= time + 1e-9
+
+    def stops_at(self, time: float, row: np.ndarray) -> bool:
+        """``row``: нэг хадгалсан мөр, model-ийн (baseline) баганын дарааллаар."""
+        if self.stop is None or (self.initial_time is not None and time < self.initial_time - 1e-9):
+            return False
+        return bool(self.stop.check(row[None, self.stop.positions])[0] >= 0)
+
+    def first_stop(self, df: pd.DataFrame) -> Tuple[int, int] | None:
+        """(мөр, нөхцөл) -- ``df``-ийн эхний зогсох мөр, эсвэл None."""
+        if self.stop is None or not len(df.index):
+            return None
+        hit = self.stop.check(df[self.stop.columns].to_numpy(dtype=float))
+        if self.initial_time is not None:
+            hit[df.index.to_numpy(dtype=float) < self.initial_time - 1e-9] = -1
+        rows = np.nonzero(hit >= 0)[0]
+        return (int(rows[0]), int(hit[rows[0]])) if len(rows) else None
+
+    def finish(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run-ийн frame -> хариуны frame: зогсох онд тасалж, ``timestamps``-ийн
+        мөрүүдийг үлдээнэ. ``attrs["stopped"]``: {"time", "condition"} or None.
+        """
+        out, stopped = df, None
+        hit = self.first_stop(df)
+        if hit is not None:
+            row, condition = hit
+            stopped = {"time": float(df.index[row]), "condition": condition}
+            out = out.iloc[: row + 1]
+        if self.timestamps is not None:
+            out = out.loc[time_mask(out.index, self.timestamps)]
+        if out is df:
+            # cache-д буй frame-ийн attrs-ийг өөрчлөхгүй
+            out = df.copy(deep=False)
+        out.attrs = {**df.attrs, "stopped": stopped}
+        return out
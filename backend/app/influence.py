@@ -0,0 +1,145 @@
+import ast
+import inspect
+import textwrap
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+
+# if_then_else(time() <op> N, then, else): which branch is only read after N
+_AFTER_ELSE = {ast.LtE: True, ast.Lt: False}   # else-branch runs when time > N (LtE) / >= N (Lt)
+_AFTER_THEN = {ast.Gt: True, ast.GtE: False}   # then-branch runs when time > N (Gt) / >= N (GtE)
+
+
+def _is_time_call(node: ast.AST) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "time" and not node.args
+
+
+def _time_gate(node: ast.AST):
+    """``if_then_else(time() <= 2024, ...)`` -> (branch index, N, strict); otherwise None."""
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "if_then_else"):
+        return None
+    if len(node.args) != 3:
+        return None
+    cond = node.args[0]
+    if not (isinstance(cond, ast.Compare) and len(cond.ops) == 1 and _is_time_call(cond.left)):
+        return None
+    bound = cond.comparators[0]
+    if not (isinstance(bound, ast.Constant) and isinstance(bound.value, (int, float))):
+        return None
+    op = type(cond.ops[0])
+    if op in _AFTER_ELSE:
+        return 2, float(bound.value), _AFTER_ELSE[op]
+    if op in _AFTER_THEN:
+        return 1, float(bound.value), _AFTER_THEN[op]
+    return None
+
+
+def _gated_dependencies(func: Any, names: Set[str], step_times: np.ndarray) -> Dict[str, int]:
+    """
+    Dependency -> first step at which ``func`` can read it. Names that only
+    appear in the "after N" branch of a time switch start at the first step
+    past N; everything else is read from step 0.
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return {}
+
+    first: Dict[str, int] = {}
+
+    def visit(node: ast.AST, start: int) -> None:
+        gate = _time_gate(node)
+        if gate is not None:
+            branch, bound, strict = gate
+            after = step_times > bound if strict else step_times >= bound
+            gated = int(np.argmax(after)) if after.any() else len(step_times)
+            for i, arg in enumerate(node.args):
+                visit(arg, max(start, gated) if i == branch else start)
+            return
+        if isinstance(node, ast.Name) and node.id in names:
+            first[node.id] = min(first.get(node.id, start), start)
+        for child in ast.iter_child_nodes(node):
+            visit(child, start)
+
+    body = tree.body[0]
+    for stmt in getattr(body, "body", []):
+        visit(stmt, 0)
+    return first
+
+
+def model_step_times(model: Any) -> np.ndarray:
+    control = model.components._components._control_vars
+    t0 = float(control["initial_time"]())
+    dt = float(control["time_step"]())
+    n = int(round((float(control["final_time"]()) - t0) / dt))
+    return t0 + dt * np.arange(n + 1, dtype=float)
+
+
+def earliest_influence(model: Any, constants: List[str]) -> Dict[str, float]:
+    """
+    Параметр бүрийн (py нэр) хувьд моделийн аль нэг динамик хувьсагч хамгийн
+    эрт өөрчлөгдөж болох хугацаа. Жишээ нь 2024 хүртэл lookup уншдаг
+    нөхөн үржих хувь хэмжээ -> 2025.
+
+    The parameter's own (constant) column is not counted. ``inf`` means the
+    parameter never reaches a dynamic variable.
+    """
+    module = model.components._components
+    deps: Dict[str, Dict[str, Any]] = model._dependencies
+    step_times = model_step_times(model)
+    never = len(step_times)
+
+    # reader -> {dependency: first step it is read}, plus stock edges
+    edges: Dict[str, Dict[str, int]] = {}
+    for name, d in deps.items():
+        if name == "time" or not isinstance(d, dict):
+            continue
+        if "step" in d or "initial" in d:
+            # Integ: initial value sets step 0, a flow change reaches the stock one step later
+            edge = {dep: 0 for dep in d.get("initial", {})}
+            for dep in d.get("step", {}):
+                edge[dep] = min(edge.get(dep, never), 1)
+            edges[name] = edge
+            continue
+        func = getattr(module, name, None)
+        gated = _gated_dependencies(func, set(d), step_times) if func is not None else {}
+        edges[name] = {dep: gated.get(dep, 0) for dep in d if dep != "time"}
+
+    out: Dict[str, float] = {}
+    for param in constants:
+        first: Dict[str, int] = {param: 0}
+        changed = True
+        while changed:
+            changed = False
+            for reader, edge in edges.items():
+                best = first.get(reader, never)
+                for dep, lag in edge.items():
+                    if dep not in first:
+                        continue
+                    # stock edges add a step; gated edges wait for the gate
+                    step = first[dep] + lag if reader in deps and "step" in deps[reader] else max(first[dep], lag)
+                    if step < best:
+                        best = step
+                if best < first.get(reader, never):
+                    first[reader] = best
+                    changed = True
+        reached = [s for n, s in first.items() if n != param and n in edges]
+        step = min(reached) if reached else never
+        out[param] = float(step_times[step]) if step < never else float("inf")
+    return out
+
+
+def integ_stocks(model: Any) -> Dict[str, str] | None:
+    """
+    Integ stock-ууд (py нэр -> Vensim нэр). Delay/Smooth зэрэг өөр төлөвтэй
+    компонент байвал зөвхөн stock-оос үргэлжлүүлэх боломжгүй тул None.
+    """
+    out: Dict[str, str] = {}
+    for py_name, func in vars(model.components._components).items():
+        if getattr(func, "type", None) != "Stateful" or not hasattr(func, "subscripts"):
+            continue
+        if getattr(func, "subtype", None) != "Integ":
+            return None
+        out[py_name] = func.name
+    return out
@@ -0,0 +1,181 @@
+import logging
+import os
+import sqlite3
+import threading
+import time as _time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+# progress-ийг ийм алхмаар (хувь) л SQLite-д бичнэ
+PROGRESS_STEP = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+)
+"""
+
+# runner(spec, progress(done, total)) -> pydantic payload
+Runner = Callable[[Any, Callable[[int, int], None]], BaseModel]
+
+
+def jobs_dir(cache_dir: str) -> Path:
+    return Path(cache_dir).expanduser() / "jobs"
+
+
+class JobManager:
+    """
+    Урт хугацааны ажил (sweep, ensemble, ...) HTTP хүсэлтээс гадна.
+    Jobs are rows in CACHE_DIR/jobs/jobs.sqlite3 and run on a small thread
+    pool of their own, so they never hold a request thread. Results are
+    JSON files next to the table, kept for ``ttl`` seconds after the job
+    finishes. Jobs that were queued or running when the process stopped
+    are started again (from the beginning) by ``start()``.
+    """
+
+    def __init__(self, cache_dir: str, workers: int, ttl: float):
+        self.folder = jobs_dir(cache_dir)
+        self.db_path = self.folder / "jobs.sqlite3"
+        self.workers = max(int(workers), 1)
+        self.ttl = float(ttl)
+        self._kinds: Dict[str, Tuple[type, Runner]] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._reported: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, schema: type, runner: Runner) -> None:
+        self._kinds[kind] = (schema, runner)
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def result_file(self, job_id: str) -> Path:
+        return self.folder / f"{job_id}.json"
+
+    def start(self) -> None:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self._db() as db:
+            db.execute(SCHEMA)
+            # restart: дуусаагүй ажлуудыг дахин дараалалд оруулна
+            db.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, started = NULL "
+                "WHERE status IN ('queued', 'running')"
+            )
+            pending = [r["id"] for r in db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created")]
+        self.prune()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        for job_id in pending:
+            self._executor.submit(self._run, job_id)
+        if pending:
+            logger.info("Resuming %d unfinished job(s)", len(pending))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, kind: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self._kinds:
+            raise ValueError(f"Unknown job kind: {kind} (one of {', '.join(self._kinds)})")
+        if self._executor is None:
+            raise RuntimeError("Job manager is not started")
+        schema, _ = self._kinds[kind]
+        # spec-ийг одоо шалгана: буруу бол 400, job үүсэхгүй
+        req = schema.model_validate(spec)
+        self.prune()
+        job_id = uuid.uuid4().hex
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, spec, status, created) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, req.model_dump_json(), _time.time()),
+            )
+        self._executor.submit(self._run, job_id)
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Dict[str, Any] | None:
+        with self._db() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "error": row["error"],
+            "created_at": row["created"],
+            "started_at": row["started"],
+            "finished_at": row["finished"],
+            "expires_at": row["finished"] + self.ttl if row["finished"] is not None else None,
+        }
+
+    def _set(self, job_id: str, **fields: Any) -> None:
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._db() as db:
+            db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def _progress(self, job_id: str, done: int, total: int) -> None:
+        pct = 100.0 * done / total if total else 100.0
+        with self._lock:
+            if pct - self._reported.get(job_id, 0.0) < PROGRESS_STEP and done < total:
+                return
+            self._reported[job_id] = pct
+        self._set(job_id, progress=round(min(pct, 99.9), 1))
+
+    def _run(self, job_id: str) -> None:
+        with self._db() as db:
+            row = db.execute("SELECT kind, spec FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return
+        self._set(job_id, status="running", started=_time.time())
+        try:
+            schema, runner = self._kinds[row["kind"]]
+            payload = runner(schema.model_validate_json(row["spec"]), lambda d, n: self._progress(job_id, d, n))
+            tmp = self.folder / f".{job_id}.json.tmp"
+            tmp.write_text(payload.model_dump_json(), encoding="utf-8")
+            os.replace(tmp, self.result_file(job_id))
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, row["kind"])
+            self._set(job_id, status="failed", error=str(e), finished=_time.time())
+        else:
+            self._set(job_id, status="done", progress=100.0, finished=_time.time())
+        finally:
+            with self._lock:
+                self._reported.pop(job_id, None)
+
+    def prune(self) -> None:
+        """TTL-ээс хэтэрсэн дууссан ажлууд болон тэдгээрийн үр дүнг устгана."""
+        cutoff = _time.time() - self.ttl
+        with self._db() as db:
+            old = [r["id"] for r in db.execute(
+                "SELECT id FROM jobs WHERE finished IS NOT NULL AND finished < ?", (cutoff,)
+            )]
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in old])
+        for job_id in old:
+            try:
+                self.result_file(job_id).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,749 @@
+import ast
+import copy
+import inspect
+import textwrap
+import warnings
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class KernelUnsupported(RuntimeError):
+    """The translated model does not match the structure this kernel was written for."""
+
+
+# CompiledModel.horizon: FINAL TIME бүрийн хувилбарын дээд тоо
+MAX_HORIZONS = 16
+
+# nvs__24-ийн нэмэх дараалал; коэффициентүүд model-оос (Хонь = 1, literal-гүй)
+SHEEP_UNIT_TYPES = ("Адуу", "Үхэр", "Тэмээ", "Хонь", "Ямаа")
+
+
+def _where(cond, a, b):
+    return np.where(cond, a, b)
+
+
+def _literals(func: Any) -> List[float]:
+    """
+    Component-ийн тэгшитгэл дэх тоон literal-ууд, эх кодын дарааллаар.
+    The decorator (depends_on counts), the docstring and ``expand_dims``
+    axis positions are structure, not model values, and are skipped.
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError) as e:
+        raise KernelUnsupported(f"Cannot read the equation of {getattr(func, 'name', func)}: {e}") from None
+    found: List[float] = []
+
+    def visit(node: ast.AST) -> None:
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "expand_dims":
+            visit(node.func.value)
+            return
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            found.append(float(node.value))
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    body = tree.body[0].body if tree.body and isinstance(tree.body[0], ast.FunctionDef) else []
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+    for stmt in body:
+        visit(stmt)
+    return found
+
+
+# Every value below is kept "full rank": the trailing two axes are always
+# [soum, livestock_type] (size 1 on the dims a variable is not subscripted
+# by), so plain NumPy broadcasting reproduces the xarray alignment PySD does.
+# Leading axes (scenario, time) are free and broadcast through untouched.
+# Numbers written into the model's equations (history end year, base loss
+# rate, ...) come from ``k.literals[py_name]``, read from the translated model.
+Equation = Callable[[Dict[str, Any], "CompiledModel"], np.ndarray]
+
+
+def _eq_nvs__2(v, k):
+    return v["nvs__32"]
+
+
+def _eq_nvs__3(v, k):
+    return v["nvs__2"] * v["nvs__17"]
+
+
+def _eq_nvs__5(v, k):
+    return v["nvs__4"] + v["nvs__1"] * v["nvs__18"] * v["nvs__30"]
+
+
+def _eq_nvs__7(v, k):
+    stock = v["nvs__14"]
+    value = _where(v["time"] <= k.literals["nvs__7"]["history_end"], stock * v["nvs__34"], stock * v["nvs__6"])
+    # only the horse column is wrapped in INTEGER() in the model
+    return _where(k.type_mask("Адуу"), np.trunc(value), value)
+
+
+def _eq_nvs__8(v, k):
+    t, year, c = v["time"], v["nvs__5"], k.literals["nvs__8"]
+    return _where(np.logical_or(t < year, t > year + c["window"]), c["outside"], v["nvs__3"])
+
+
+def _eq_nvs__9(v, k):
+    return v["nvs__13"] * v["nvs__19"] * v["nvs__14"]
+
+
+def _eq_nvs__11(v, k):
+    return v["nvs__22"].sum(axis=-1, keepdims=True)
+
+
+def _eq_nvs__13(v, k):
+    return _where(v["time"] <= k.literals["nvs__13"]["history_end"], v["nvs__35"], v["nvs__12"])
+
+
+def _eq_nvs__17(v, k):
+    t, year, c = v["time"], v["nvs__5"], k.literals["nvs__17"]
+    return _where(np.logical_and(t >= year, t < year + c["window"]), v["nvs__15"], c["outside"])
+
+
+def _eq_nvs__18(v, k):
+    t, first = v["time"], v["nvs__4"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        count = np.trunc((t - first) / v["nvs__1"] / v["nvs__30"])
+    return _where(t <= first, k.literals["nvs__18"]["before"], count)
+
+
+def _eq_nvs__19(v, k):
+    t, year, c = v["time"], v["nvs__5"], k.literals["nvs__19"]
+    return _where(np.logical_or(t <= year + c["recovery_start"], t > year + c["recovery_end"]), c["outside"], v["nvs_"])
+
+
+def _eq_nvs__20(v, k):
+    return v["nvs__11"].sum(axis=-2, keepdims=True)
+
+
+def _eq_nvs__21(v, k):
+    return v["nvs__8"] / v["nvs__30"]
+
+
+def _eq_nvs__22(v, k):
+    stock, c = v["nvs__14"], k.literals["nvs__22"]
+    return np.trunc(
+        _where(v["time"] <= c["history_end"], stock * v["nvs__33"], (c["base_loss"] + v["nvs__21"]) * stock)
+    )
+
+
+def _eq_nvs__23(v, k):
+    return v["nvs__24"].sum(axis=-2, keepdims=True)
+
+
+def _eq_nvs__24(v, k):
+    stock, weights = v["nvs__14"], k.literals["nvs__24"]
+    total = None
+    for type_name in SHEEP_UNIT_TYPES:
+        weight = weights.get(type_name, 1.0)
+        term = stock[..., k.type_index(type_name):k.type_index(type_name) + 1]
+        if weight != 1.0:
+            term = term * weight
+        total = term if total is None else total + term
+    return total
+
+
+def _eq_nvs__25(v, k):
+    return v["nvs__31"].sum(axis=-2, keepdims=True) / v["nvs__27"].sum(axis=-2, keepdims=True)
+
+
+def _eq_nvs__26(v, k):
+    return v["nvs__14"].sum(axis=(-2, -1), keepdims=True)
+
+
+def _eq_nvs__27(v, k):
+    return v["nvs__14"].sum(axis=-1, keepdims=True)
+
+
+def _eq_nvs__28(v, k):
+    return v["nvs__14"].sum(axis=-2, keepdims=True)
+
+
+def _eq_nvs__29(v, k):
+    return v["nvs__14"] * v["nvs__16"]
+
+
+def _eq_nvs__31(v, k):
+    return v["nvs__22"].sum(axis=-1, keepdims=True)
+
+
+def _eq_saveper(v, k):
+    return v["time_step"]
+
+
+# py_name -> (Vensim нэр, depends_on түлхүүрүүд, NumPy тэгшитгэл, literal-уудын нэр)
+# The dependency sets are checked against the translated model on compile,
+# so a re-translated .mdl with a different structure is refused rather than
+# silently simulated with stale equations. The last entry names the
+# equation's numeric literals in source order (see _literals); their values
+# are read from the model, a repeated name must have the same value
+# everywhere and a different count is refused.
+EQUATIONS: Dict[str, Tuple[str, frozenset, Equation, Tuple[str, ...]]] = {
+    "saveper": ("SAVEPER", frozenset({"time_step"}), _eq_saveper, ()),
+    "nvs__2": (
+        "Байгалийн гамшиг бэлчээрийн мал сүргийн хорогдолд бүсээс шалтгаалан нөлөөлөх нөлө",
+        frozenset({"nvs__32"}),
+        _eq_nvs__2,
+        (),
+    ),
+    "nvs__3": (
+        "Байгалийн гамшиг бэлчээрийн мал сүргийн хорогдолд нөлөөлөх нөлөө",
+        frozenset({"nvs__2", "nvs__17"}),
+        _eq_nvs__3,
+        (),
+    ),
+    "nvs__5": (
+        "Байгалийн гамшиг тохиолдсон он",
+        frozenset({"nvs__4", "nvs__1", "nvs__30", "nvs__18"}),
+        _eq_nvs__5,
+        (),
+    ),
+    "nvs__7": (
+        "Борлуулсан болон хүнсэнд хэрэглэсэн малын тоо толгой",
+        frozenset({"time", "nvs__14", "nvs__34", "nvs__6"}),
+        _eq_nvs__7,
+        # малын төрөл бүрт нэг IF THEN ELSE
+        ("history_end",) * len(SHEEP_UNIT_TYPES),
+    ),
+    "nvs__8": (
+        "Бэлчээрийн мал мүргийн гашигаар хорогдох хорогдолын нөлөө",
+        frozenset({"time", "nvs__5", "nvs__3"}),
+        _eq_nvs__8,
+        ("window", "outside"),
+    ),
+    "nvs__9": (
+        "Бэлчээрийн мал сүргийн төллөлт",
+        frozenset({"nvs__13", "nvs__19", "nvs__14"}),
+        _eq_nvs__9,
+        (),
+    ),
+    "nvs__11": (
+        "Нийт нядлагдаагүй хорогдсон мал сүргийн тоо сумдаар",
+        frozenset({"nvs__22"}),
+        _eq_nvs__11,
+        (),
+    ),
+    "nvs__13": (
+        "Бэлчээрийн малын нөхөн үржих хурд",
+        frozenset({"time", "nvs__35", "nvs__12"}),
+        _eq_nvs__13,
+        ("history_end",),
+    ),
+    "nvs__17": (
+        "Гамшгийн хорогдолын хэмжээ",
+        frozenset({"time", "nvs__5", "nvs__15"}),
+        _eq_nvs__17,
+        ("window", "outside"),
+    ),
+    "nvs__18": (
+        "Гамшгийн үржигдэхүүн",
+        frozenset({"time", "nvs__4", "nvs__1", "nvs__30"}),
+        _eq_nvs__18,
+        ("before",),
+    ),
+    "nvs__19": (
+        "Гамшгийн дараа бэлчээрийн мал сүргийн нөхөн сэргэх сэргэлтийн нөлөө",
+        frozenset({"time", "nvs__5", "nvs_"}),
+        _eq_nvs__19,
+        ("recovery_start", "recovery_end", "outside"),
+    ),
+    "nvs__20": (
+        "Нийт нядлагдаагүй хорогдсон мал сүргийн тоо",
+        frozenset({"nvs__11"}),
+        _eq_nvs__20,
+        (),
+    ),
+    "nvs__21": (
+        "Зудаар хорогдох бэлчээрийн мал сүргийн хувь хэмжээ",
+        frozenset({"nvs__8", "nvs__30"}),
+        _eq_nvs__21,
+        (),
+    ),
+    "nvs__22": (
+        "Малын зүй бус хорогдол",
+        frozenset({"time", "nvs__14", "nvs__33", "nvs__21"}),
+        _eq_nvs__22,
+        ("history_end", "base_loss"),
+    ),
+    "nvs__23": (
+        "Нийт бэлчээрийн мал хонин толгойд шилжүүлснээр",
+        frozenset({"nvs__24"}),
+        _eq_nvs__23,
+        (),
+    ),
+    "nvs__24": (
+        "Нийт бэлчээрийн мал хонин толгойд шилжүүлснээр Сум тус бүрээр",
+        frozenset({"nvs__14"}),
+        _eq_nvs__24,
+        # коэффициенттэй нэмэгдэхүүнүүд (Хонь-д үржигдэхүүн байхгүй)
+        ("Адуу", "Үхэр", "Тэмээ", "Ямаа"),
+    ),
+    "nvs__25": (
+        "Нийт бэлчээрийн малд эзлэх хорогдсон малын хувь хэмжээ",
+        frozenset({"nvs__31", "nvs__27"}),
+        _eq_nvs__25,
+        (),
+    ),
+    "nvs__26": ("Нийт бэлчээрийн малын тоо", frozenset({"nvs__14"}), _eq_nvs__26, ()),
+    "nvs__27": ("Нийт бэлчээрийн малын тоо сум тус бүрээр", frozenset({"nvs__14"}), _eq_nvs__27, ()),
+    "nvs__28": ('"Нийт бэлчээрийн тоо толгой /төрлөөр/"', frozenset({"nvs__14"}), _eq_nvs__28, ()),
+    "nvs__29": ("Хүн амын хэрэгцээнд нядалсан мал", frozenset({"nvs__14", "nvs__16"}), _eq_nvs__29, ()),
+    "nvs__31": (
+        "Нийт нядлагдаагүй хорогдсон малын тоо сумдаар",
+        frozenset({"nvs__22"}),
+        _eq_nvs__31,
+        (),
+    ),
+}
+
+STOCK_PY_NAME = "nvs__14"
+STOCK_INTEG = "_integ_nvs_14"
+STOCK_INITIAL = frozenset({"nvs__10"})
+STOCK_FLOWS = {"nvs__9": 1.0, "nvs__22": -1.0, "nvs__7": -1.0}
+
+CONTROL_COLUMNS = {
+    "final_time": "FINAL TIME",
+    "initial_time": "INITIAL TIME",
+    "time_step": "TIME STEP",
+}
+
+
+class CompiledModel:
+    """
+    PySD-ийн орчуулсан моделийг [сум, малын төрөл] NumPy массив дээр
+    ажилладаг нэг алхамын функц болгон хөрвүүлнэ.
+
+    Constants, lookups and the numbers written into the equations are read
+    from the loaded PySD model (so edited .mdl values are honoured), the
+    evaluation order comes from each component's ``depends_on`` and the
+    Integ is rebuilt from ``other_deps``. Only the form of the auxiliary
+    equations lives in ``EQUATIONS``.
+    """
+
+    def __init__(self, model: Any):
+        self._model = model
+        module = model.components._components
+        self._module = module
+
+        stock_func = getattr(module, STOCK_PY_NAME, None)
+        if stock_func is None or getattr(stock_func, "type", None) != "Stateful":
+            raise KernelUnsupported(f"Stock {STOCK_PY_NAME} not found")
+        self.dims: List[str] = list(stock_func.subscripts or [])
+        if len(self.dims) != 2:
+            raise KernelUnsupported("Stock must be subscripted by [soum, livestock_type]")
+        subscript_dict = module._subscript_dict
+        self.coords: Dict[str, List[str]] = {d: list(subscript_dict[d]) for d in self.dims}
+        self.shape: Tuple[int, int] = (len(self.coords[self.dims[0]]), len(self.coords[self.dims[1]]))
+
+        control = module._control_vars
+        self.initial_time = float(control["initial_time"]())
+        self.final_time = float(control["final_time"]())
+        self.time_step = float(control["time_step"]())
+        self.saveper = float(control["saveper"]())
+        ratio = self.saveper / self.time_step
+        if ratio < 1 or abs(ratio - round(ratio)) > 1e-9:
+            raise KernelUnsupported("SAVEPER must be a multiple of TIME STEP")
+        self._save_every = int(round(ratio))
+        self._set_grid(self.final_time)
+
+        deps = model._dependencies
+        integ = deps.get(STOCK_INTEG) or {}
+        if deps.get(STOCK_PY_NAME) != {STOCK_INTEG: 1} \
+                or frozenset(integ.get("initial", {})) != STOCK_INITIAL \
+                or set(integ.get("step", {})) != set(STOCK_FLOWS):
+            raise KernelUnsupported("Integ definition changed")
+
+        self.constants: Dict[str, np.ndarray] = {}
+        self.lookups: Dict[str, np.ndarray] = {}
+        self._lookup_funcs: Dict[str, Tuple[Callable, List[str]]] = {}
+        self.component_dims: Dict[str, List[str]] = {}
+        self.real_names: Dict[str, str] = {}
+        self.literals: Dict[str, Dict[str, float]] = {}
+        aux: List[str] = []
+
+        for py_name in deps:
+            func = getattr(module, py_name, None)
+            if func is None or not hasattr(func, "subscripts") or py_name == "time":
+                # Integ objects and other stateful internals carry no metadata
+                continue
+            comp_type = getattr(func, "type", None)
+            subs = list(getattr(func, "subscripts", None) or [])
+            if any(d not in self.dims for d in subs) or subs != [d for d in self.dims if d in subs]:
+                raise KernelUnsupported(f"{py_name}: unsupported subscripts {subs}")
+            self.component_dims[py_name] = subs
+            self.real_names[py_name] = func.name
+
+            if py_name in CONTROL_COLUMNS or py_name == STOCK_PY_NAME:
+                continue
+            if comp_type == "Constant":
+                self.constants[py_name] = self._full_rank(func(), subs)
+            elif comp_type == "Lookup":
+                self.lookups[py_name] = self._tabulate(func, subs)
+                self._lookup_funcs[py_name] = (func, subs)
+            elif comp_type == "Auxiliary":
+                spec = EQUATIONS.get(py_name)
+                if spec is None:
+                    raise KernelUnsupported(f"No NumPy equation for {py_name}")
+                real_name, expected_deps, _, names = spec
+                if func.name != real_name or frozenset(deps[py_name]) != expected_deps:
+                    raise KernelUnsupported(f"{py_name} changed in the translated model")
+                self.literals[py_name] = self._bind_literals(py_name, func, names)
+                aux.append(py_name)
+            else:
+                raise KernelUnsupported(f"{py_name}: unsupported component type {comp_type}")
+
+        self.order: List[str] = self._toposort(aux, deps)
+        self.columns: List[Tuple[str, str]] = self._build_columns(deps)
+        self._column_position: Dict[str, int] = {c: i for i, (_, c) in enumerate(self.columns)}
+        self._column_slice: Dict[str, slice] = {}
+        for i, (py_name, _) in enumerate(self.columns):
+            prev = self._column_slice.get(py_name)
+            self._column_slice[py_name] = slice(prev.start if prev else i, i + 1)
+        self._type_index = {v: i for i, v in enumerate(self.coords[self.dims[1]])}
+        # default run, used as the checkpoint source when resuming (see _integrate)
+        self._base: np.ndarray | None = None
+        self._horizons: Dict[float, "CompiledModel"] = {}
+
+    def _set_grid(self, final_time: float) -> None:
+        self.final_time = final_time
+        n_steps = int(round((final_time - self.initial_time) / self.time_step))
+        self.step_times = self.initial_time + self.time_step * np.arange(n_steps + 1, dtype=float)
+        self.times = self.step_times[:: self._save_every]
+
+    def horizon(self, final_time: float) -> "CompiledModel":
+        """
+        Өөр FINAL TIME-тай хувилбар: ижил тэгшитгэл, шинэ хугацааны тор.
+        An earlier end reuses the leading lookup rows; a later one tabulates
+        the lookups on the longer grid. Kept per final time.
+        """
+        if abs(final_time - self.final_time) < 1e-9:
+            return self
+        other = self._horizons.get(final_time)
+        if other is not None:
+            return other
+        if final_time < self.initial_time + self.time_step - 1e-9:
+            raise KernelUnsupported(f"FINAL TIME {final_time:g} is not after INITIAL TIME")
+        other = copy.copy(self)
+        other._set_grid(final_time)
+        n = len(other.step_times)
+        if final_time < self.final_time:
+            other.lookups = {name: table[:n] for name, table in self.lookups.items()}
+            other._base = None if self._base is None else self._base[: len(other.times)]
+        else:
+            other.lookups = {name: other._tabulate(func, subs) for name, (func, subs) in self._lookup_funcs.items()}
+            other._base = None
+        other._horizons = {}
+        if len(self._horizons) >= MAX_HORIZONS:
+            self._horizons.clear()
+        self._horizons[final_time] = other
+        return other
+
+    # ---- compile helpers -------------------------------------------------
+
+    @staticmethod
+    def _bind_literals(py_name: str, func: Any, names: Tuple[str, ...]) -> Dict[str, float]:
+        values = _literals(func)
+        if len(values) != len(names):
+            raise KernelUnsupported(f"{py_name}: {len(values)} numeric constants in the translated model, expected {len(names)}")
+        bound: Dict[str, float] = {}
+        for name, value in zip(names, values):
+            if bound.setdefault(name, value) != value:
+                raise KernelUnsupported(f"{py_name}: {name} differs between subscripts")
+        return bound
+
+    def _full_rank(self, value: Any, subs: List[str]) -> np.ndarray:
+        rank = self._rank_shape(subs)
+        dims = getattr(value, "dims", None)
+        arr = np.asarray(getattr(value, "values", value), dtype=float)
+        if dims is not None and list(dims) != subs:
+            # xarray keeps its own dim order; bring it to the stock's order
+            if sorted(dims) != sorted(subs):
+                raise KernelUnsupported(f"Dimensions {dims} do not match {subs}")
+            arr = arr.transpose([list(dims).index(d) for d in subs])
+        if arr.ndim == 0:
+            return np.full(rank, float(arr))
+        return arr.reshape(rank)
+
+    def _tabulate(self, func: Callable, subs: List[str]) -> np.ndarray:
+        rows = []
+        with warnings.catch_warnings():
+            # lookups are evaluated on the whole horizon even though the model
+            # only reads them up to its history end year; silence extrapolation noise
+            warnings.simplefilter("ignore")
+            for t in self.step_times:
+                rows.append(self._full_rank(func(float(t)), subs))
+        return np.stack(rows)
+
+    def _toposort(self, aux: List[str], deps: Dict[str, Any]) -> List[str]:
+        pending = set(aux)
+        order: List[str] = []
+        while pending:
+            ready = sorted(
+                n for n in pending
+                if not any(d in pending for d in deps.get(n, {}))
+            )
+            if not ready:
+                raise KernelUnsupported("Algebraic loop between auxiliaries")
+            order.extend(ready)
+            pending.difference_update(ready)
+        return order
+
+    def _build_columns(self, deps: Dict[str, Any]) -> List[Tuple[str, str]]:
+        cols: List[Tuple[str, str]] = []
+        for py_name in deps:
+            if py_name not in self.component_dims or py_name in self.lookups:
+                continue
+            subs = self.component_dims[py_name]
+            name = self.real_names[py_name]
+            if not subs:
+                cols.append((py_name, name))
+                continue
+            labels = [[]]
+            for d in subs:
+                labels = [prev + [v] for prev in labels for v in self.coords[d]]
+            for parts in labels:
+                cols.append((py_name, f"{name}[{','.join(parts)}]"))
+        return cols
+
+    # ---- runtime ---------------------------------------------------------
+
+    def type_index(self, value: str) -> int:
+        return self._type_index[value]
+
+    def type_mask(self, value: str) -> np.ndarray:
+        mask = np.zeros((1, self.shape[1]), dtype=bool)
+        mask[0, self._type_index[value]] = True
+        return mask
+
+    def resolve_params(self, params: Dict[str, Any] | None) -> Dict[str, np.ndarray]:
+        """Map Vensim/py names to full-rank constant overrides."""
+        out: Dict[str, np.ndarray] = {}
+        namespace = self._model._namespace
+        for key, value in (params or {}).items():
+            py_name = namespace.get(key, key)
+            if py_name not in self.constants:
+                raise KernelUnsupported(f"{key} is not an overridable constant")
+            out[py_name] = self._full_rank(value, self.component_dims[py_name])
+        return out
+
+    def _values(self, overrides: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        v: Dict[str, Any] = dict(self.constants)
+        v.update(overrides)
+        v["initial_time"] = np.full((1, 1), self.initial_time)
+        v["final_time"] = np.full((1, 1), self.final_time)
+        v["time_step"] = np.full((1, 1), self.time_step)
+        return v
+
+    def _evaluate(self, v: Dict[str, Any], step: int, stock: np.ndarray) -> Dict[str, Any]:
+        v["time"] = self.step_times[step]
+        v[STOCK_PY_NAME] = stock
+        for name, table in self.lookups.items():
+            v[name] = table[step]
+        for name in self.order:
+            v[name] = EQUATIONS[name][2](v, self)
+        return v
+
+    def _flow(self, v: Dict[str, Any]) -> np.ndarray:
+        flow = None
+        for name, sign in STOCK_FLOWS.items():
+            term = v[name] if sign > 0 else -v[name]
+            flow = term if flow is None else flow + term
+        return flow
+
+    def resolve_batch(self, params_list: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Stack per-scenario overrides into [scenario, ...full-rank] arrays."""
+        resolved = [self.resolve_params(p) for p in params_list]
+        keys = dict.fromkeys(k for r in resolved for k in r)
+        return {
+            k: np.stack([r.get(k, self.constants[k]) for r in resolved])
+            for k in keys
+        }
+
+    def run(
+        self,
+        params: Dict[str, Any] | None = None,
+        start: float | None = None,
+        columns: List[str] | None = None,
+        timestamps: List[float] | None = None,
+        stop: Callable[[float, np.ndarray], bool] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Euler-integrate the model; returns the same frame as ``model.run(params=...)``.
+
+        With ``start`` the rows before it are taken from the default run and
+        integration resumes from its stock at that time. Only valid when no
+        overridden parameter can change a dynamic variable before ``start``.
+        ``columns`` keeps only those output columns, like PySD's ``return_columns``;
+        ``timestamps`` only those saved rows, like ``return_timestamps``, and
+        the last one is the final time (see ``horizon``). ``stop(time, row)``
+        sees every saved row (all columns); integration ends after the first
+        row it returns True for.
+        """
+        kernel = self.horizon(float(timestamps[-1])) if timestamps else self
+        data = kernel._integrate(kernel.resolve_params(params), (), kernel.resume_index(start), stop)
+        return kernel.frame(data, columns, timestamps)
+
+    def run_batch(self, params_list: List[Dict[str, Any]], start: float | None = None) -> np.ndarray:
+        """Integrate all scenarios in one pass; returns [scenario, time, column]."""
+        if not params_list:
+            return np.empty((0, len(self.times), len(self.columns)))
+        return self._integrate(self.resolve_batch(params_list), (len(params_list),), self.resume_index(start))
+
+    def iter_rows(
+        self,
+        params: Dict[str, Any] | None = None,
+        start: float | None = None,
+        columns: List[str] | None = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        ``run``-тай ижил, гэхдээ мөр бүрийг (saved time бүрийн [column]) бодогдмогц
+        буцаана. Params and columns are checked before the first row, so
+        KernelUnsupported is raised here rather than mid-stream.
+        """
+        overrides = self.resolve_params(params)
+        pick = self._positions(columns)
+        return self._rows(overrides, self.resume_index(start), pick)
+
+    def _rows(self, overrides: Dict[str, np.ndarray], first: int, pick: List[int] | None) -> Iterator[np.ndarray]:
+        if first:
+            head = self._prefix(overrides, (), first)
+            yield from (head if pick is None else head[:, pick])
+        for saved in self._saved_steps(self._values(overrides), (), first):
+            row = self._flatten({k: a[None] for k, a in saved.items()})[0]
+            yield row if pick is None else row[pick]
+
+    def resume_index(self, start: float | None) -> int:
+        """Saved row to resume from: the last saved time not after ``start``."""
+        if start is None:
+            return 0
+        i = int(np.searchsorted(self.times, start + 1e-9, side="right")) - 1
+        return min(max(i, 0), len(self.times) - 1)
+
+    def _baseline(self) -> np.ndarray:
+        if self._base is None:
+            self._base = self._integrate({}, ())
+        return self._base
+
+    def _prefix(self, overrides: Dict[str, np.ndarray], lead: Tuple[int, ...], first: int) -> np.ndarray:
+        # default rows, with the overridden constants' own columns patched in
+        head = np.broadcast_to(self._baseline()[:first], lead + (first, len(self.columns))).copy()
+        for name, value in overrides.items():
+            cols = self._column_slice[name]
+            head[..., cols] = np.reshape(value, lead + (1, -1))
+        return head
+
+    def _integrate(
+        self,
+        overrides: Dict[str, np.ndarray],
+        lead: Tuple[int, ...],
+        first: int = 0,
+        stop: Callable[[float, np.ndarray], bool] | None = None,
+    ) -> np.ndarray:
+        # ``stop`` only for a single run (lead == ())
+        head = self._prefix(overrides, lead, first) if first else None
+        if stop is not None and head is not None:
+            for i, row in enumerate(head):
+                if stop(self.times[i], row):
+                    return head[: i + 1]
+        saved: Dict[str, List[np.ndarray]] = {}
+        for i, row in enumerate(self._saved_steps(self._values(overrides), lead, first), first):
+            for name, value in row.items():
+                saved.setdefault(name, []).append(value)
+            if stop is not None and stop(self.times[i], self._flatten({k: a[None] for k, a in row.items()})[0]):
+                break
+        data = self._flatten({k: np.stack(a, axis=len(lead)) for k, a in saved.items()})
+        if head is not None:
+            data = np.concatenate([head, data], axis=len(lead))
+        return data
+
+    def _saved_steps(self, v: Dict[str, Any], lead: Tuple[int, ...], first: int) -> Iterator[Dict[str, np.ndarray]]:
+        # one {name: [*lead, soum|1, type|1]} per saved time from row ``first`` on
+        if first:
+            checkpoint = self._baseline()[first, self._column_slice[STOCK_PY_NAME]].reshape(self.shape)
+            stock = np.broadcast_to(checkpoint, lead + self.shape).copy()
+        else:
+            stock = np.broadcast_to(v[next(iter(STOCK_INITIAL))], lead + self.shape).astype(float)
+        saved_names = [n for n in self.component_dims if n not in self.lookups]
+
+        last = len(self.step_times) - 1
+        for step in range(first * self._save_every, last + 1):
+            self._evaluate(v, step, stock)
+            if step % self._save_every == 0:
+                yield {
+                    name: np.broadcast_to(v[name], lead + self._rank_shape(self.component_dims[name])).copy()
+                    for name in saved_names
+                }
+            if step < last:
+                stock = stock + self._flow(v) * self.time_step
+
+    def _rank_shape(self, subs: List[str]) -> Tuple[int, int]:
+        return tuple(self.shape[i] if d in subs else 1 for i, d in enumerate(self.dims))
+
+    def _flatten(self, saved: Dict[str, np.ndarray]) -> np.ndarray:
+        # saved[name]: [*lead, time, soum|1, type|1] -> [*lead, time, column] in PySD order
+        blocks = []
+        for py_name in dict.fromkeys(p for p, _ in self.columns):
+            arr = saved[py_name]
+            blocks.append(arr.reshape(arr.shape[:-2] + (-1,)))
+        return np.concatenate(blocks, axis=-1)
+
+    def frame(self, data: np.ndarray, columns: List[str] | None = None, timestamps: List[float] | None = None) -> pd.DataFrame:
+        """
+        Wrap a [time, column] block (e.g. one scenario of ``run_batch``) as a PySD-style frame.
+        A block cut short by ``stop`` keeps the timestamps it reached.
+        """
+        names = [c for _, c in self.columns]
+        pick = self._positions(columns)
+        if pick is not None:
+            data = data[:, pick]
+            names = list(columns)
+        times = self.times[: data.shape[0]]
+        if timestamps is not None:
+            rows = np.searchsorted(self.times, np.asarray(timestamps, dtype=float) - 1e-9)
+            if np.any(rows >= len(self.times)) or not np.allclose(self.times[np.minimum(rows, len(self.times) - 1)], timestamps):
+                raise KernelUnsupported("Requested timestamps are not saved times")
+            rows = rows[rows < len(times)]
+            data, times = data[rows], times[rows]
+        return pd.DataFrame(
+            data,
+            index=pd.Index(times, name="time"),
+            columns=names,
+            copy=False,
+        )
+
+    def _positions(self, columns: List[str] | None) -> List[int] | None:
+        if columns is None:
+            return None
+        try:
+            return [self._column_position[c] for c in columns]
+        except KeyError as e:
+            raise KernelUnsupported(f"Unknown output column {e}") from None
+
+    def verify(
+        self,
+        reference: pd.DataFrame,
+        probes: Sequence[Tuple[Dict[str, Any], pd.DataFrame]] = (),
+        rtol: float = 1e-9,
+    ) -> None:
+        """
+        Raise KernelUnsupported unless a default run reproduces ``reference``
+        and each ``(params, frame)`` probe reproduces the PySD run with those
+        params. The default run alone cannot catch an equation number that
+        only matters away from the defaults, so the engine probes every slider.
+        """
+        self._base = self._integrate({}, ())
+        self._compare(self.frame(self._base), reference, rtol, "the PySD run")
+        for params, frame in probes:
+            self._compare(self.run(params), frame, rtol, f"the PySD run with {', '.join(params)}")
+
+    @staticmethod
+    def _compare(df: pd.DataFrame, reference: pd.DataFrame, rtol: float, what: str) -> None:
+        if list(df.columns) != [str(c) for c in reference.columns] or len(df.index) != len(reference.index):
+            raise KernelUnsupported(f"Kernel output columns differ from {what}")
+        ref = reference.to_numpy(dtype=float)
+        if not np.allclose(df.to_numpy(), ref, rtol=rtol, atol=1e-6, equal_nan=True):
+            raise KernelUnsupported(f"Kernel output differs from {what}")
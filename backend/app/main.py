@@ -1,27 +1,54 @@
-﻿from fastapi import FastAPI
+﻿from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from typing import Dict, Any, Callable, List, Literal, Tuple
 import json
+import logging
 import re
+import time as _time
 
 from .config import settings
 from .schemas import (
     ConfigPayload,
     SimulateRequest,
+    SimulateStreamRequest,
     ExplainRequest,
     ExplainResponse,
     SliderDef,
     AvailableSubscripts,
     DimDef,
     SeriesPayload,
+    ApproxSeriesPayload,
+    CubePayload,
+    SimulateBatchRequest,
+    SeriesBatchPayload,
+    SensitivityRequest,
+    SensitivityPayload,
+    EnsembleRequest,
+    EnsemblePayload,
+    SweepRequest,
+    SweepPayload,
+    JobRequest,
+    JobStatus,
     ChatGraphRequest,
     ChatGraphResponse,
 )
-from .model_engine import ModelEngine, OUTPUT_KEYS
+from .model_engine import ModelEngine
+from .horizon import Horizon
+from .admission import AdmissionController, AdmissionRejected, SessionTracker, SingleFlight, Superseded, admitted
 from .stats import build_stats_payload
+from .sensitivity import run_count, run_sensitivity
+from .ensemble import run_ensemble
+from .sweep import run_sweep, sweep_file
+from .jobs import JobManager
+from . import wire
+from .prebuilt import PrebuiltCache
 from .openai_client import openai_explain_mn
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
 app = FastAPI(title="Vensim to Python Web API", version="1.0.0")
 
 
@@ -52,6 +79,60 @@ app.add_middleware(
 engine = ModelEngine()
 engine.load()
 
+
+@app.on_event("shutdown")
+def _shutdown_engine():
+    engine.close()
+
+
+# Симуляци болон LLM хүсэлтийг тусдаа хаалгаар: урт AI дуудлага симуляцийн slot эзлэхгүй
+sim_gate = AdmissionController(
+    "simulation", settings.SIM_MAX_CONCURRENT, settings.SIM_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT
+)
+llm_gate = AdmissionController(
+    "llm", settings.LLM_MAX_CONCURRENT, settings.LLM_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT
+)
+
+# анги бүхэлдээ нэг дор нээхэд ижил default хүсэлтүүд нэг run-ийг хуваалцана
+flights = SingleFlight("simulate")
+# slider чирэхэд нэг session-ий хуучин хүсэлтүүдийг орхино
+sessions = SessionTracker()
+
+
+@app.exception_handler(AdmissionRejected)
+def _admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server is busy ({exc.reason}), try again later", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(Superseded)
+def _superseded(request: Request, exc: Superseded):
+    sessions.count(exc)
+    return JSONResponse(status_code=409, content={"detail": f"Request {exc}", "superseded": True})
+
+
+def _respond(request: Request, result: Dict[str, Any], model):
+    """
+    Accept: application/octet-stream (эсвэл msgpack) бол typed buffer, үгүй бол
+    ``model``-ийн JSON-ыг NumPy массиваас шууд бичнэ (pydantic validation-гүй).
+    """
+    fmt = wire.negotiate(request.headers.get("accept", ""))
+    if fmt is not None:
+        return wire.response(result, fmt)
+    return wire.json_response(result, model)
+
+
+def _begin_session(req: SimulateRequest):
+    """Энэ хүсэлтийн cancelled() шалгалт; шинэ хүсэлт ирэхэд хуучныг дарааллаас хасна."""
+    cancelled = sessions.begin(req.session_id, req.seq)
+    if req.session_id:
+        sim_gate.prune()
+    return cancelled
+
+
 OUTPUTS_UI_MN = {
     "herd_total": "Бэлчээрийн малын тоо толгой",
     "births": "Бэлчээрийн мал сүргийн төллөлт",
@@ -134,6 +215,9 @@ SLIDERS: list[SliderDef] = [
 ]
 
 
+engine.set_sliders(SLIDERS)
+
+
 @app.get("/")
 def root():
     return {"message": "Backend ажиллаж байна. /docs дээр API-г шалгана уу."}
@@ -141,11 +225,33 @@ def root():
 
 @app.get("/api/health")
 def health():
-    return {"ok": True, "demo_mode": engine.demo_mode}
+    return {
+        "ok": True,
+        "demo_mode": engine.demo_mode,
+        "workers": engine.pool.stats() if engine.pool is not None else None,
+        "cache": engine.result_cache.stats(),
+        "admission": {"simulation": sim_gate.stats(), "llm": llm_gate.stats()},
+        "coalescing": flights.stats(),
+        "sessions": sessions.stats(),
+        "prebuilt": prebuilt.stats(),
+    }
+
+
+# /api/config, baseline: model ачаалах бүрт нэг удаа encode + шахаж, ETag-тай өгнө
+prebuilt = PrebuiltCache()
+
+
+def _json_bytes(content: Any) -> bytes:
+    # JSONResponse.render-тэй ижил
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
 
 
 @app.get("/api/config")
-def get_config():
+def get_config(request: Request):
+    return prebuilt.get(("config", engine.model_hash, engine.demo_mode), _config_body).response(request)
+
+
+def _config_body() -> bytes:
     av = engine.get_available_subscripts()
     av_pyd = AvailableSubscripts(
         outputs={
@@ -164,39 +270,449 @@ def get_config():
         demo_mode=engine.demo_mode,
     )
     fixed = _fix_text(payload.model_dump())
-    return JSONResponse(content=fixed)
+    return _json_bytes(fixed)
 
 
 @app.post("/api/simulate")
-def simulate(req: SimulateRequest):
-    time, baseline, simulation = engine.simulate(req.params, req.subscripts)
+async def simulate(req: SimulateRequest, request: Request, mode: Literal["exact", "approx"] = "exact"):
+    if req.layout == "cube" and mode == "approx":
+        raise HTTPException(status_code=400, detail="layout=cube is only available in exact mode")
+    if req.aggregates and mode == "approx":
+        raise HTTPException(status_code=400, detail="aggregates are only available in exact mode")
+    if _moves_horizon(req) and mode == "approx":
+        raise HTTPException(status_code=400, detail="initial_time, final_time and stop_when are only available in exact mode")
+    horizon = _check_request(req, req.params)
+    # ижил зэрэг хүсэлтүүд admission slot ч эзлэхгүйгээр эхнийхийн хариуг хүлээнэ
+    cancelled = _begin_session(req)
+    key = ("simulate", mode) + _request_key(req, req.params, horizon)
+    result = await flights.do(key, lambda shared: _simulate(req, mode, horizon, shared), cancelled)
+    if req.layout == "cube":
+        return _respond(request, result, CubePayload)
+    return _respond(request, result, ApproxSeriesPayload if mode == "approx" else SeriesPayload)
+
+
+def _request_key(req: SimulateRequest, params: Dict[str, float], horizon: Horizon | None) -> Tuple[Any, ...]:
+    # cube хариу subscript сонголтоос хамаарахгүй
+    picks = {} if req.layout == "cube" else req.subscripts
+    aggregates = tuple(a.model_dump_json() for a in req.aggregates)
+    times = horizon.key() if horizon is not None else ()
+    return (req.layout, aggregates, times) + engine.request_key(params, picks, req.outputs)
+
+
+def _horizon(req: SimulateRequest, params: Dict[str, float]) -> Horizon | None:
+    """Хүсэлтийн хугацааны цонх, эхлэх/дуусах он, зогсох нөхцөл; None = model-ийн бүтэн run."""
+    return engine.horizon(
+        req.time_start, req.time_end, req.stride, req.return_timestamps,
+        req.initial_time, req.final_time, req.stop_when, params,
+    )
+
+
+def _timestamps(horizon: Horizon | None) -> List[float] | None:
+    """Хугацааны цонхны онууд; None = бүх он."""
+    return horizon.timestamps if horizon is not None else None
+
+
+def _moves_horizon(req: SimulateRequest) -> bool:
+    # emulator ба stream нь model-ийн өөрийн хугацаагаар л бодно
+    return req.initial_time is not None or req.final_time is not None or bool(req.stop_when)
+
+
+def _check_request(req: SimulateRequest, params: Dict[str, float]) -> Horizon | None:
+    """
+    Буруу aggregate spec (dim, утга, output), хугацааны цонх эсвэл зогсох нөхцөл -> 400, slot эзлэхээс өмнө.
+    Returns the request's Horizon, built once here so the cache key and the run use the same one.
+    """
+    try:
+        horizon = _horizon(req, params)
+        if req.aggregates:
+            engine.aggregate_plan(req.aggregates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return horizon
+
+
+async def _simulate(req: SimulateRequest, mode: str, horizon: Horizon | None, cancelled):
+    async with sim_gate.slot(cancelled):
+        return await run_in_threadpool(_simulate_run, req, mode, horizon, cancelled)
+
+
+def _simulate_run(req: SimulateRequest, mode: str, horizon: Horizon | None, cancelled) -> Dict[str, Any]:
+    # run-ийн үеийн ValueError (worker процессоос ч) -> 400, бусад endpoint-той ижил
+    try:
+        result = _simulate_result(req, mode, cancelled, horizon)
+        if req.aggregates:
+            # series-тэй ижил (cache-д буй) run-аас
+            result["aggregates"] = engine.aggregate(req.aggregates, req.params, cancelled, horizon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+
+def _simulate_result(req: SimulateRequest, mode: str, cancelled, horizon: Horizon | None) -> Dict[str, Any]:
+    # series нь NumPy массиваар; JSON эсэхийг _respond хүсэлт бүрээр шийднэ
+    if req.layout == "cube":
+        time, dims, baseline, simulation, stopped = engine.simulate_cube(req.params, req.outputs, cancelled, horizon)
+        return {"time": time, "dims": dims, "baseline": baseline, "simulation": simulation, "stopped": stopped}
+    applied = engine.applied_subscripts_per_output(req.subscripts, req.outputs)
+    if mode == "approx":
+        # slider чирэх үед: emulator-оос хэдэн ms-д; бэлэн болтол exact run
+        approx = engine.simulate_approx(req.params, req.subscripts, req.outputs, _timestamps(horizon))
+        if approx is not None:
+            time, baseline, simulation, error = approx
+            return {
+                "time": time,
+                "baseline": baseline,
+                "simulation": simulation,
+                "applied_subscripts": applied,
+                "approx": True,
+                "error": error,
+            }
+        time, baseline, simulation, _ = engine.simulate(req.params, req.subscripts, req.outputs, cancelled, True, horizon)
+        return {
+            "time": time,
+            "baseline": baseline,
+            "simulation": simulation,
+            "applied_subscripts": applied,
+            "approx": False,
+            "error": {},
+        }
+
+    time, baseline, simulation, stopped = engine.simulate(req.params, req.subscripts, req.outputs, cancelled, True, horizon)
+    return {
+        "time": time,
+        "baseline": baseline,
+        "simulation": simulation,
+        "applied_subscripts": applied,
+        "stopped": stopped,
+    }
+
+
+@app.get("/api/emulator")
+def emulator_status():
+    """Surrogate-ийн төлөв ба exact run-тай харьцуулсан validation metrics."""
+    return engine.emulator.status()
+
+
+@app.post("/api/simulate_stream")
+async def simulate_stream(req: SimulateStreamRequest, request: Request):
+    """
+    Baseline-ийг эхэлж, дараа нь simulation-ийг алхам бүрээр илгээнэ.
+    NDJSON by default; Server-Sent Events when the client asks for
+    ``Accept: text/event-stream``. A failure after the first event can no
+    longer change the status code, so it is sent as an ``error`` event.
+    The simulation slot is held until the stream ends (or the client leaves);
+    a newer request of the same session ends it with a ``superseded`` event.
+    """
+    if req.layout == "cube" or req.aggregates:
+        raise HTTPException(status_code=400, detail="layout=cube and aggregates are not available for streaming")
+    if _moves_horizon(req):
+        raise HTTPException(status_code=400, detail="initial_time, final_time and stop_when are not available for streaming")
+    horizon = _check_request(req, req.params)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    cancelled = _begin_session(req)
+    await sim_gate.acquire(cancelled)
+    started = _time.perf_counter()
+
+    events = engine.simulate_stream(req.params, req.subscripts, req.outputs, req.chunk, _timestamps(horizon))
+
+    def release():
+        sim_gate.record_service(_time.perf_counter() - started)
+        sim_gate.release()
+        try:
+            # орхисон stream-ийн PySD run-ийг (producer thread) зогсоож model lock-ийг суллана
+            events.close()
+        except ValueError:
+            pass
+
+    async def body():
+        try:
+            async for event in iterate_in_threadpool(events):
+                if cancelled():
+                    sessions.aborted += 1
+                    event = {"type": "superseded"}
+                    yield f"event: superseded\ndata: {json.dumps(event)}\n\n" if sse else json.dumps(event) + "\n"
+                    events.close()
+                    break
+                data = json.dumps(event, ensure_ascii=False)
+                yield f"event: {event['type']}\ndata: {data}\n\n" if sse else data + "\n"
+        except Exception as e:
+            logging.getLogger(__name__).exception("Streaming simulation failed")
+            data = json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False)
+            yield f"event: error\ndata: {data}\n\n" if sse else data + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
+
+
+def _batch_result(req: SimulateBatchRequest, progress=None) -> Dict[str, Any]:
+    time, baseline, simulations = engine.simulate_batch(req.scenarios, req.subscripts, progress)
     applied = engine.applied_subscripts_per_output(req.subscripts)
 
-    return SeriesPayload(
-        time=time,
-        baseline=baseline,
-        simulation=simulation,
-        applied_subscripts=applied,
+    return {
+        "time": time,
+        "baseline": baseline,
+        "simulations": simulations,
+        "applied_subscripts": applied,
+    }
+
+
+def _batch_payload(req: SimulateBatchRequest, progress=None) -> SeriesBatchPayload:
+    return SeriesBatchPayload(**_batch_result(req, progress))
+
+
+def _sensitivity_payload(req: SensitivityRequest, progress=None) -> SensitivityPayload:
+    keys = req.sliders or [s.key for s in SLIDERS]
+    runs = run_count(req.method, req.samples, len(keys))
+    if runs > settings.ANALYSIS_MAX_RUNS:
+        raise ValueError(f"{runs} runs requested, the limit is {settings.ANALYSIS_MAX_RUNS}")
+    result = run_sensitivity(
+        engine,
+        SLIDERS,
+        keys,
+        req.method,
+        req.samples,
+        req.seed,
+        req.params,
+        req.subscripts,
+        req.outputs,
+        progress,
     )
+    return SensitivityPayload(**result)
+
+
+def _ensemble_result(req: EnsembleRequest, progress=None) -> Dict[str, Any]:
+    if req.samples > settings.ANALYSIS_MAX_RUNS:
+        raise ValueError(f"{req.samples} runs requested, the limit is {settings.ANALYSIS_MAX_RUNS}")
+    result = run_ensemble(
+        engine,
+        SLIDERS,
+        req.distributions,
+        req.samples,
+        req.seed,
+        req.percentiles,
+        req.params,
+        req.subscripts,
+        req.outputs,
+        progress,
+    )
+    _, baseline = engine.get_baseline_filtered(req.subscripts, req.outputs, as_arrays=True)
+    return dict(result, baseline=baseline)
+
+
+def _ensemble_payload(req: EnsembleRequest, progress=None) -> EnsemblePayload:
+    return EnsemblePayload(**wire.as_lists(_ensemble_result(req, progress)))
+
+
+def _sweep_payload(req: SweepRequest, progress=None) -> SweepPayload:
+    result = run_sweep(
+        engine,
+        SLIDERS,
+        req.axes,
+        req.summary,
+        req.year,
+        req.params,
+        req.subscripts,
+        req.outputs,
+        settings.ANALYSIS_MAX_RUNS,
+        settings.SWEEP_INLINE_MAX_POINTS,
+        settings.CACHE_DIR,
+        progress,
+    )
+    return SweepPayload(**result)
+
+
+@app.post("/api/simulate_batch", response_model=SeriesBatchPayload)
+@admitted(sim_gate)
+def simulate_batch(req: SimulateBatchRequest, request: Request):
+    return _respond(request, _batch_result(req), SeriesBatchPayload)
+
+
+@app.post("/api/sensitivity", response_model=SensitivityPayload)
+@admitted(sim_gate)
+def sensitivity(req: SensitivityRequest):
+    try:
+        return _sensitivity_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/ensemble", response_model=EnsemblePayload)
+@admitted(sim_gate)
+def ensemble(req: EnsembleRequest, request: Request):
+    try:
+        return _respond(request, _ensemble_result(req), EnsemblePayload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/sweep", response_model=SweepPayload)
+@admitted(sim_gate)
+def sweep(req: SweepRequest):
+    try:
+        return _sweep_payload(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Урт ажлууд: HTTP timeout-оос хамаарахгүй, тусдаа thread pool дээр
+jobs = JobManager(settings.CACHE_DIR, settings.JOB_WORKERS, settings.JOB_TTL_HOURS * 3600)
+jobs.register("simulate_batch", SimulateBatchRequest, _batch_payload)
+jobs.register("sensitivity", SensitivityRequest, _sensitivity_payload)
+jobs.register("ensemble", EnsembleRequest, _ensemble_payload)
+jobs.register("sweep", SweepRequest, _sweep_payload)
+
+
+@app.on_event("startup")
+def _start_jobs():
+    jobs.start()
+
+
+@app.on_event("shutdown")
+def _shutdown_jobs():
+    jobs.shutdown()
+
+
+@app.post("/api/jobs", response_model=JobStatus, status_code=202)
+def create_job(req: JobRequest):
+    try:
+        return jobs.submit(req.kind, req.spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return status
+
+
+@app.get("/api/jobs/{job_id}/result")
+def job_result(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if status["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    path = jobs.result_file(job_id)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Job result expired")
+    return FileResponse(path, media_type="application/json")
+
+
+@app.get("/api/sweep/{result_id}")
+def sweep_result(result_id: str):
+    # зөвхөн run_sweep-ийн үүсгэсэн uuid hex нэр
+    if not re.fullmatch(r"[0-9a-f]{32}", result_id):
+        raise HTTPException(status_code=404, detail="Unknown sweep result")
+    path = sweep_file(settings.CACHE_DIR, result_id)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Unknown sweep result")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"sweep-{result_id}.npy")
 
 
 @app.post("/api/reset")
-def reset(req: SimulateRequest):
-    time, baseline = engine.get_baseline_filtered(req.subscripts)
-    applied = engine.applied_subscripts_per_output(req.subscripts)
+async def reset(req: SimulateRequest, request: Request):
+    # reset нь параметрээс хамаарахгүй; мөн тухайн session-ий хуучин run-уудыг орхиулна
+    horizon = _check_request(req, {})
+    _begin_session(req)
+    if wire.negotiate(request.headers.get("accept", "")) is None:
+        # POST тул 304 биш, гэхдээ бэлэн шахсан байтыг л буцаана
+        return (await _baseline_prebuilt(req, horizon)).response(request, conditional=False)
+    key = ("reset",) + _request_key(req, {}, horizon)
+    result = await flights.do(key, lambda _: _run_reset(horizon, lambda: _reset(req, horizon)))
+    return _respond(request, result, CubePayload if req.layout == "cube" else SeriesPayload)
+
+
+@app.get("/api/baseline")
+async def baseline(
+    request: Request,
+    subscripts: str = "{}",
+    outputs: list[str] | None = Query(None),
+    layout: Literal["series", "cube"] = "series",
+    time_start: float | None = None,
+    time_end: float | None = None,
+    stride: int = 1,
+    return_timestamps: list[float] | None = Query(None),
+    initial_time: float | None = None,
+    final_time: float | None = None,
+):
+    """
+    /api/reset-ийн GET хувилбар (``subscripts`` нь JSON мөр). Хөтөч ETag-аар
+    дахин шалгахад өөрчлөгдөөгүй бол 304.
+    """
+    try:
+        req = SimulateRequest(
+            subscripts=json.loads(subscripts),
+            outputs=outputs,
+            layout=layout,
+            time_start=time_start,
+            time_end=time_end,
+            stride=stride,
+            return_timestamps=return_timestamps,
+            initial_time=initial_time,
+            final_time=final_time,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    horizon = _check_request(req, {})
+    return (await _baseline_prebuilt(req, horizon)).response(request)
+
+
+async def _baseline_prebuilt(req: SimulateRequest, horizon: Horizon | None):
+    key = ("baseline",) + _request_key(req, {}, horizon)
+    item = prebuilt.peek(key)
+    if item is not None:
+        return item
+
+    def build() -> bytes:
+        return wire.json_bytes(_reset(req, horizon), CubePayload if req.layout == "cube" else SeriesPayload)
+
+    return await flights.do(key, lambda _: _run_reset(horizon, lambda: prebuilt.get(key, build)))
+
+
+async def _run_reset(horizon: Horizon | None, build: Callable[[], Any]) -> Any:
+    # FINAL TIME-аас хойших baseline нь model run: /api/simulate-тэй ижил sim_gate slot-д
+    if engine.baseline_needs_run(_timestamps(horizon)):
+        async with sim_gate.slot():
+            return await run_in_threadpool(build)
+    return await run_in_threadpool(build)
+
+
+def _reset(req: SimulateRequest, horizon: Horizon | None) -> Dict[str, Any]:
+    result = _reset_result(req, _timestamps(horizon))
+    if req.aggregates:
+        result["aggregates"] = engine.aggregate(req.aggregates, horizon=horizon)
+    return result
+
+
+def _reset_result(req: SimulateRequest, times: List[float] | None) -> Dict[str, Any]:
+    if req.layout == "cube":
+        time, dims, baseline = engine.get_baseline_cube(req.outputs, times)
+        simulation = {k: [] for k in engine.output_keys(req.outputs)}
+        return {"time": time, "dims": dims, "baseline": baseline, "simulation": simulation}
+
+    time, baseline = engine.get_baseline_filtered(req.subscripts, req.outputs, as_arrays=True, timestamps=times)
+    applied = engine.applied_subscripts_per_output(req.subscripts, req.outputs)
 
     # reset үед simulation-ийг baseline-тэй адил биш, хоосон болгоно
-    simulation = {k: [] for k in OUTPUT_KEYS}
+    simulation = {k: [] for k in engine.output_keys(req.outputs)}
 
-    return SeriesPayload(
-        time=time,
-        baseline=baseline,
-        simulation=simulation,
-        applied_subscripts=applied,
-    )
+    return {
+        "time": time,
+        "baseline": baseline,
+        "simulation": simulation,
+        "applied_subscripts": applied,
+    }
 
 
 @app.post("/api/explain", response_model=ExplainResponse)
+@admitted(llm_gate)
 def explain(req: ExplainRequest):
     if not settings.OPENAI_API_KEY:
         return ExplainResponse(text_mn="AI API key тохируулаагүй байна.")
@@ -423,6 +939,7 @@ def _build_chat_context(req: ChatGraphRequest) -> Dict[str, Any]:
 
 
 @app.post("/api/chat_graph", response_model=ChatGraphResponse)
+@admitted(llm_gate)
 def chat_graph(req: ChatGraphRequest):
     year_range = _extract_year_range(req.question)
     if year_range and req.series:
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pysd
+except Exception:
+    pysd = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def _pysd_version() -> str:
+    return str(getattr(pysd, "__version__", ""))
+
+
+def translation_stamp_path(mdl_path: Path) -> Path:
+    # models/foo.mdl -> models/foo.translation.json
+    return mdl_path.with_suffix(".translation.json")
+
+
+def _read_stamp(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def write_translation_stamp(mdl_path: Path, mdl_hash: str) -> None:
+    stamp = {"mdl_sha256": mdl_hash, "pysd_version": _pysd_version(), "py_file": mdl_path.with_suffix(".py").name}
+    try:
+        translation_stamp_path(mdl_path).write_text(json.dumps(stamp, indent=2) + "\n", encoding="utf-8")
+    except OSError as e:
+        # read-only deploy dirs: the next boot just translates again
+        logger.warning("Could not write translation stamp: %s", e)
+
+
+def load_translated_model(model_path: str, mdl_hash: str) -> Tuple[Any, bool]:
+    """
+    .mdl-ийн hash таарвал хажууд нь байгаа .py-г pysd.load-оор шууд ачаална,
+    үгүй бол pysd.read_vensim-ээр дахин орчуулж stamp-ийг шинэчилнэ.
+
+    Returns ``(model, reused)``.
+    """
+    path = Path(model_path).expanduser()
+    if path.suffix.lower() == ".py":
+        return pysd.load(str(path)), True
+
+    py_path = path.with_suffix(".py")
+    stamp = _read_stamp(translation_stamp_path(path))
+    if py_path.exists() and stamp.get("mdl_sha256") == mdl_hash and stamp.get("pysd_version") == _pysd_version():
+        try:
+            return pysd.load(str(py_path)), True
+        except Exception as e:
+            logger.warning("Cached translation %s failed to load, retranslating: %s", py_path.name, e)
+
+    model = pysd.read_vensim(str(path))
+    write_translation_stamp(path, mdl_hash)
+    return model, False
+
+
+# ---- baseline snapshot ---------------------------------------------------
+
+def _snapshot_stem(model_hash: str, name: str = "baseline") -> str:
+    version = _pysd_version().replace(".", "_") or "none"
+    return f"{name}-{model_hash[:16]}-pysd{version}"
+
+
+def load_baseline_snapshot(cache_dir: str, model_hash: str, name: str = "baseline") -> pd.DataFrame | None:
+    """
+    Хадгалсан baseline-ийг memory-map хийж уншина. Model hash эсвэл PySD
+    хувилбар өөр бол файлын нэр таарахгүй тул None буцна. ``name``: өөр
+    default-аас тогтох run (жишээ нь kernel-ийн шалгах run).
+    """
+    base = Path(cache_dir).expanduser() / _snapshot_stem(model_hash, name)
+    meta_path, values_path = base.with_suffix(".json"), base.with_suffix(".npy")
+    if not meta_path.exists() or not values_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        values = np.load(values_path, mmap_mode="r")
+        index, columns = meta["index"], meta["columns"]
+        if values.shape != (len(index), len(columns)):
+            raise ValueError(f"shape {values.shape} does not match metadata")
+        return pd.DataFrame(
+            values,
+            index=pd.Index(index, name=meta.get("index_name")),
+            columns=columns,
+            copy=False,
+        )
+    except Exception as e:
+        logger.warning("Baseline snapshot %s is unreadable, rebuilding: %s", base.name, e)
+        return None
+
+
+def save_baseline_snapshot(cache_dir: str, model_hash: str, df: pd.DataFrame, name: str = "baseline") -> None:
+    folder = Path(cache_dir).expanduser()
+    stem = _snapshot_stem(model_hash, name)
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        values = np.ascontiguousarray(df.to_numpy(dtype=float))
+        meta = {
+            "index": [float(x) for x in df.index.values.tolist()],
+            "index_name": df.index.name,
+            "columns": [str(c) for c in df.columns],
+        }
+        # write to temp names first so a half-written snapshot is never picked up
+        tmp_values = folder / f"{stem}.tmp.npy"
+        tmp_meta = folder / f"{stem}.tmp.json"
+        np.save(tmp_values, values)
+        tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_values, folder / f"{stem}.npy")
+        os.replace(tmp_meta, folder / f"{stem}.json")
+        for old in folder.glob(f"{name}-*"):
+            if not old.name.startswith(stem):
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning("Could not write baseline snapshot: %s", e)
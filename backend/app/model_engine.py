@@ -1,15 +1,46 @@
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Callable, Iterator
+import hashlib
+import logging
+import queue
+import threading
+import time as _time
+from itertools import islice
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
 from .config import settings
-from .utils import file_exists
+from .utils import file_exists, file_sha256
+from .cache import ResultCache, canonical_params, params_key, frame_nbytes
+from .model_cache import load_translated_model, load_baseline_snapshot, save_baseline_snapshot
 from .demo_data import demo_time_series, demo_baseline_and_sim, demo_available_subscripts
+from .kernel import CompiledModel, KernelUnsupported, CONTROL_COLUMNS
+from .columns import ColumnIndex
+from .aggregate import AggregatePlan
+from .influence import earliest_influence, integ_stocks
+from .workers import SimulationPool, WorkerPoolError
+from .emulator import Emulator
+from .admission import Superseded
+from .horizon import Horizon, StopPlan, time_mask
 
 try:
     import pysd
 except Exception:
     pysd = None
 
+try:
+    import xarray as xr
+except Exception:
+    xr = None
+
+try:
+    # алхам алхмаар ажиллуулах (set_stepper/step) үеийн гаралт
+    from pysd.py_backend.output import DataFrameHandler, ModelOutput
+except Exception:
+    DataFrameHandler = ModelOutput = None
+
+
+logger = logging.getLogger(__name__)
 
 TOTAL_HERD_KEY = "herd_total_total"
 OUTPUT_KEYS = ["herd_total", "births", "losses", "sold_used", TOTAL_HERD_KEY]
@@ -34,6 +65,21 @@ PARAM_MAP_DEFAULT: Dict[str, str] = {
     "disaster_freq": "Байгалийн гамшгийн давтамж",
 }
 
+# хадгалах хөрвүүлсэн aggregate spec-ийн тоо (дүүрвэл цэвэрлэнэ)
+MAX_AGGREGATE_PLANS = 64
+
+# simulate_batch: нэг удаад kernel-ээр интегралчлах сценарийн дээд тоо (санах ойн хязгаар)
+BATCH_CHUNK = 256
+
+
+def _batched(rows: Iterator[np.ndarray], size: int) -> Iterator[np.ndarray]:
+    # [size, column] blocks; the last one may be shorter
+    while True:
+        block = list(islice(rows, size))
+        if not block:
+            return
+        yield np.stack(block)
+
 
 class ModelEngine:
     def __init__(self):
@@ -46,6 +92,33 @@ class ModelEngine:
         self._baseline_df: pd.DataFrame | None = None
         self._baseline_time: List[float] = []
         self._available_subscripts: Dict[str, List[Dict[str, Any]]] = {}
+        # (vensim_var, subscript сонголт) -> баганын байрлал; _column_index() бүтээнэ
+        self._index: ColumnIndex | None = None
+        self._index_df: pd.DataFrame | None = None
+        # model-ийн анхны параметр утгууд (run(params=...) нь утгыг хадгалж үлдээдэг тул)
+        self._param_defaults: Dict[str, Any] = {}
+        # model-ийн FINAL TIME (return_timestamps-тай run PySD-д final_time-ийг үлдээдэг тул)
+        self._final_time: float | None = None
+        self.kernel: CompiledModel | None = None
+        self.pool: SimulationPool | None = None
+        self.model_hash: str = ""
+        self.sliders: List[Any] = []
+        self.result_cache = ResultCache(
+            settings.SIM_CACHE_ENTRIES,
+            int(settings.SIM_CACHE_MAX_MB * 1024 * 1024),
+        )
+        # параметр бүр динамик хувьсагчид нөлөөлж эхлэх хугацаа (түүхэн хэсгийг дахин ашиглах)
+        self._influence: Dict[str, float] = {}
+        self._param_columns: Dict[str, List[str]] = {}
+        # stock Vensim нэр -> (coords, dims, baseline баганууд)
+        self._stock_columns: Dict[str, Tuple[Dict[str, List[str]], List[str], List[str]]] = {}
+        # PySD model нь төлөвтэй тул нэг процесс дотор зэрэг run хийхгүй
+        self._model_lock = threading.Lock()
+        # mode=approx: slider-уудаас output руу сургасан surrogate (арын thread-д сургана)
+        self.emulator = Emulator(settings.EMULATOR_AXIS_POINTS, settings.EMULATOR_VALIDATION, settings.CACHE_DIR)
+        self._approx_index: Tuple[Any, ColumnIndex] | None = None
+        # (ColumnIndex, spec JSON -> AggregatePlan): index солигдвол хоосорно
+        self._plans: Tuple[ColumnIndex, Dict[Tuple[str, ...], AggregatePlan]] | None = None
 
     def load(self) -> None:
         # Auto demo if no pysd or file missing
@@ -61,18 +134,37 @@ class ModelEngine:
             return
 
         try:
-            self.model = pysd.read_vensim(settings.MODEL_PATH)
+            t0 = _time.perf_counter()
+            self.model_hash = file_sha256(settings.MODEL_PATH)
+            self.model, reused = load_translated_model(settings.MODEL_PATH, self.model_hash)
+            self._final_time = self._read_final_time()
+            t_model = _time.perf_counter() - t0
             # time unit label (best-effort)
             time_obj = getattr(self.model, "time", None)
             units = getattr(time_obj, "units", None)
             self.time_unit_label = str(units) if units is not None else "TIME"
 
-            # baseline run
-            self._baseline_df = self.model.run()
-            if self._baseline_df is None:
-                raise RuntimeError("Model run returned None")
+            # baseline run (эсвэл өмнө хадгалсан snapshot)
+            self._baseline_df = load_baseline_snapshot(settings.CACHE_DIR, self.model_hash)
+            snapshot_hit = self._baseline_df is not None
+            if not snapshot_hit:
+                self._baseline_df = self.model.run()
+                if self._baseline_df is None:
+                    raise RuntimeError("Model run returned None")
+                save_baseline_snapshot(settings.CACHE_DIR, self.model_hash, self._baseline_df)
             self._baseline_time = self._extract_time(self._baseline_df)
+            self._param_defaults = self._read_param_defaults()
+            self._prepare_resume()
             self.demo_mode = False
+            logger.info(
+                "Model %s in %.2fs (translation %s), baseline %.2fs (%s)",
+                Path(settings.MODEL_PATH).name,
+                t_model,
+                "reused" if reused else "rebuilt",
+                _time.perf_counter() - t0 - t_model,
+                "snapshot" if snapshot_hit else "model run",
+            )
+            self.kernel = self._compile_kernel() if settings.SIM_ENGINE == "numpy" else None
 
             # subscripts detect using get_coords (PySD docs) :contentReference[oaicite:7]{index=7}
             self._available_subscripts = self._detect_subscripts()
@@ -81,6 +173,655 @@ class ModelEngine:
             # Any model translation/run crash -> demo
             self.demo_mode = True
             self._prime_demo()
+            return
+
+        if settings.SIM_WORKERS > 0:
+            self._start_pool()
+        self.emulator.refresh(self)
+
+    def load_worker(self, py_model_file: str, model_hash: str = "", use_kernel: bool = False) -> None:
+        """
+        Process pool worker: open the already translated model, skip the baseline run.
+        ``use_kernel``: the parent verified the NumPy kernel (False = it fell back to PySD).
+        """
+        self.model = pysd.load(py_model_file)
+        self.model_hash = model_hash
+        self._final_time = self._read_final_time()
+        self._param_defaults = self._read_param_defaults()
+        # the parent has written the snapshot by now; without it PySD runs start from scratch
+        self._baseline_df = load_baseline_snapshot(settings.CACHE_DIR, model_hash) if model_hash else None
+        self._prepare_resume()
+        self.demo_mode = False
+        if use_kernel:
+            # parent нь override-уудыг ч шалгасан; энд энэ процессын compile-ийг snapshot-тай тулгана
+            try:
+                if self._baseline_df is None:
+                    raise KernelUnsupported("no baseline snapshot to verify against")
+                self.kernel = CompiledModel(self.model)
+                self.kernel.verify(self._baseline_df)
+            except KernelUnsupported as e:
+                logger.warning("NumPy kernel disabled in worker, using PySD: %s", e)
+                self.kernel = None
+
+    def _start_pool(self) -> None:
+        py_file = getattr(self.model, "py_model_file", None)
+        if not py_file:
+            return
+        try:
+            pool = SimulationPool(
+                settings.SIM_WORKERS,
+                settings.SIM_WORKER_MAX_RUNS,
+                str(Path(py_file).resolve()),
+                self.model_hash,
+                self.kernel is not None,
+            )
+            pool.start()
+            self.pool = pool
+        except Exception as e:
+            logger.warning("Simulation worker pool not started, running in-process: %s", e)
+            self.pool = None
+
+    def set_sliders(self, sliders: List[Any]) -> None:
+        """SliderDef жагсаалт: кэшийн түлхүүрийг min/max/step-ээр нормчлоход хэрэглэнэ."""
+        self.sliders = list(sliders)
+        self.emulator.refresh(self)
+
+    def canonical_params(self, params: Dict[str, float]) -> Dict[str, float]:
+        return canonical_params(params, self.sliders)
+
+    def _simulate_full(self, params: Dict[str, float], columns: List[str] | None = None, cancelled: Callable[[], bool] | None = None, horizon: Horizon | None = None) -> pd.DataFrame:
+        if horizon is not None and horizon.stop is not None and columns is not None:
+            # зогсох нөхцөлийн баганууд run-д байх ёстой
+            wanted = set(columns) | set(horizon.stop.columns)
+            columns = [c for c in self._column_index().columns if c in wanted]
+        key = self._result_key(params, columns, horizon)
+        keys = [key]
+        if columns is not None:
+            # ижил run бүх баганатайгаар cache-д байж болно
+            keys.append(self._result_key(params, None, horizon))
+        full = []
+        if horizon is not None and horizon.initial_time is None and horizon.ends_by(self._baseline_time[-1]):
+            # бүтэн хугацааны run cache-д байвал мөрүүдийг нь л авна (зогсох онд тасалж)
+            full = [self._result_key(params, cols) for cols in ([None] if columns is None else [None, columns])]
+        # нэг логик хайлт: hit/miss-ийг нэг л удаа тоолно
+        found, df = self.result_cache.get_first(keys + full)
+        if found in full:
+            return horizon.finish(df)
+        if df is None:
+            df = self._run_model(self._to_overrides(params), columns, cancelled, horizon)
+            self.result_cache.put(key, df, frame_nbytes(df))
+        return df
+
+    def _result_key(self, params: Dict[str, float], columns: List[str] | None, horizon: Horizon | None = None) -> Tuple[Any, ...]:
+        # columns=None keeps the full frame, so a subscript change is served from
+        # cache; a projected run is cached under its own column set
+        key = params_key(self.model_hash, params)
+        if columns is not None:
+            key = key + (tuple(columns),)
+        if horizon is not None:
+            key = key + (("horizon",) + horizon.key(),)
+        return key
+
+    def select_times(
+        self,
+        time_start: float | None = None,
+        time_end: float | None = None,
+        stride: int = 1,
+        return_timestamps: List[float] | None = None,
+        initial_time: float | None = None,
+        final_time: float | None = None,
+    ) -> List[float] | None:
+        """
+        Хүсэлтийн хугацааны цонх -> хадгалсан онуудын дэд жагсаалт.
+        None = baseline-ийн бүх он (хязгаарлалтгүй). ``return_timestamps`` must
+        be saved times; otherwise the rows in [time_start, time_end], every
+        ``stride``-th. ``initial_time``/``final_time`` move the horizon itself
+        (see _saved_times). Raises ValueError for an empty window or a time
+        the model does not save.
+        """
+        times = self._saved_times(initial_time, final_time)
+        if return_timestamps is not None:
+            if time_start is not None or time_end is not None or stride != 1:
+                raise ValueError("Use either return_timestamps or time_start/time_end/stride")
+            rows = self._time_rows(return_timestamps, times)
+            rows = np.unique(rows)
+        else:
+            lo = times[0] if time_start is None else time_start
+            hi = times[-1] if time_end is None else time_end
+            rows = np.nonzero((times >= lo - 1e-9) & (times <= hi + 1e-9))[0][::max(1, int(stride))]
+        if not len(rows):
+            raise ValueError(f"No saved time in the requested window ({times[0]:g}-{times[-1]:g})")
+        selected = times[rows]
+        base = np.asarray(self._baseline_time, dtype=float)
+        if len(selected) == len(base) and np.allclose(selected, base):
+            return None
+        return selected.tolist()
+
+    def _saved_times(self, initial_time: float | None = None, final_time: float | None = None) -> np.ndarray:
+        """
+        Хүрээний хадгалсан онууд: baseline-ийн онууд, ``final_time`` хүртэл
+        таслах эсвэл ижил SAVEPER-ээр сунгаж (SIM_MAX_FINAL_TIME хүртэл),
+        ``initial_time``-аас эхлэн. ``initial_time`` must be a saved year of the
+        baseline, whose stock the run starts from.
+        """
+        if self._baseline_df is None:
+            self._prime_demo()
+        base = np.asarray(self._baseline_time, dtype=float)
+        times = base
+        if final_time is not None:
+            if final_time > base[-1] + 1e-9:
+                if self.demo_mode or self.model is None or len(base) < 2:
+                    raise ValueError(f"final_time after {base[-1]:g} needs the model")
+                if final_time > settings.SIM_MAX_FINAL_TIME:
+                    raise ValueError(f"final_time must not be after {settings.SIM_MAX_FINAL_TIME:g}")
+                step = base[-1] - base[-2]
+                n = int(np.floor((final_time - base[-1]) / step + 1e-9))
+                times = np.concatenate([base, np.round(base[-1] + step * np.arange(1, n + 1), 9)])
+            else:
+                times = base[base <= final_time + 1e-9]
+        if initial_time is not None:
+            if not np.isclose(base, initial_time).any():
+                raise ValueError(f"initial_time must be a saved year of the baseline ({base[0]:g}-{base[-1]:g})")
+            if not np.isclose(initial_time, base[0]) and not self._stock_columns:
+                raise ValueError("initial_time needs the model's stock state (SIM_REUSE_PREFIX)")
+            times = times[times >= initial_time - 1e-9]
+        if not len(times):
+            raise ValueError("final_time must be after initial_time")
+        return times
+
+    def horizon(
+        self,
+        time_start: float | None = None,
+        time_end: float | None = None,
+        stride: int = 1,
+        return_timestamps: List[float] | None = None,
+        initial_time: float | None = None,
+        final_time: float | None = None,
+        stop_when: List[Any] | None = None,
+        params: Dict[str, float] | None = None,
+    ) -> Horizon | None:
+        """
+        Хүсэлтийн хугацааны сонголт -> Horizon; None = model-ийн өөрийн бүтэн
+        хугацаа, зогсох нөхцөлгүй. Invalid choices raise ValueError, as do
+        ``params`` that take effect before ``initial_time``.
+        """
+        timestamps = self.select_times(time_start, time_end, stride, return_timestamps, initial_time, final_time)
+        if initial_time is not None and np.isclose(initial_time, self._baseline_time[0]):
+            initial_time = None
+        if initial_time is not None and params:
+            early = self._acts_before(params, initial_time)
+            if early:
+                first = min(early.values())
+                raise ValueError(
+                    f"initial_time {initial_time:g} starts from the baseline stock, but "
+                    f"{', '.join(early)} already act{'s' if len(early) == 1 else ''} from {first:g}: "
+                    f"leave {'it' if len(early) == 1 else 'them'} out or start at {first:g} or earlier"
+                )
+        stop = StopPlan(stop_when, self._column_index(), OUTPUT_KEYS) if stop_when else None
+        if timestamps is None and initial_time is None and stop is None:
+            return None
+        grid = None
+        if stop is not None:
+            # зогсох нөхцөлийг хүрээний (сүүлийн буцаах он хүртэлх) он бүрт шалгана
+            times = self._saved_times(initial_time, final_time)
+            if timestamps is not None:
+                times = times[times <= timestamps[-1] + 1e-9]
+            base = np.asarray(self._baseline_time, dtype=float)
+            if len(times) != len(base) or not np.allclose(times, base):
+                grid = times.tolist()
+        return Horizon(timestamps, grid, initial_time, stop)
+
+    def _acts_before(self, params: Dict[str, float], initial_time: float) -> Dict[str, float]:
+        """
+        Slider key -> the year it first takes effect (earliest_influence), for
+        values that differ from the model's and act before ``initial_time``;
+        a run from that year's baseline stock would silently drop that part.
+        """
+        out: Dict[str, float] = {}
+        for key, value in self.canonical_params(params).items():
+            vname = self.param_map.get(key, key)
+            try:
+                if np.all(np.asarray(self._param_defaults.get(vname)) == value):
+                    continue
+            except Exception:
+                pass
+            # нөлөө нь тодорхойгүй параметр: эхнээс нь гэж үзнэ
+            start = self._influence.get(vname, self._baseline_time[0])
+            if start < initial_time - 1e-9:
+                out[key] = float(start)
+        return out
+
+    def _time_rows(self, timestamps: List[float], times: np.ndarray | None = None) -> np.ndarray:
+        """Хадгалсан он бүрийн ``times`` (baseline time) дахь мөрийн дугаар; байхгүй он бол ValueError."""
+        times = np.asarray(self._baseline_time if times is None else times, dtype=float)
+        wanted = np.asarray(timestamps, dtype=float)
+        rows = np.minimum(np.searchsorted(times, wanted - 1e-9), max(len(times) - 1, 0))
+        missing = ~np.isclose(times[rows], wanted) if len(times) else np.ones(len(wanted), dtype=bool)
+        if missing.any():
+            raise ValueError(f"Not a saved time: {', '.join(f'{t:g}' for t in wanted[missing])}")
+        return rows
+
+    def baseline_needs_run(self, timestamps: List[float] | None) -> bool:
+        """True бол baseline-ийн эдгээр мөр model run шаардана (FINAL TIME-аас хойших он)."""
+        return bool(timestamps) and bool(self._baseline_time) and timestamps[-1] > self._baseline_time[-1] + 1e-9
+
+    def _baseline_rows(self, timestamps: List[float] | None) -> pd.DataFrame:
+        if self._baseline_df is None:
+            self._prime_demo()
+        if timestamps is None:
+            return self._baseline_df
+        if self.baseline_needs_run(timestamps):
+            # FINAL TIME-аас хойших онууд: default параметртэй сунгасан run (cache-д)
+            return self._simulate_full({}, None, None, Horizon(list(timestamps)))
+        return self._baseline_df.iloc[self._time_rows(timestamps)]
+
+    def _demo_simulation(self, params: Dict[str, float], keys: List[str], horizon: Horizon | None) -> Tuple[Dict[str, Any], Dict[str, Any] | None]:
+        # demo нь бүтэн хугацаагаар бодогдоно, дараа нь мөрүүдийг сонгоно
+        _, s2 = demo_baseline_and_sim(params, self._baseline_time)
+        if horizon is None:
+            return {k: s2.get(k, []) for k in keys}, None
+        df = horizon.finish(self._to_df(self._baseline_time, {k: s2[k] for k in keys if k in s2}))
+        return {k: df[k].tolist() if k in df.columns else [] for k in keys}, df.attrs["stopped"]
+
+    def request_key(self, params: Dict[str, float], subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None) -> Tuple[Any, ...]:
+        """Ижил хариу өгөх хүсэлтүүдийн түлхүүр: model hash + canonical params + сонголт."""
+        picks = tuple(sorted((k, tuple(sorted(v.items()))) for k, v in subscripts.items()))
+        return params_key(self.model_hash, self.canonical_params(params)) + (picks, tuple(self.output_keys(outputs)))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def _read_final_time(self) -> float | None:
+        try:
+            return float(self.model.time.final_time())
+        except Exception:
+            return None
+
+    def _read_param_defaults(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for vname in self.param_map.values():
+            try:
+                out[vname] = self.model[vname]
+            except Exception:
+                continue
+        return out
+
+    def _prepare_resume(self) -> None:
+        """
+        2014-2024 түүхэн хэсэг ихэнх параметрээс хамаардаггүй тул тэдгээрийг
+        өөрчилсөн run-ийг baseline-ийн stock-оос үргэлжлүүлж болно.
+        """
+        self._influence, self._param_columns, self._stock_columns = {}, {}, {}
+        if not settings.SIM_REUSE_PREFIX or self.model is None:
+            return
+        try:
+            stocks = integ_stocks(self.model)
+            if stocks is None:
+                logger.info("Model has non-Integ state, historical prefix is not reused")
+                return
+            namespace = self.model._namespace
+            py_names = {v: namespace[v] for v in self._param_defaults if v in namespace}
+            starts = earliest_influence(self.model, list(py_names.values()))
+            self._influence = {v: starts[p] for v, p in py_names.items()}
+
+            columns = [str(c) for c in self._baseline_df.columns] if self._baseline_df is not None else []
+            present = set(columns)
+            for vname in self._influence:
+                self._param_columns[vname] = [c for c in columns if c == vname or c.startswith(f"{vname}[")]
+            for real_name in stocks.values():
+                coords, dims = self.model.get_coords(real_name)
+                labels = [[]]
+                for d in dims:
+                    labels = [prev + [str(x)] for prev in labels for x in coords[d]]
+                cols = [f"{real_name}[{','.join(parts)}]" if dims else real_name for parts in labels]
+                if not present.issuperset(cols):
+                    raise KeyError(f"{real_name} is missing from the baseline")
+                self._stock_columns[real_name] = ({d: list(coords[d]) for d in dims}, list(dims), cols)
+        except Exception as e:
+            logger.warning("Historical prefix reuse disabled: %s", e)
+            self._influence, self._param_columns, self._stock_columns = {}, {}, {}
+
+    def _resume_time(self, overrides: Dict[str, Any]) -> float | None:
+        """Earliest saved time a run with ``overrides`` can differ from the baseline; None = full run."""
+        if not self._influence or not overrides:
+            return None
+        start = float("inf")
+        for vname, value in overrides.items():
+            if vname not in self._influence:
+                return None
+            try:
+                if np.all(np.asarray(self._param_defaults.get(vname)) == value):
+                    continue  # a slider left at the model's value changes nothing
+            except Exception:
+                pass
+            start = min(start, self._influence[vname])
+        times = self._baseline_time
+        if not times:
+            return None
+        saved = [t for t in times if t <= start]
+        if not saved or saved[-1] <= times[0]:
+            return None
+        return saved[-1]
+
+    def _checkpoint(self, start: float) -> Dict[str, Any]:
+        row = self._baseline_df.loc[start]
+        out: Dict[str, Any] = {}
+        for real_name, (coords, dims, cols) in self._stock_columns.items():
+            values = row[cols].to_numpy(dtype=float)
+            if dims:
+                values = xr.DataArray(values.reshape([len(coords[d]) for d in dims]), coords, dims)
+            else:
+                values = float(values[0])
+            out[real_name] = values
+        return out
+
+    def _prefix_frame(self, columns: List[str], overrides: Dict[str, Any], start: float) -> pd.DataFrame:
+        # baseline rows before `start`, with the overridden constants' own columns replaced
+        head = self._baseline_df.loc[self._baseline_df.index < start, list(columns)].copy()
+        for vname, value in overrides.items():
+            cols = [c for c in self._param_columns.get(vname, []) if c in head.columns]
+            if cols:
+                head[cols] = float(value)
+        return head
+
+    def _join_prefix(self, tail: pd.DataFrame, overrides: Dict[str, Any], start: float, timestamps: List[float] | None = None) -> pd.DataFrame:
+        head = self._prefix_frame(list(tail.columns), overrides, start)
+        if timestamps is not None:
+            head = head.loc[time_mask(head.index, timestamps)]
+        initial_col = CONTROL_COLUMNS["initial_time"]
+        if initial_col in tail.columns and initial_col in head.columns:
+            # PySD reports the resume time as INITIAL TIME
+            tail[initial_col] = self._baseline_df[initial_col].iloc[0]
+        return pd.concat([head, tail[head.columns]])
+
+    def _compile_kernel(self) -> CompiledModel | None:
+        try:
+            kernel = CompiledModel(self.model)
+            kernel.verify(self._baseline_df, self._kernel_probes())
+            return kernel
+        except KernelUnsupported as e:
+            logger.warning("NumPy kernel disabled, falling back to PySD: %s", e)
+            return None
+
+    def _kernel_probes(self) -> List[Tuple[Dict[str, Any], pd.DataFrame]]:
+        """
+        Slider бүрийн параметрт нэг default биш утгатай PySD run (CompiledModel.verify).
+        The scalar is 90% of the model value's mean, the way a slider overrides
+        a subscripted constant with one number.
+        """
+        probes = []
+        for vname in dict.fromkeys(self.param_map.values()):
+            if vname not in self._param_defaults:
+                continue
+            default = self._param_defaults[vname]
+            mean = float(np.mean(np.asarray(getattr(default, "values", default), dtype=float)))
+            params = {vname: 0.9 * mean if mean else 0.1}
+            # baseline шиг model hash-аар хадгална: дараагийн эхлэлд PySD run хэрэггүй
+            name = "kernel-probe-" + hashlib.sha256(repr(sorted(params.items())).encode("utf-8")).hexdigest()[:12]
+            df = load_baseline_snapshot(settings.CACHE_DIR, self.model_hash, name)
+            if df is None:
+                df = self.model.run(
+                    params={**self._param_defaults, **params},
+                    initial_condition="original",
+                    final_time=self._final_time,
+                )
+                save_baseline_snapshot(settings.CACHE_DIR, self.model_hash, df, name)
+            probes.append((params, df))
+        return probes
+
+    def _run_model(self, overrides: Dict[str, Any], columns: List[str] | None = None, cancelled: Callable[[], bool] | None = None, horizon: Horizon | None = None) -> pd.DataFrame:
+        # worker процесс болон kernel run-ийг дундаас нь зогсоохгүй, эхлэхийн өмнө л шалгана
+        if cancelled is not None and cancelled():
+            raise Superseded("running")
+        if self.pool is not None:
+            try:
+                return self.pool.run(overrides, columns, horizon)
+            except WorkerPoolError as e:
+                logger.warning("Worker pool unavailable, running in-process: %s", e)
+        return self._run_local(overrides, columns, cancelled, horizon)
+
+    def _run_local(self, overrides: Dict[str, Any], columns: List[str] | None = None, cancelled: Callable[[], bool] | None = None, horizon: Horizon | None = None) -> pd.DataFrame:
+        """
+        ``columns``: exact output columns to keep (PySD ``return_columns``); None = all.
+        ``horizon``: saved times to keep (PySD ``return_timestamps``, the last
+        one is final_time), the start year and stop conditions; None = the
+        model's own run. ``attrs["stopped"]`` of the result reports a stop.
+        ``cancelled``: checked before every PySD step; raises Superseded once it is true.
+        """
+        start = self._resume_time(overrides)
+        if horizon is not None and horizon.initial_time is not None:
+            # хэрэглэгчийн эхлэх он: тэр оны baseline stock-оос
+            start = horizon.initial_time if start is None else max(start, horizon.initial_time)
+        saved = horizon.saved if horizon is not None else None
+        if self.kernel is not None:
+            try:
+                stop = horizon.stops_at if horizon is not None and horizon.stop is not None else None
+                df = self.kernel.run(overrides, start=start, columns=columns, timestamps=saved, stop=stop)
+                return horizon.finish(df) if horizon is not None else df
+            except KernelUnsupported as e:
+                logger.warning("NumPy kernel rejected params, using PySD: %s", e)
+        # Untouched sliders are reset to the model's own values, otherwise an
+        # earlier request's overrides would leak into this run.
+        params = dict(self._param_defaults)
+        params.update(overrides)
+        resume = start is not None and self._baseline_df is not None and xr is not None \
+            and all(np.ndim(v) == 0 for v in overrides.values())
+        if horizon is not None and horizon.initial_time is not None and not resume:
+            raise ValueError("initial_time needs scalar parameters and the baseline stock state")
+        saved_tail = saved
+        if resume and saved is not None:
+            saved_tail = [t for t in saved if t >= start]
+            head = self._prefix_frame(columns or list(self._baseline_df.columns), overrides, start)
+            head = head.loc[time_mask(head.index, saved)]
+            if not saved_tail or horizon.first_stop(head) is not None:
+                # цонх бүхэлдээ өөрчлөгдөөгүй түүхэн хэсэгт (эсвэл тэнд зогсоно): run хэрэггүй
+                return horizon.finish(head)
+        with self._model_lock:
+            initial = (start, self._checkpoint(start)) if resume else "original"
+            if horizon is not None and horizon.stop is not None and ModelOutput is not None:
+                tail = self._run_stepped(params, columns, initial, cancelled, saved_tail, horizon)
+            elif cancelled is None or ModelOutput is None:
+                tail = self.model.run(
+                    params=params,
+                    return_columns=self._pysd_columns(columns),
+                    return_timestamps=saved_tail,
+                    initial_condition=initial,
+                    final_time=self._run_final_time(saved_tail),
+                )
+            else:
+                tail = self._run_stepped(params, columns, initial, cancelled, saved_tail)
+        if saved_tail is not None:
+            # stepper эхлэх хугацааг үргэлж хадгалдаг
+            tail = tail.loc[time_mask(tail.index, saved_tail)]
+        if columns is not None:
+            tail = tail[columns]
+        df = self._join_prefix(tail, overrides, start, saved) if resume else tail
+        return horizon.finish(df) if horizon is not None else df
+
+    def _pysd_columns(self, columns: List[str] | None) -> List[str] | None:
+        """
+        PySD-ийн return_columns: бүх нүд нь хэрэгтэй хувьсагчийг бүтнээр нь
+        асууна. make_flat_df splits a whole variable in one pass but looks up
+        each requested cell separately, which dominates a cube-sized run.
+        """
+        index = self._column_index()
+        if columns is None or index is None:
+            return columns
+        wanted = set(columns)
+        out: List[str] = []
+        for c in columns:
+            var = c.split("[", 1)[0]
+            cells = [index.columns[p] for p in index.var_positions(var)] if "[" in c else []
+            if cells and wanted.issuperset(cells):
+                if var not in out:
+                    out.append(var)
+            else:
+                out.append(c)
+        return out
+
+    def _run_final_time(self, timestamps: List[float] | None) -> float | None:
+        # PySD нь өмнөх run-ийн final_time-ийг хадгалдаг: үргэлж тодорхой өгнө
+        return float(timestamps[-1]) if timestamps else self._final_time
+
+    def _run_stepped(
+        self,
+        params: Dict[str, Any],
+        columns: List[str] | None,
+        initial: Any,
+        cancelled: Callable[[], bool] | None,
+        timestamps: List[float] | None = None,
+        horizon: Horizon | None = None,
+    ) -> pd.DataFrame:
+        """
+        ``model.run``-тай ижил үр дүн, алхам бүрийн өмнө ``cancelled()``-г шалгана (_model_lock барьсан байх).
+        ``horizon.stop``: шинээр хадгалсан мөр бүрийг шалгаж, биелвэл интегралчлалыг зогсооно.
+        """
+        final_time = self._run_final_time(timestamps)
+        if timestamps is not None:
+            # set_stepper эхлэх мөрийг үргэлж хадгална; тэр оныг return_timestamps-д
+            # үлдээвэл PySD дараагийн онууд бүрийг нэг алхмаар хоцорч алгасна
+            # "original": model-ийн INITIAL TIME (model.time нь өмнөх resume run-ийн эхлэх онг хадгалсаар байдаг)
+            first = initial[0] if isinstance(initial, tuple) else float(self.model.components._control_vars["initial_time"]())
+            timestamps = [t for t in timestamps if t > first + 1e-9] or None
+        output = ModelOutput()
+        self.model.set_stepper(
+            output,
+            params=params,
+            return_columns=self._pysd_columns(columns),
+            return_timestamps=timestamps,
+            initial_condition=initial,
+            final_time=final_time,
+        )
+        handler = output.handler
+        stop = horizon.stop if horizon is not None else None
+        # зөвхөн нөхцөлийн багануудыг flatten хийнэ (бүтэн make_flat_df нь collect()-ийн ихэнх хугацаа)
+        variables = {c.split("[")[0] for c in stop.columns} if stop is not None else set()
+        addresses = {v: a for v, a in self.model.return_addresses.items() if v in variables}
+        names = ["time"] + sorted({py for py, _ in addresses.values()})
+        # constant (run cache) columns only appear at collect(); those runs are checked at the end
+        live = stop is not None and all(py in handler.capture_elements_step for py in names[1:])
+        checked = 0
+        while self.model.time.in_bounds():
+            if live and len(handler.ds["time"]) > checked:
+                ready = len(handler.ds["time"])
+                part = pd.DataFrame({k: handler.ds[k][checked:ready] for k in names}).set_index("time")
+                checked = ready
+                if horizon.first_stop(DataFrameHandler.make_flat_df(part, addresses, True)) is not None:
+                    break
+            if cancelled is not None and cancelled():
+                raise Superseded("running")
+            self.model.step(1)
+        return ModelOutput.collect(self.model)
+
+    def _stream_rows(self, overrides: Dict[str, Any], columns: List[str], chunk: int):
+        """
+        ``_run_local``-ийн алхам алхмаар хувилбар: (times, [rows, column] block)
+        хэсгүүдийг бодогдмогц yield хийж, эцэст нь бүтэн frame-ийг return хийнэ
+        (``df = yield from ...``).
+        """
+        start = self._resume_time(overrides)
+        if self.kernel is not None:
+            try:
+                rows = self.kernel.iter_rows(overrides, start=start, columns=columns)
+            except KernelUnsupported as e:
+                logger.warning("NumPy kernel rejected params, using PySD: %s", e)
+            else:
+                blocks, done = [], 0
+                for block in _batched(rows, chunk):
+                    yield self._baseline_time[done:done + len(block)], block
+                    blocks.append(block)
+                    done += len(block)
+                return pd.DataFrame(
+                    np.concatenate(blocks),
+                    index=pd.Index(self._baseline_time, name="time"),
+                    columns=list(columns),
+                )
+
+        if ModelOutput is None:
+            df = self._run_local(overrides, columns)
+            yield df.index.tolist(), df.to_numpy(dtype=float)
+            return df
+
+        # PySD алхмууд тусдаа thread-д _model_lock барьж бодогдоно; энэ generator
+        # зөвхөн бэлэн хэсгүүдийг yield хийнэ, тул удаан client lock-ийг барихгүй
+        parts: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        abandoned = threading.Event()
+
+        def produce() -> None:
+            try:
+                df = self._step_rows(overrides, columns, start, chunk, lambda t, b: parts.put(("rows", (t, b))), abandoned.is_set)
+                parts.put(("done", df))
+            except BaseException as e:
+                parts.put(("error", e))
+
+        threading.Thread(target=produce, name="simulate-stream", daemon=True).start()
+        try:
+            while True:
+                kind, value = parts.get()
+                if kind == "rows":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return value
+        finally:
+            # орхисон stream: producer дараагийн алхмын өмнө зогсож lock-ийг суллана
+            abandoned.set()
+
+    def _step_rows(self, overrides: Dict[str, Any], columns: List[str], start: float | None, chunk: int, emit: Callable[[List[float], np.ndarray], None], abandoned: Callable[[], bool]) -> pd.DataFrame | None:
+        """
+        _stream_rows-ийн PySD хэсэг: хэсэг бүрийг бодогдмогц ``emit(times, block)``;
+        ``abandoned()`` бол интегралчлалыг зогсоож None буцаана.
+        """
+        params = dict(self._param_defaults)
+        params.update(overrides)
+        resume = start is not None and self._baseline_df is not None and xr is not None \
+            and all(np.ndim(v) == 0 for v in overrides.values())
+
+        with self._model_lock:
+            output = ModelOutput()
+            if resume:
+                self.model.set_stepper(
+                    output,
+                    params=params,
+                    return_columns=self._pysd_columns(columns),
+                    initial_condition=(start, self._checkpoint(start)),
+                    final_time=self._run_final_time(None),
+                )
+                head = self._prefix_frame(columns, overrides, start)
+                values = head.to_numpy(dtype=float)
+                for i in range(0, len(values), chunk):
+                    emit(head.index[i:i + chunk].tolist(), values[i:i + chunk])
+            else:
+                self.model.set_stepper(output, params=params, return_columns=self._pysd_columns(columns), final_time=self._run_final_time(None))
+
+            handler = output.handler
+            # constant (run cache) columns only appear at collect(); stream those runs in one piece
+            addresses = self.model.return_addresses
+            live = all(py in handler.capture_elements_step for py, _ in addresses.values())
+            sent = 0
+            while True:
+                ready = len(handler.ds["time"])
+                last = not self.model.time.in_bounds()
+                if live and ready > sent and (ready - sent >= chunk or last):
+                    part = pd.DataFrame({k: v[sent:ready] for k, v in handler.ds.items()}).set_index("time")
+                    part = DataFrameHandler.make_flat_df(part, addresses, True)
+                    emit(part.index.tolist(), part[list(columns)].to_numpy(dtype=float))
+                    sent = ready
+                if last:
+                    break
+                if abandoned():
+                    return None
+                self.model.step(1)
+            df = ModelOutput.collect(self.model)[columns]
+        if resume:
+            df = self._join_prefix(df, overrides, start)
+        if not live:
+            tail = df.iloc[len(df.index) - (len(handler.ds["time"]) - sent):]
+            emit(tail.index.tolist(), tail[list(columns)].to_numpy(dtype=float))
+        return df
 
     def _prime_demo(self):
         t = demo_time_series()
@@ -143,58 +884,434 @@ class ModelEngine:
     def get_time_unit_label(self) -> str:
         return self.time_unit_label
 
-    def get_baseline_filtered(self, subscripts: Dict[str, Dict[str, str]]) -> Tuple[List[float], Dict[str, List[float]]]:
+    def output_keys(self, outputs: List[str] | None) -> List[str]:
+        """Requested output keys in OUTPUT_KEYS order; None/empty = all of them."""
+        if not outputs:
+            return list(OUTPUT_KEYS)
+        wanted = set(outputs)
+        return [k for k in OUTPUT_KEYS if k in wanted]
+
+    def _projection(self, keys: List[str], subscripts: Dict[str, Dict[str, str]], cube: bool = False) -> List[str]:
+        """
+        Сонгосон output-уудад хэрэгтэй баганууд л (baseline-ийн баганаас
+        ижил дүрмээр сонгоно). Нийт дүн ба ``cube``-д хувьсагчийн бүх багана орно.
+        """
+        index = self._column_index()
+        positions = set()
+        for k in keys:
+            positions.update(index.output_positions(k, subscripts.get(k, {}), cube or k == TOTAL_HERD_KEY))
+        # keep the model's column order so totals sum in the same order as a full run
+        return [index.columns[i] for i in sorted(positions)]
+
+    def get_baseline_filtered(self, subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None, as_arrays: bool = False, timestamps: List[float] | None = None) -> Tuple[List[float], Dict[str, List[float]]]:
+        """``as_arrays``: series-ийг жагсаалт биш NumPy массиваар буцаана. ``timestamps``: select_times-ийн он."""
+        df = self._baseline_rows(timestamps)
+        time = self._baseline_time if timestamps is None else list(timestamps)
+        extract = self._extract_arrays if as_arrays else self._extract_outputs
+        baseline = extract(df, subscripts, self.output_keys(outputs))
+        return time, baseline
+
+    def simulate(self, params: Dict[str, float], subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None, cancelled: Callable[[], bool] | None = None, as_arrays: bool = False, horizon: Horizon | None = None) -> Tuple[List[float], Dict[str, List[float]], Dict[str, List[float]], Dict[str, Any] | None]:
+        """
+        (time, baseline, simulation, stopped). ``horizon``: ModelEngine.horizon-ийн
+        хугацааны хүрээ; a run halted by a stop condition has shorter
+        simulation series and ``stopped`` = {"time", "condition"}.
+        """
+        keys = self.output_keys(outputs)
+        timestamps = horizon.timestamps if horizon is not None else None
+        # baseline
+        time, baseline = self.get_baseline_filtered(subscripts, keys, as_arrays, timestamps)
+
+        # simulation
+        if self.demo_mode or self.model is None or pysd is None:
+            return (time, baseline) + self._demo_simulation(params, keys, horizon)
+
+        # IMPORTANT: PySD params override via run(params=...) :contentReference[oaicite:9]{index=9}
+        # outputs өгөгдсөн үед зөвхөн хэрэгтэй баганыг тооцуулна (return_columns),
+        # хугацааны цонхтой бол зөвхөн тэр онуудыг (return_timestamps)
+        columns = self._projection(keys, subscripts) if outputs else None
+        df_sim = self._simulate_full(self.canonical_params(params), columns or None, cancelled, horizon)
+        extract = self._extract_arrays if as_arrays else self._extract_outputs
+        return time, baseline, extract(df_sim, subscripts, keys), df_sim.attrs.get("stopped")
+
+    def cube_dims(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Output бүрийн cube-ийн тэнхлэгүүд (time-ийн дараа), model-ийн
+        ``_subscript_dict`` дарааллаар. The grand total and outputs without
+        subscripted columns (scalar, demo) are plain [time] series: [].
+        """
+        index = self._column_index()
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for k in keys:
+            dims = [] if k == TOTAL_HERD_KEY or index is None else self._available_subscripts.get(k, [])
+            if dims:
+                positions = index.cube_positions(self.variable_map.get(k, k), [d["values"] for d in dims])
+                if not (positions >= 0).any():
+                    dims = []
+            out[k] = dims
+        return out
+
+    def _extract_cubes(self, df: pd.DataFrame | None, keys: List[str], dims: Dict[str, List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+        """Output бүрийг [time, *dims] массиваар; dims хоосон бол _extract_arrays-ийн series."""
+        if df is None:
+            return {k: np.empty(0) for k in keys}
+        scalar = [k for k in keys if not dims[k]]
+        flat = self._extract_arrays(df, {}, scalar) if scalar else {}
+        index = self._column_index(df)
+        values = df.to_numpy(dtype=float)
+        out: Dict[str, np.ndarray] = {}
+        for k in keys:
+            if not dims[k]:
+                out[k] = flat[k]
+                continue
+            positions = index.cube_positions(self.variable_map.get(k, k), [d["values"] for d in dims[k]])
+            # [time, column] -> [time, *dims] in one fancy index
+            cube = values[:, positions]
+            out[k] = np.where(positions >= 0, cube, 0.0) if (positions < 0).any() else cube
+        return out
+
+    def get_baseline_cube(self, outputs: List[str] | None = None, timestamps: List[float] | None = None) -> Tuple[List[float], Dict[str, List[Dict[str, Any]]], Dict[str, np.ndarray]]:
+        df = self._baseline_rows(timestamps)
+        keys = self.output_keys(outputs)
+        dims = self.cube_dims(keys)
+        time = self._baseline_time if timestamps is None else list(timestamps)
+        return time, dims, self._extract_cubes(df, keys, dims)
+
+    def simulate_cube(self, params: Dict[str, float], outputs: List[str] | None = None, cancelled: Callable[[], bool] | None = None, horizon: Horizon | None = None) -> Tuple[List[float], Dict[str, List[Dict[str, Any]]], Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, Any] | None]:
+        """
+        simulate()-тэй ижил, гэхдээ subscript сонголтгүй: output бүр бүтэн
+        [time, сум, малын төрөл] cube (cube_dims). The client slices and sums
+        locally, so a subscript change needs no new request.
+        """
+        keys = self.output_keys(outputs)
+        time, dims, baseline = self.get_baseline_cube(keys, horizon.timestamps if horizon is not None else None)
+
+        if self.demo_mode or self.model is None or pysd is None:
+            s2, stopped = self._demo_simulation(params, keys, horizon)
+            return time, dims, baseline, {k: np.asarray(v, dtype=float) for k, v in s2.items()}, stopped
+
+        # simulate_stream-тэй ижил projection: stream-ийн дараах cube хүсэлт cache-ээс
+        columns = self._projection(keys, {}, cube=True)
+        df_sim = self._simulate_full(self.canonical_params(params), columns or None, cancelled, horizon)
+        return time, dims, baseline, self._extract_cubes(df_sim, keys, dims), df_sim.attrs.get("stopped")
+
+    def aggregate_plan(self, specs: List[Any]) -> AggregatePlan:
+        """AggregateSpec-үүдийг baseline-ийн баганад хөрвүүлнэ; буруу spec бол ValueError."""
         if self._baseline_df is None:
             self._prime_demo()
+        index = self._column_index()
+        cached = self._plans
+        if cached is None or cached[0] is not index:
+            cached = (index, {})
+            self._plans = cached
+        key = tuple(s.model_dump_json() for s in specs)
+        plan = cached[1].get(key)
+        if plan is None:
+            # нийт дүнгийн output ч хувьсагчийнхаа бүх тэнхлэгтэй
+            dims = self.cube_dims([k for k in OUTPUT_KEYS if k != TOTAL_HERD_KEY])
+            by_var = {self.variable_map.get(k, k): d for k, d in dims.items()}
+            dims_by_output = {k: by_var.get(self.variable_map.get(k, k), []) for k in OUTPUT_KEYS}
+            plan = AggregatePlan(specs, index, self.variable_map, dims_by_output)
+            if len(cached[1]) >= MAX_AGGREGATE_PLANS:
+                cached[1].clear()
+            cached[1][key] = plan
+        return plan
 
-        time = self._baseline_time
-        baseline: Dict[str, List[float]] = {}
+    def aggregate(self, specs: List[Any], params: Dict[str, float] | None = None, cancelled: Callable[[], bool] | None = None, horizon: Horizon | None = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate бүр: {"dims", "baseline", "simulation"} ([time, *group_by]).
+        ``params`` None бол (reset) simulation хоосон. The simulation reads
+        the full cached frame when /api/simulate already ran it, else a run
+        projected to the plan's columns (_simulate_full checks both).
+        """
+        plan = self.aggregate_plan(specs)
+        baseline = plan.apply(self._plan_block(plan, self._baseline_rows(horizon.timestamps if horizon is not None else None)))
+        if params is None:
+            simulation = {name: np.empty(0) for name in plan.dims}
+        elif self.demo_mode or self.model is None or pysd is None:
+            _, s2 = demo_baseline_and_sim(params, self._baseline_time)
+            df = self._to_df(self._baseline_time, s2)
+            if horizon is not None:
+                df = horizon.finish(df)
+            simulation = plan.apply(self._plan_block(plan, df))
+        else:
+            df = self._simulate_full(self.canonical_params(params), plan.columns or None, cancelled, horizon)
+            simulation = plan.apply(self._plan_block(plan, df))
+        return {
+            name: {"dims": dims, "baseline": baseline[name], "simulation": simulation[name]}
+            for name, dims in plan.dims.items()
+        }
+
+    def _plan_block(self, plan: AggregatePlan, df: pd.DataFrame) -> np.ndarray:
+        # baseline бүтэцтэй frame бол байрлалаар (pandas-ийн нэрээр хайлтгүй)
+        if self._column_index(df) is self._column_index():
+            return df.to_numpy(dtype=float)[:, plan.positions]
+        return df[plan.columns].to_numpy(dtype=float)
+
+    def simulate_stream(self, params: Dict[str, float], subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None, chunk: int = 1, timestamps: List[float] | None = None) -> Iterator[Dict[str, Any]]:
+        """
+        /api/simulate_stream: эхлээд baseline (бэлэн байгаа), дараа нь
+        simulation-ийг хадгалсан хугацааны ``chunk`` алхам бүрээр бодогдмогц.
+
+        Events: ``baseline`` -> ``step`` ... -> ``done``. The run happens
+        in-process (not in the worker pool) so rows can be forwarded while the
+        model integrates; the finished frame is cached like a /api/simulate run.
+        The run keeps every cell of the outputs (the cube projection), so a
+        later layout=cube request or another subscript choice is a cache hit.
+        With ``timestamps`` the run is the full one (it is cached and reused);
+        only the selected rows are sent.
+        """
+        keys = self.output_keys(outputs)
+        chunk = max(1, int(chunk))
+        time, baseline = self.get_baseline_filtered(subscripts, keys, timestamps=timestamps)
+        yield {
+            "type": "baseline",
+            "time": time,
+            "baseline": baseline,
+            "applied_subscripts": self.applied_subscripts_per_output(subscripts, keys),
+        }
+
+        if self.demo_mode or self.model is None or pysd is None:
+            yield from self._series_chunks(time, self._demo_simulation(params, keys, Horizon(timestamps))[0], chunk)
+            yield {"type": "done", "cached": False}
+            return
+
+        params = self.canonical_params(params)
+        # simulate_cube-тэй ижил баганууд (ижил cache түлхүүр)
+        columns = self._projection(keys, {}, cube=True)
+        rows = None if timestamps is None else self._time_rows(timestamps)
+        _, df = self.result_cache.get_first([self._result_key(params, cols) for cols in (None, columns or None)])
+        if df is not None:
+            df = df if rows is None else df.iloc[rows]
+            yield from self._series_chunks(time, self._extract_outputs(df, subscripts, keys), chunk)
+            yield {"type": "done", "cached": True}
+            return
+        if not columns:
+            df = self._simulate_full(params, horizon=Horizon(timestamps) if timestamps is not None else None)
+            yield from self._series_chunks(time, self._extract_outputs(df, subscripts, keys), chunk)
+            yield {"type": "done", "cached": False}
+            return
+
+        index = ColumnIndex(columns, self.variable_map)
+        groups = [index.output_positions(k, subscripts.get(k, {}), k == TOTAL_HERD_KEY) for k in keys]
+        steps = self._stream_rows(self._to_overrides(params), columns, chunk)
+        while True:
+            try:
+                times, block = next(steps)
+            except StopIteration as stop:
+                df = stop.value
+                break
+            if timestamps is not None:
+                keep = time_mask(times, timestamps)
+                if not keep.any():
+                    continue
+                times, block = [t for t, k in zip(times, keep) if k], block[keep]
+            series = ColumnIndex.gather(block, groups)
+            yield {
+                "type": "step",
+                "time": [float(t) for t in times],
+                "simulation": {
+                    k: ([0.0] * len(times) if v is None else v.tolist()) for k, v in zip(keys, series)
+                },
+            }
+        self.result_cache.put(self._result_key(params, columns), df, frame_nbytes(df))
+        yield {"type": "done", "cached": False}
+
+    def _series_chunks(self, time: List[float], series: Dict[str, List[float]], chunk: int) -> Iterator[Dict[str, Any]]:
+        # already computed series (demo, cache hit) sent in the same step events
+        for i in range(0, len(time), chunk):
+            yield {
+                "type": "step",
+                "time": list(time[i:i + chunk]),
+                "simulation": {k: list(v[i:i + chunk]) for k, v in series.items()},
+            }
+
+    def simulate_approx(self, params: Dict[str, float], subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None, timestamps: List[float] | None = None) -> Tuple[List[float], Dict[str, List[float]], Dict[str, List[float]], Dict[str, List[float]]] | None:
+        """
+        Emulator-оос ойролцоо simulation ба output, он бүрийн алдааны үнэлгээ
+        (EmulatorFit.error_samples-ийн RMS). None (the caller runs the model)
+        while no fit for the current model is ready (that call also starts
+        fitting), when ``params`` are outside the surrogate (EmulatorFit.covers)
+        or when an output's estimated relative RMS error is above
+        EMULATOR_MAX_ERROR.
+        """
+        if self.demo_mode or self.model is None:
+            return None
+        fit = self.emulator.ready(self.model_hash)
+        if fit is None:
+            self.emulator.refresh(self)
+            return None
+        params = self.canonical_params(params)
+        if not fit.covers(params):
+            return None
+        keys = self.output_keys(outputs)
+        time, baseline = self.get_baseline_filtered(subscripts, keys, timestamps=timestamps)
+
+        cached = self._approx_index
+        if cached is None or cached[0] is not fit or cached[1].variable_map != self.variable_map:
+            cached = (fit, ColumnIndex(fit.columns, self.variable_map))
+            self._approx_index = cached
+        index = cached[1]
+        groups = [index.output_positions(k, subscripts.get(k, {}), k == TOTAL_HERD_KEY) for k in keys]
+
+        samples = fit.error_samples(params)
+        predicted = fit.predict(params)
+        if timestamps is not None:
+            rows = self._time_rows(timestamps)
+            samples, predicted = samples[:, rows], predicted[rows]
+        series = ColumnIndex.gather(predicted, groups)
+        residuals = ColumnIndex.gather(samples.reshape(-1, samples.shape[-1]), groups)
+        zeros = [0.0] * len(time)
+        sim, error = {}, {}
+        for k, v, r in zip(keys, series, residuals):
+            if v is not None and r is not None:
+                # output-ийн нийт харьцангуй алдаа (бүх он): хэт их бол exact run
+                scale = float(np.sqrt(np.mean(v ** 2)))
+                if scale > 0 and float(np.sqrt(np.mean(r ** 2))) / scale > settings.EMULATOR_MAX_ERROR:
+                    return None
+            sim[k] = list(zeros) if v is None else v.tolist()
+            error[k] = list(zeros) if r is None else np.sqrt(np.mean(r.reshape(samples.shape[:2]) ** 2, axis=0)).tolist()
+        return time, baseline, sim, error
+
+    def emulated_columns(self) -> List[str]:
+        """Baseline columns any output/subscript choice can read (emulator targets), in model order."""
+        index = self._column_index()
+        positions = set()
         for k in OUTPUT_KEYS:
-            if k == TOTAL_HERD_KEY:
-                baseline[k] = self._extract_total_series(self.variable_map.get(k, k), self._baseline_df)
-            else:
-                baseline[k] = self._extract_series(k, self.variable_map.get(k, k), self._baseline_df, subscripts.get(k, {}))
-        return time, baseline
+            positions.update(index.var_positions(self.variable_map.get(k, k)))
+        return [index.columns[i] for i in sorted(positions)]
 
-    def simulate(self, params: Dict[str, float], subscripts: Dict[str, Dict[str, str]]) -> Tuple[List[float], Dict[str, List[float]], Dict[str, List[float]]]:
-        # baseline
+    def emulated_groups(self, columns: List[str]) -> Dict[str, Tuple[List[int], bool]]:
+        """Output key -> (its positions in ``columns``, summed into one series?)."""
+        index = ColumnIndex(columns, self.variable_map)
+        return {k: (index.var_positions(self.variable_map.get(k, k)), k == TOTAL_HERD_KEY) for k in OUTPUT_KEYS}
+
+    def run_columns(self, params_list: List[Dict[str, float]], columns: List[str]) -> np.ndarray:
+        """Exact runs as a [scenario, time, column] array of the given baseline columns."""
+        overrides_list = [self._to_overrides(self.canonical_params(p)) for p in params_list]
+        if self.kernel is not None:
+            try:
+                blocks = []
+                for start in range(0, len(overrides_list), BATCH_CHUNK):
+                    chunk = overrides_list[start:start + BATCH_CHUNK]
+                    resume = [self._resume_time(o) for o in chunk]
+                    data = self.kernel.run_batch(chunk, start=None if None in resume else min(resume))
+                    blocks.extend(self.kernel.frame(block, columns).to_numpy(dtype=float) for block in data)
+                return np.stack(blocks) if blocks else np.empty((0, len(self._baseline_time), len(columns)))
+            except KernelUnsupported as e:
+                logger.warning("NumPy kernel rejected batch, using PySD: %s", e)
+        out = [self._run_model(o, columns)[columns].to_numpy(dtype=float) for o in overrides_list]
+        return np.stack(out) if out else np.empty((0, len(self._baseline_time), len(columns)))
+
+    def simulate_batch(self, params_list: List[Dict[str, float]], subscripts: Dict[str, Dict[str, str]], progress: Callable[[int, int], None] | None = None) -> Tuple[List[float], Dict[str, List[float]], List[Dict[str, List[float]]]]:
+        """
+        Олон сценарийг нэг дор тооцно. Kernel байвал [scenario, soum, type]
+        массив дээр нэг удаагийн интегралчлалаар, үгүй бол нэг нэгээр нь.
+        ``progress(done, total)``: өгвөл BATCH_CHUNK сценари тутамд дуудна (job-ууд).
+        """
         time, baseline = self.get_baseline_filtered(subscripts)
 
-        # simulation
         if self.demo_mode or self.model is None or pysd is None:
-            b2, s2 = demo_baseline_and_sim(params, time)
-            sim = {}
-            for k in OUTPUT_KEYS:
-                sim[k] = s2.get(k, [])
-            return time, baseline, sim
+            sims = []
+            for params in params_list:
+                _, s2 = demo_baseline_and_sim(params, time)
+                sims.append({k: s2.get(k, []) for k in OUTPUT_KEYS})
+            return time, baseline, sims
+
+        overrides_list = [self._to_overrides(self.canonical_params(p)) for p in params_list]
+        if progress is None:
+            return time, baseline, self._run_batch(overrides_list, subscripts)
+        # kernel: BATCH_CHUNK-аар; PySD: ~100 хэсэг (pool бол worker бүрт дор хаяж нэг)
+        if self.kernel is not None:
+            step = BATCH_CHUNK
+        else:
+            step = max(len(overrides_list) // 100, self.pool.size if self.pool is not None else 1)
+        sims = []
+        for start in range(0, len(overrides_list), step):
+            sims.extend(self._run_batch(overrides_list[start:start + step], subscripts))
+            progress(len(sims), len(overrides_list))
+        return time, baseline, sims
+
+    def _run_batch(self, overrides_list: List[Dict[str, Any]], subscripts: Dict[str, Dict[str, str]]) -> List[Dict[str, List[float]]]:
+        if self.pool is not None:
+            try:
+                return self.pool.run_batch(overrides_list, subscripts)
+            except WorkerPoolError as e:
+                logger.warning("Worker pool unavailable, running in-process: %s", e)
+        return self._run_batch_local(overrides_list, subscripts)
+
+    def simulate_arrays(self, params_list: List[Dict[str, float]], subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None, progress: Callable[[int, int], None] | None = None) -> Tuple[List[float], Dict[str, np.ndarray]]:
+        """simulate_batch-ийн үр дүнг output бүрээр [scenario, time] массив болгоно (шинжилгээний endpoint-уудад)."""
+        time, _, sims = self.simulate_batch(params_list, subscripts, progress)
+        arrays: Dict[str, np.ndarray] = {}
+        for k in self.output_keys(outputs):
+            arrays[k] = np.array([s.get(k, []) for s in sims], dtype=float).reshape(len(sims), len(time))
+        return time, arrays
+
+    def _run_batch_local(self, overrides_list: List[Dict[str, Any]], subscripts: Dict[str, Dict[str, str]]) -> List[Dict[str, List[float]]]:
+        sims: List[Dict[str, List[float]]] = []
+        if self.kernel is not None:
+            try:
+                for start in range(0, len(overrides_list), BATCH_CHUNK):
+                    chunk = overrides_list[start:start + BATCH_CHUNK]
+                    resume = [self._resume_time(o) for o in chunk]
+                    data = self.kernel.run_batch(chunk, start=None if None in resume else min(resume))
+                    for block in data:
+                        sims.append(self._extract_outputs(self.kernel.frame(block), subscripts))
+                return sims
+            except KernelUnsupported as e:
+                logger.warning("NumPy kernel rejected batch, using PySD: %s", e)
+                sims = []
+
+        for overrides in overrides_list:
+            sims.append(self._extract_outputs(self._run_local(overrides), subscripts))
+        return sims
 
+    def _to_overrides(self, params: Dict[str, float]) -> Dict[str, float]:
         # Map slider keys -> vensim param names
         overrides = {}
         for slider_key, val in params.items():
             vname = self.param_map.get(slider_key, slider_key)
             overrides[vname] = val
+        return overrides
 
-        # IMPORTANT: PySD params override via run(params=...) :contentReference[oaicite:9]{index=9}
-        df_sim = self.model.run(params=overrides)
+    def _column_index(self, df: pd.DataFrame | None = None) -> ColumnIndex | None:
+        """
+        Baseline-ийн баганын индекс (model load бүрт нэг удаа, variable_map
+        өөрчлөгдвөл дахин). ``df`` өөр бүтэцтэй (projection) бол түүнд
+        зориулсан жижиг индекс.
+        """
+        if self._baseline_df is None:
+            return None
+        index = self._index
+        if index is None or self._index_df is not self._baseline_df or index.variable_map != self.variable_map:
+            index = ColumnIndex(self._baseline_df.columns, self.variable_map)
+            self._index, self._index_df = index, self._baseline_df
+        if df is None or df is self._baseline_df or index.matches(df.columns):
+            return index
+        return ColumnIndex(df.columns, self.variable_map)
 
-        sim: Dict[str, List[float]] = {}
-        for k in OUTPUT_KEYS:
-            if k == TOTAL_HERD_KEY:
-                sim[k] = self._extract_total_series(self.variable_map.get(k, k), df_sim)
-            else:
-                sim[k] = self._extract_series(k, self.variable_map.get(k, k), df_sim, subscripts.get(k, {}))
-        return time, baseline, sim
+    def _extract_outputs(self, df: pd.DataFrame | None, subscripts: Dict[str, Dict[str, str]], keys: List[str] | None = None) -> Dict[str, List[float]]:
+        return {k: v.tolist() for k, v in self._extract_arrays(df, subscripts, keys).items()}
+
+    def _extract_arrays(self, df: pd.DataFrame | None, subscripts: Dict[str, Dict[str, str]], keys: List[str] | None = None) -> Dict[str, np.ndarray]:
+        """_extract_outputs-тай ижил, гэхдээ [time] NumPy массиваар (binary хариунд)."""
+        keys = keys or OUTPUT_KEYS
+        if df is None:
+            return {k: np.empty(0) for k in keys}
+        index = self._column_index(df)
+        groups = [index.output_positions(k, subscripts.get(k, {}), k == TOTAL_HERD_KEY) for k in keys]
+        # one gather for every requested series
+        series = ColumnIndex.gather(df.to_numpy(dtype=float), groups)
+        return {k: (np.zeros(len(df.index)) if v is None else v) for k, v in zip(keys, series)}
 
     def _extract_total_series(self, vensim_var: str, df: pd.DataFrame | None) -> List[float]:
         if df is None:
             return []
-        if vensim_var in df.columns:
-            return [float(x) for x in df[vensim_var].values.tolist()]
-        candidates = [c for c in df.columns if str(c).startswith(f"{vensim_var}[")]
-        if candidates:
-            totals = df[candidates].sum(axis=1)
-            return [float(x) for x in totals.values.tolist()]
-        return [0.0 for _ in range(len(df.index))]
+        positions = self._column_index(df).var_positions(vensim_var)
+        if not positions:
+            return [0.0 for _ in range(len(df.index))]
+        return ColumnIndex.gather(df.to_numpy(dtype=float), [positions])[0].tolist()
 
     def _extract_series(self, out_key: str, vensim_var: str, df: pd.DataFrame | None, subsel: Dict[str, str]) -> List[float]:
         """
@@ -206,42 +1323,13 @@ class ModelEngine:
         """
         if df is None:
             return []
-        # 1) direct column
-        if vensim_var in df.columns:
-            return [float(x) for x in df[vensim_var].values.tolist()]
-
-        # 2) try bracket matching
-        candidates = [c for c in df.columns if str(c).startswith(f"{vensim_var}[")]
-        if not candidates:
-            # demo key fallback (demo үед df дээр out_key нэртэй байж болно)
-            if out_key in df.columns:
-                return [float(x) for x in df[out_key].values.tolist()]
+        pos = self._column_index(df).select(out_key, vensim_var, subsel)
+        if pos is None:
             return [0.0 for _ in range(len(df.index))]
+        return df.iloc[:, pos].to_numpy(dtype=float).tolist()
 
-        # ensure deterministic ordering across runs
-        candidates = sorted(candidates, key=lambda c: str(c))
-
-        if not subsel:
-            # no selection -> first candidate
-            col = candidates[0]
-            return [float(x) for x in df[col].values.tolist()]
-
-        # subsel dict: dim->value, but column string contains only values order.
-        # We'll match values existence in bracket part.
-        def score(colname: str) -> int:
-            inside = colname.split("[", 1)[1].rstrip("]")
-            parts = [p.strip() for p in inside.split(",")]
-            s = 0
-            for _, v in subsel.items():
-                if str(v) in parts:
-                    s += 1
-            return s
-
-        best = max(candidates, key=lambda c: (score(c), str(c)))
-        return [float(x) for x in df[best].values.tolist()]
-
-    def applied_subscripts_per_output(self, subscripts: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    def applied_subscripts_per_output(self, subscripts: Dict[str, Dict[str, str]], outputs: List[str] | None = None) -> Dict[str, Dict[str, str]]:
         applied = {}
-        for k in OUTPUT_KEYS:
+        for k in self.output_keys(outputs):
             applied[k] = {} if k == TOTAL_HERD_KEY else subscripts.get(k, {})
         return applied
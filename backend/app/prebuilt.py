@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+
+# хадгалах хувилбарын тоо (subscript сонголт бүр нэг entry)
+MAX_ENTRIES = 256
+# хөтөч хадгалж болно, гэхдээ хэрэглэхээсээ өмнө ETag-аар шалгуулна (304)
+CACHE_CONTROL = "public, no-cache"
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding -> {coding: q}."""
+    out: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out[coding.lower()] = q
+    return out
+
+
+class Prebuilt:
+    """
+    Нэг удаа encode хийж шахсан хариу: identity, gzip, (brotli суусан бол) br.
+    Each encoding has its own strong ETag ("<sha256>", "<sha256>-gzip", ...),
+    so a cache never mixes representations; If-None-Match with any of them
+    means the client already has this content.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        # mtime=0: ижил агуулга -> ижил gzip байт
+        self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body)
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-")[0] == self.digest:
+                return True
+        return False
+
+    def _encoding(self, request: Request) -> str:
+        accepted = _accepted(request.headers.get("accept-encoding", ""))
+        for coding in ("br", "gzip"):
+            if coding in self.variants and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+                return coding
+        return "identity"
+
+    def response(self, request: Request, conditional: bool = True) -> Response:
+        """``conditional``: If-None-Match таарвал 304 (GET/HEAD-д л)."""
+        encoding = self._encoding(request)
+        headers = {"ETag": self.etag(encoding), "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if conditional and self.matches(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class PrebuiltCache:
+    """
+    Түлхүүр (model hash-тай) -> Prebuilt. A new model load gives new keys,
+    the old entries age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.builds = 0
+        self._items: "OrderedDict[Hashable, Prebuilt]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, key: Hashable) -> Prebuilt | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> Prebuilt:
+        item = self.peek(key)
+        if item is not None:
+            return item
+        item = Prebuilt(build())
+        with self._lock:
+            self.builds += 1
+            self._items[key] = item
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._items), "builds": self.builds}
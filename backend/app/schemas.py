@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Literal, Optional, Any, Union
 
 
 class SliderDef(BaseModel):
@@ -30,6 +30,42 @@ class SeriesPayload(BaseModel):
     simulation: Dict[str, List[float]]
     # for transparency: which subscripts were used to filter each output
     applied_subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    # SimulateRequest.aggregates-ийн үр дүн (name -> AggregatePayload)
+    aggregates: Dict[str, "AggregatePayload"] = Field(default_factory=dict)
+    # stop_when биелсэн бол: simulation тэр он хүртэл л (baseline бүтэн хугацаагаар)
+    stopped: Optional["StopPayload"] = None
+
+
+class StopPayload(BaseModel):
+    time: float
+    # SimulateRequest.stop_when дахь дугаар
+    condition: int
+
+
+class AggregatePayload(BaseModel):
+    # group_by тэнхлэгүүд (сонгосон утгуудаар); хоосон бол [time] series
+    dims: List[DimDef]
+    # [time][group_by[0]]... nested; reset үед simulation хоосон
+    baseline: List[Any]
+    simulation: List[Any]
+
+
+class ApproxSeriesPayload(SeriesPayload):
+    # True = emulator-оос; emulator бэлэн биш бол exact run-ийн үр дүн (False)
+    approx: bool = False
+    # output, он бүрийн хүлээгдэх алдаа (leave-one-out RMS); exact үед хоосон
+    error: Dict[str, List[float]] = Field(default_factory=dict)
+
+
+class CubePayload(BaseModel):
+    time: List[float]
+    # output -> time-ийн дараах тэнхлэгүүд; нийт дүн/scalar бол [] ([time] series)
+    dims: Dict[str, List[DimDef]]
+    # output -> [time][dims[0]][dims[1]]... nested (binary хариунд shape-тай buffer)
+    baseline: Dict[str, List[Any]]
+    simulation: Dict[str, List[Any]]
+    aggregates: Dict[str, AggregatePayload] = Field(default_factory=dict)
+    stopped: Optional[StopPayload] = None
 
 
 class ConfigPayload(BaseModel):
@@ -43,9 +79,58 @@ class ConfigPayload(BaseModel):
     demo_mode: bool
 
 
+class AggregateSpec(BaseModel):
+    # хариуны aggregates[name]
+    name: str = Field(..., min_length=1, max_length=64)
+    # output key (herd_total, births, losses, sold_used)
+    output: str
+    # үлдээх subscript тэнхлэгүүд; бусад нь reducer-ээр нэгтгэгдэнэ ([] = нэг series)
+    group_by: List[str] = Field(default_factory=list)
+    reducer: Literal["sum", "mean", "max"] = "sum"
+    # dim -> оруулах утгууд (олон сонголт); дурдаагүй dim бол бүх утга
+    select: Dict[str, List[str]] = Field(default_factory=dict)
+    # нүд бүрийн жин: "sheep_units" (model-ийн хонин толгойн коэффициент) эсвэл
+    # dim -> value -> жин (дурдаагүй утга 1); mean = жигнэсэн утгуудын дундаж
+    weights: Union[Literal["sheep_units"], Dict[str, Dict[str, float]], None] = None
+
+
+class StopCondition(BaseModel):
+    # "total_below": output-ийн бүх нүдний нийлбэр threshold-оос бага болбол,
+    # "any_below": аль нэг нүд (сум, малын төрөл) бага болбол (threshold 0 = сөрөг)
+    kind: Literal["total_below", "any_below"]
+    # output key (herd_total_total = нийт мал)
+    output: str = "herd_total_total"
+    threshold: float = 0.0
+
+
 class SimulateRequest(BaseModel):
     params: Dict[str, float] = Field(default_factory=dict)
     subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    # хоосон бол бүх output; жишээ нь ["herd_total"] үед зөвхөн түүнийг тооцож буцаана
+    outputs: Optional[List[str]] = None
+    # нэг client (browser tab)-ийн хүсэлтүүд: ижил session-ий илүү их seq ирвэл
+    # хуучин нь дараалалд байвал хасагдаж, ажиллаж байвал дараагийн алхамд зогсоно (409)
+    session_id: Optional[str] = Field(None, max_length=128)
+    seq: Optional[int] = None
+    # "cube": subscripts-ийг үл тоон output бүрийг бүтэн [time, сум, малын төрөл]
+    # массиваар (CubePayload); frontend өөрөө slice/sum хийнэ
+    layout: Literal["series", "cube"] = "series"
+    # subscript тэнхлэгээр нэгтгэсэн нэмэлт series (хариуны aggregates)
+    aggregates: List[AggregateSpec] = Field(default_factory=list, max_length=64)
+    # хугацааны цонх: зөвхөн эдгээр онуудыг хадгалж буцаана (PySD return_timestamps)
+    time_start: Optional[float] = None
+    time_end: Optional[float] = None
+    # цонхны хадгалсан онуудаас stride тутамд нэгийг (2 = хоёр жил тутам)
+    stride: int = Field(1, ge=1, le=1000)
+    # эсвэл яг эдгээр хадгалсан онууд (time_start/time_end/stride-тай хамт биш)
+    return_timestamps: Optional[List[float]] = Field(None, max_length=10000)
+    # model-ийн INITIAL TIME / FINAL TIME-ийг энэ хүсэлтэд солино (FINAL TIME-аас хойш ч);
+    # initial_time-д baseline-ийн тухайн оны stock-оос эхэлж интегралчилна;
+    # тэр оноос өмнө нөлөөлөх params (жишээ нь эхний мал сүрэг) -> 400
+    initial_time: Optional[float] = None
+    final_time: Optional[float] = None
+    # аль нэг нөхцөл биелсэн онд интеграл зогсоно (хариуны stopped)
+    stop_when: List[StopCondition] = Field(default_factory=list, max_length=16)
     # subscripts format:
     # {
     #   "herd_total": {"Аймаг": "Дорнод"},
@@ -53,6 +138,138 @@ class SimulateRequest(BaseModel):
     # }
 
 
+class SimulateStreamRequest(SimulateRequest):
+    # нэг "step" event-д орох хадгалсан хугацааны алхмын тоо
+    chunk: int = Field(1, ge=1, le=1000)
+
+
+class SimulateBatchRequest(BaseModel):
+    # сценари бүр нь SimulateRequest.params-тай ижил хэлбэртэй
+    scenarios: List[Dict[str, float]] = Field(default_factory=list, max_length=1000)
+    subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+
+
+class SeriesBatchPayload(BaseModel):
+    time: List[float]
+    # бүх сценарид нэг л baseline
+    baseline: Dict[str, List[float]]
+    # scenarios-ийн дарааллаар, тус бүр SeriesPayload.simulation хэлбэртэй
+    simulations: List[Dict[str, List[float]]]
+    applied_subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+
+
+class SensitivityRequest(BaseModel):
+    # sobol: samples * (D + 2) run, S1/ST; morris: samples траектори * (D + 1) run, mu_star/sigma
+    method: Literal["sobol", "morris"] = "sobol"
+    samples: int = Field(64, ge=2, le=4096)
+    seed: int = 0
+    # хувилбарлах slider-ууд (хоосон бол бүгд); бусад нь params-аас эсвэл моделийн утгаар
+    sliders: List[str] = Field(default_factory=list)
+    params: Dict[str, float] = Field(default_factory=dict)
+    subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    outputs: Optional[List[str]] = None
+
+
+class SensitivityPayload(BaseModel):
+    method: str
+    seed: int
+    runs: int
+    sliders: List[str]
+    time: List[float]
+    # output -> measure (S1, ST | mu_star, sigma) -> slider -> оны утгууд (хэлбэлзэлгүй онд null)
+    indices: Dict[str, Dict[str, Dict[str, List[Optional[float]]]]]
+
+
+class SliderDistribution(BaseModel):
+    # low/high өгөөгүй бол slider-ийн min/max; normal: mean/sd өгөөгүй бол мужийн дунд, муж/6
+    kind: Literal["uniform", "normal", "triangular"] = "uniform"
+    low: Optional[float] = None
+    high: Optional[float] = None
+    mode: Optional[float] = None
+    mean: Optional[float] = None
+    sd: Optional[float] = None
+
+
+class EnsembleRequest(BaseModel):
+    samples: int = Field(200, ge=2, le=20000)
+    seed: int = 0
+    # slider key -> тархалт (жишээ нь disaster_impact, disaster_freq, disaster_first_year)
+    distributions: Dict[str, SliderDistribution] = Field(min_length=1)
+    percentiles: List[float] = Field(default_factory=lambda: [5.0, 25.0, 50.0, 75.0, 95.0])
+    params: Dict[str, float] = Field(default_factory=dict)
+    subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    outputs: Optional[List[str]] = None
+
+
+class EnsemblePayload(BaseModel):
+    samples: int
+    seed: int
+    sliders: List[str]
+    percentiles: List[float]
+    time: List[float]
+    baseline: Dict[str, List[float]]
+    # output -> "p5", "p25", ..., "mean" -> оны утгууд
+    bands: Dict[str, Dict[str, List[float]]]
+
+
+class SweepAxis(BaseModel):
+    slider: str
+    # өгөөгүй бол SliderDef-ийн min/max/step
+    min: Optional[float] = None
+    max: Optional[float] = None
+    step: Optional[float] = None
+
+
+class SweepRequest(BaseModel):
+    axes: List[SweepAxis] = Field(min_length=1, max_length=3)
+    # final = сүүлийн он, min/max/mean = бүх оноор, year = тухайн оны утга
+    summary: Literal["final", "min", "max", "mean", "year"] = "final"
+    year: Optional[float] = None
+    params: Dict[str, float] = Field(default_factory=dict)
+    subscripts: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    outputs: Optional[List[str]] = None
+
+
+class SweepAxisValues(BaseModel):
+    slider: str
+    values: List[float]
+
+
+class SweepPayload(BaseModel):
+    axes: List[SweepAxisValues]
+    shape: List[int]
+    summary: str
+    year: Optional[float] = None
+    outputs: List[str]
+    # output -> axes-ийн дарааллаар үүрлэсэн жагсаалт (жижиг тор)
+    values: Optional[Dict[str, Any]] = None
+    # том тор: GET /api/sweep/{result_id} -> [len(outputs), *shape] .npy файл
+    result_id: Optional[str] = None
+
+
+class JobRequest(BaseModel):
+    # sweep | ensemble | sensitivity | simulate_batch
+    kind: str
+    # тухайн endpoint-ийн request body (SweepRequest, EnsembleRequest, ...)
+    spec: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    # queued | running | done | failed
+    status: str
+    # 0-100
+    progress: float = 0.0
+    error: Optional[str] = None
+    # unix seconds
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # үүний дараа job болон үр дүн устна
+    expires_at: Optional[float] = None
+
+
 class ExplainRequest(BaseModel):
     # frontend-оос бэлдсэн товч статистик
     params_used: Dict[str, float] = Field(default_factory=dict)
@@ -0,0 +1,174 @@
+import warnings
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.stats import qmc
+except Exception:
+    qmc = None
+
+
+# Morris: 4 түвшинтэй тор, алхам = p / (2 (p - 1))
+MORRIS_LEVELS = 4
+
+
+def slider_bounds(sliders: Sequence[Any], keys: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    defs = {s.key: s for s in sliders}
+    unknown = [k for k in keys if k not in defs]
+    if unknown:
+        raise ValueError(f"Unknown slider(s): {', '.join(unknown)}")
+    lo = np.array([float(defs[k].min) for k in keys])
+    hi = np.array([float(defs[k].max) for k in keys])
+    return lo, hi
+
+
+def run_count(method: str, samples: int, n_params: int) -> int:
+    return samples * (n_params + 2) if method == "sobol" else samples * (n_params + 1)
+
+
+def saltelli_sample(n: int, d: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    [A; B; AB_1 .. AB_d] дарааллаар (n * (d + 2), d) unit-cube цэгүүд.
+    AB_i = A with column i taken from B. A and B come from one scrambled
+    Sobol sequence when scipy is available (much less noise than plain
+    random draws at the same n), otherwise from ``rng``.
+    """
+    if qmc is not None:
+        with warnings.catch_warnings():
+            # balance properties want n = 2^k; other n still work
+            warnings.simplefilter("ignore", UserWarning)
+            ab = qmc.Sobol(2 * d, scramble=True, seed=rng).random(n)
+    else:
+        ab = rng.random((n, 2 * d))
+    a, b = ab[:, :d], ab[:, d:]
+    blocks = [a, b]
+    for i in range(d):
+        m = a.copy()
+        m[:, i] = b[:, i]
+        blocks.append(m)
+    return np.concatenate(blocks)
+
+
+def sobol_indices(y: np.ndarray, n: int, d: int) -> Dict[str, np.ndarray]:
+    """
+    y: [n * (d + 2), time] in saltelli_sample order.
+    First-order (Saltelli 2010) and total (Jansen) indices, each [d, time].
+    Years where the output does not vary at all come back as NaN.
+    """
+    # centring does not change the indices but removes most of the estimator
+    # noise for outputs with a large mean (herd counts)
+    y = y - y[:2 * n].mean(axis=0)
+    f_a, f_b = y[:n], y[n:2 * n]
+    f_ab = y[2 * n:].reshape(d, n, -1)
+    var = np.var(np.concatenate([f_a, f_b]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s1 = np.mean(f_b * (f_ab - f_a), axis=1) / var
+        st = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / var
+    zero = var <= 0
+    s1[:, zero] = np.nan
+    st[:, zero] = np.nan
+    return {"S1": s1, "ST": st}
+
+
+def morris_sample(r: int, d: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    r trajectories of d + 1 points each, one factor moved per step.
+    Returns the points (r * (d + 1), d) and which factor moved into each
+    point ([r, d], trajectory order).
+    """
+    levels = np.arange(MORRIS_LEVELS) / (MORRIS_LEVELS - 1)
+    delta = MORRIS_LEVELS / (2.0 * (MORRIS_LEVELS - 1))
+    points = np.empty((r, d + 1, d))
+    order = np.empty((r, d), dtype=int)
+    for t in range(r):
+        x = rng.choice(levels, size=d)
+        order[t] = rng.permutation(d)
+        points[t, 0] = x
+        for j, i in enumerate(order[t]):
+            x = x.copy()
+            # stay inside [0, 1]: step up when there is room, else down
+            x[i] = x[i] + delta if x[i] + delta <= 1.0 + 1e-12 else x[i] - delta
+            points[t, j + 1] = x
+    return points.reshape(r * (d + 1), d), order
+
+
+def morris_indices(y: np.ndarray, x: np.ndarray, order: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    y: [r * (d + 1), time], x: the unit-scaled points actually run (after
+    slider quantization). Elementary effects are per full slider range.
+    """
+    r, d = order.shape
+    y = y.reshape(r, d + 1, -1)
+    x = x.reshape(r, d + 1, d)
+    effects = np.full((d, r, y.shape[-1]), np.nan)
+    for t in range(r):
+        for j, i in enumerate(order[t]):
+            dx = x[t, j + 1, i] - x[t, j, i]
+            if dx != 0:
+                effects[i, t] = (y[t, j + 1] - y[t, j]) / dx
+    with warnings.catch_warnings():
+        # a factor whose step always quantized to zero has no effects ("mean of empty slice")
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mu_star = np.nanmean(np.abs(effects), axis=1)
+        sigma = np.nanstd(effects, axis=1, ddof=1) if r > 1 else np.full_like(mu_star, np.nan)
+    return {"mu_star": mu_star, "sigma": sigma}
+
+
+def _as_list(values: np.ndarray) -> List[float | None]:
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def run_sensitivity(
+    engine: Any,
+    sliders: Sequence[Any],
+    keys: Sequence[str],
+    method: str,
+    samples: int,
+    seed: int,
+    fixed: Dict[str, float],
+    subscripts: Dict[str, Dict[str, str]],
+    outputs: List[str] | None,
+    progress: Callable[[int, int], None] | None = None,
+) -> Dict[str, Any]:
+    """
+    Slider бүрийн нөлөөг output, он тус бүрээр тооцно. Дээжийг
+    engine.simulate_arrays-аар нэг batch болгон (worker/kernel) ажиллуулна.
+    """
+    keys = list(keys)
+    d = len(keys)
+    lo, hi = slider_bounds(sliders, keys)
+    rng = np.random.default_rng(seed)
+    if method == "sobol":
+        unit = saltelli_sample(samples, d, rng)
+    else:
+        unit, order = morris_sample(samples, d, rng)
+
+    # quantize to each slider's step so the runs match what /api/simulate would do
+    params_list = []
+    for row in lo + unit * (hi - lo):
+        p = dict(fixed)
+        p.update(zip(keys, (float(v) for v in row)))
+        params_list.append(engine.canonical_params(p))
+
+    time, arrays = engine.simulate_arrays(params_list, subscripts, outputs, progress)
+    indices: Dict[str, Dict[str, Dict[str, List[float | None]]]] = {}
+    for out_key, y in arrays.items():
+        if method == "sobol":
+            measures = sobol_indices(y, samples, d)
+        else:
+            used = np.array([[p[k] for k in keys] for p in params_list])
+            span = np.where(hi > lo, hi - lo, 1.0)
+            measures = morris_indices(y, (used - lo) / span, order)
+        indices[out_key] = {
+            name: {k: _as_list(values[i]) for i, k in enumerate(keys)}
+            for name, values in measures.items()
+        }
+    return {
+        "method": method,
+        "seed": seed,
+        "runs": len(params_list),
+        "sliders": keys,
+        "time": time,
+        "indices": indices,
+    }
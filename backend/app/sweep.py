@@ -0,0 +1,147 @@
+import logging
+import time as _time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# нэг удаад ажиллуулах сценарийн тоо (түүхий [chunk, time] массив л санах ойд байна)
+SWEEP_CHUNK = 1024
+# дискэн дээрх sweep үр дүнг ийм хугацааны дараа устгана
+SWEEP_FILE_TTL = 24 * 3600
+
+SUMMARIES = ("final", "min", "max", "mean", "year")
+
+
+def grid_values(slider: Any, lo: float | None, hi: float | None, step: float | None) -> List[float]:
+    """min..max хооронд step алхамтай утгууд (өгөөгүйг SliderDef-ээс авна)."""
+    lo = float(slider.min) if lo is None else max(float(lo), float(slider.min))
+    hi = float(slider.max) if hi is None else min(float(hi), float(slider.max))
+    step = float(slider.step) if step is None else float(step)
+    if step <= 0:
+        raise ValueError(f"{slider.key}: step must be > 0")
+    if hi < lo:
+        raise ValueError(f"{slider.key}: max must be >= min")
+    n = int(np.floor((hi - lo) / step + 1e-9)) + 1
+    return [round(lo + i * step, 10) for i in range(n)]
+
+
+def summarize(y: np.ndarray, summary: str, year_index: int | None) -> np.ndarray:
+    """y: [scenario, time] -> [scenario]."""
+    if summary == "final":
+        return y[:, -1]
+    if summary == "min":
+        return y.min(axis=1)
+    if summary == "max":
+        return y.max(axis=1)
+    if summary == "mean":
+        return y.mean(axis=1)
+    return y[:, year_index]
+
+
+def sweep_dir(cache_dir: str) -> Path:
+    return Path(cache_dir).expanduser() / "sweeps"
+
+
+def sweep_file(cache_dir: str, result_id: str) -> Path:
+    return sweep_dir(cache_dir) / f"{result_id}.npy"
+
+
+def _prune(folder: Path) -> None:
+    cutoff = _time.time() - SWEEP_FILE_TTL
+    for old in folder.glob("*.npy"):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            continue
+
+
+def run_sweep(
+    engine: Any,
+    sliders: Sequence[Any],
+    axes: Sequence[Any],
+    summary: str,
+    year: float | None,
+    fixed: Dict[str, float],
+    subscripts: Dict[str, Dict[str, str]],
+    outputs: List[str] | None,
+    max_runs: int,
+    inline_max: int,
+    cache_dir: str,
+    progress: Callable[[int, int], None] | None = None,
+) -> Dict[str, Any]:
+    """
+    1-3 slider-ийн Cartesian торыг chunk-аар ажиллуулж, output бүрийн
+    summary-г [n1, (n2, (n3))] массивт бичнэ. inline_max-аас том торыг
+    CACHE_DIR/sweeps/<id>.npy memory-mapped файлд бичиж, id-г нь буцаана.
+    """
+    defs = {s.key: s for s in sliders}
+    keys = [a.slider for a in axes]
+    unknown = [k for k in keys if k not in defs]
+    if unknown:
+        raise ValueError(f"Unknown slider(s): {', '.join(unknown)}")
+    if len(set(keys)) != len(keys):
+        raise ValueError("Each slider can appear only once")
+    values = [grid_values(defs[a.slider], a.min, a.max, a.step) for a in axes]
+    shape = tuple(len(v) for v in values)
+    points = int(np.prod(shape))
+    if points > max_runs:
+        raise ValueError(f"{points} grid points requested, the limit is {max_runs}")
+
+    time = engine.get_baseline_filtered(subscripts, outputs)[0]
+    year_index = None
+    if summary == "year":
+        if year is None:
+            raise ValueError("summary=year needs a year")
+        matches = [i for i, t in enumerate(time) if abs(float(t) - float(year)) < 1e-9]
+        if not matches:
+            raise ValueError(f"Year {year:g} is not in the simulation output")
+        year_index = matches[0]
+
+    out_keys = engine.output_keys(outputs)
+    result_id = None
+    if points > inline_max:
+        folder = sweep_dir(cache_dir)
+        folder.mkdir(parents=True, exist_ok=True)
+        _prune(folder)
+        result_id = uuid.uuid4().hex
+        result = np.lib.format.open_memmap(
+            sweep_file(cache_dir, result_id), mode="w+", dtype=np.float64, shape=(len(out_keys),) + shape
+        )
+    else:
+        result = np.empty((len(out_keys),) + shape)
+    flat = result.reshape(len(out_keys), points)
+
+    for start in range(0, points, SWEEP_CHUNK):
+        idx = np.unravel_index(np.arange(start, min(start + SWEEP_CHUNK, points)), shape)
+        params_list = []
+        for j in range(len(idx[0])):
+            p = dict(fixed)
+            p.update((k, values[a][idx[a][j]]) for a, k in enumerate(keys))
+            params_list.append(p)
+        step = None if progress is None else (lambda done, _, offset=start: progress(offset + done, points))
+        _, arrays = engine.simulate_arrays(params_list, subscripts, out_keys, step)
+        for o, k in enumerate(out_keys):
+            flat[o, start:start + len(params_list)] = summarize(arrays[k], summary, year_index)
+
+    payload: Dict[str, Any] = {
+        "axes": [{"slider": k, "values": v} for k, v in zip(keys, values)],
+        "shape": list(shape),
+        "summary": summary,
+        "year": float(time[year_index]) if year_index is not None else None,
+        "outputs": out_keys,
+        "values": None,
+        "result_id": result_id,
+    }
+    if result_id is None:
+        payload["values"] = {k: result[o].tolist() for o, k in enumerate(out_keys)}
+    else:
+        result.flush()
+        del result, flat
+        logger.info("Sweep %s: %d points written to disk", result_id, points)
+    return payload
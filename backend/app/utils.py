@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 
 
@@ -8,6 +9,14 @@ def file_exists(path: str) -> bool:
         return False
 
 
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(Path(path).expanduser(), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def safe_float(x, default=0.0) -> float:
     try:
         return float(x)
@@ -0,0 +1,156 @@
+import json
+import struct
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+
+MEDIA_BINARY = "application/octet-stream"
+MEDIA_MSGPACK = ("application/msgpack", "application/x-msgpack")
+MAGIC = b"SDW1"
+# buffer бүр 8 байтаар эхэлнэ: JS Float64Array(buffer, offset) шууд view болно
+ALIGN = 8
+DTYPES = ("float64", "float32")
+
+# SeriesPayload маягийн хариунуудын buffer болох талбарууд (бусад нь header-т)
+SERIES_FIELDS = ("baseline", "simulation", "error", "simulations", "bands", "aggregates")
+
+
+def negotiate(accept: str) -> Tuple[str, str] | None:
+    """
+    ``Accept`` -> ("binary" | "msgpack", dtype) эсвэл JSON бол None.
+    dtype is an Accept parameter: ``application/octet-stream; dtype=float32``.
+    msgpack is only offered when the package is installed.
+    """
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        opts = dict(p.split("=", 1) for p in params if "=" in p)
+        dtype = opts.get("dtype", "float64")
+        if dtype not in DTYPES:
+            dtype = "float64"
+        if media == MEDIA_BINARY:
+            return "binary", dtype
+        if media in MEDIA_MSGPACK and msgpack is not None:
+            return "msgpack", dtype
+    return None
+
+
+def as_lists(value: Any) -> Any:
+    """NumPy массивуудыг жагсаалт болгоно (JSON / pydantic замд)."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: as_lists(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) and value and not isinstance(value[0], (int, float)):
+        return [as_lists(v) for v in value]
+    return value
+
+
+def _fill(payload: Dict[str, Any], model: type[BaseModel] | None) -> Dict[str, Any]:
+    """model-ийн талбарын дарааллаар, дутууг default-аар (элемент бүрийг шалгахгүй)."""
+    if model is None:
+        return payload
+    return {
+        name: payload[name] if name in payload else field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+    }
+
+
+def json_bytes(payload: Dict[str, Any], model: type[BaseModel] | None = None) -> bytes:
+    """
+    ``model``-ийн JSON хэлбэрээр, pydantic/jsonable_encoder-ийг алгасаж encode хийнэ.
+    orjson (requirements.txt) writes NumPy arrays directly. NaN/inf become null.
+    """
+    payload = _fill(payload, model)
+    return orjson.dumps(payload, default=_contiguous, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _contiguous(value: Any) -> Any:
+    # orjson зөвхөн C-contiguous массив бичнэ; баганын slice-ийг хуулна
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_response(payload: Dict[str, Any], model: type[BaseModel] | None = None) -> Response:
+    return Response(json_bytes(payload, model), media_type="application/json")
+
+
+def _is_numbers(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) and all(isinstance(v, (int, float)) for v in value)
+
+
+def _split(value: Any, dtype: np.dtype, buffers: List[np.ndarray], offset: List[int]) -> Any:
+    """Series-ийг buffer болгон салгаж, байрыг нь {"$buf": [offset, length]} болгоно."""
+    if isinstance(value, dict):
+        # aggregate-ийн "dims" нь тэнхлэгийн нэрс, header-т хэвээр үлдэнэ
+        return {k: v if k == "dims" else _split(v, dtype, buffers, offset) for k, v in value.items()}
+    if isinstance(value, np.ndarray) or _is_numbers(value):
+        # float64 contiguous array is used as is (no copy)
+        arr = np.ascontiguousarray(value, dtype=dtype)
+        ref: Dict[str, Any] = {"$buf": [offset[0], int(arr.size)]}
+        if arr.ndim > 1:
+            ref["shape"] = list(arr.shape)
+        buffers.append(arr)
+        offset[0] += -(-arr.nbytes // ALIGN) * ALIGN
+        return ref
+    if isinstance(value, (list, tuple)):
+        return [_split(v, dtype, buffers, offset) for v in value]
+    return value
+
+
+def _frames(header: bytes, buffers: List[np.ndarray]) -> Iterator[bytes | memoryview]:
+    yield MAGIC + struct.pack("<I", len(header))
+    yield header + b" " * (-len(header) % ALIGN)
+    for arr in buffers:
+        yield memoryview(arr).cast("B")
+        if arr.nbytes % ALIGN:
+            yield b"\0" * (-arr.nbytes % ALIGN)
+
+
+def response(payload: Dict[str, Any], fmt: Tuple[str, str], fields: Sequence[str] = SERIES_FIELDS) -> Response:
+    """
+    ``payload``-ийн ``fields`` дахь series-ийг typed buffer болгож буцаана.
+
+    binary layout: b"SDW1", uint32 LE header length, JSON header (space
+    padded to 8 bytes), then the buffers, each padded to 8 bytes. Header:
+    ``{"dtype", "meta": other fields (time, applied_subscripts, ...),
+    "data": fields with every series replaced by {"$buf": [offset, length]}}``,
+    offsets counted from the end of the padded header. msgpack carries the
+    same header with ``data`` holding raw ``bin`` buffers instead.
+    """
+    kind, dtype = fmt
+    meta = {k: as_lists(v) for k, v in payload.items() if k not in fields}
+    buffers: List[np.ndarray] = []
+    offset = [0]
+    data = _split({k: v for k, v in payload.items() if k in fields}, np.dtype(dtype), buffers, offset)
+    headers = {"Vary": "Accept"}
+
+    if kind == "msgpack":
+        def raw(node: Any) -> Any:
+            if isinstance(node, dict) and "$buf" in node:
+                arr = buffers[raw.i]
+                raw.i += 1
+                return {"shape": list(arr.shape), "data": memoryview(arr).cast("B")}
+            if isinstance(node, dict):
+                return {k: raw(v) for k, v in node.items()}
+            if isinstance(node, list):
+                return [raw(v) for v in node]
+            return node
+
+        raw.i = 0
+        body = msgpack.packb({"dtype": dtype, "meta": meta, "data": raw(data)})
+        return Response(body, media_type=MEDIA_MSGPACK[0], headers=headers)
+
+    header = json.dumps({"dtype": dtype, "meta": meta, "data": data}, ensure_ascii=False).encode("utf-8")
+    length = 8 + len(header) + (-len(header) % ALIGN) + offset[0]
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_frames(header, buffers), media_type=MEDIA_BINARY, headers=headers)
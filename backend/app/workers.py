@@ -0,0 +1,162 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from .horizon import Horizon
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolError(RuntimeError):
+    """The pool could not run the task even after restarting its workers."""
+
+
+# ---- worker process side ------------------------------------------------
+
+_worker_engine: Any = None
+
+
+def _init_worker(py_model_file: str, model_hash: str, use_kernel: bool) -> None:
+    global _worker_engine
+    # imported here so the parent never pulls the engine in through this module
+    from .model_engine import ModelEngine
+
+    engine = ModelEngine()
+    engine.load_worker(py_model_file, model_hash, use_kernel)
+    _worker_engine = engine
+
+
+def _task_ping() -> bool:
+    return _worker_engine is not None
+
+
+def _task_run(overrides: Dict[str, Any], columns: List[str] | None, horizon: Horizon | None = None) -> pd.DataFrame:
+    return _worker_engine._run_local(overrides, columns, None, horizon)
+
+
+def _task_batch(overrides_list: List[Dict[str, Any]], subscripts: Dict[str, Dict[str, str]]) -> List[Dict[str, List[float]]]:
+    return _worker_engine._run_batch_local(overrides_list, subscripts)
+
+
+# ---- parent side ----------------------------------------------------------
+
+class SimulationPool:
+    """
+    Симуляцийг тусдаа процессуудад ажиллуулна. Процесс бүр өөрийн
+    ачаалсан модельтой тул PySD-ийн төлөв болон GIL хуваалцахгүй.
+
+    Workers are recycled after ``max_runs`` tasks and the whole pool is
+    rebuilt if a worker dies (ProcessPoolExecutor marks itself broken).
+    ``use_kernel``: the parent's verified NumPy kernel decision; workers
+    follow it instead of compiling on their own.
+    """
+
+    def __init__(self, size: int, max_runs: int, py_model_file: str, model_hash: str = "", use_kernel: bool = False):
+        self.size = max(1, int(size))
+        self.max_runs = int(max_runs) if max_runs and max_runs > 0 else None
+        self.py_model_file = py_model_file
+        self.model_hash = model_hash
+        self.use_kernel = use_kernel
+        self.restarts = 0
+        self.tasks = 0
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._executor = self._new_executor()
+        self._warm_up()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: max_tasks_per_child is not allowed with fork, and it also
+        # behaves the same on Windows dev machines
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.py_model_file, self.model_hash, self.use_kernel),
+            max_tasks_per_child=self.max_runs,
+        )
+
+    def _warm_up(self) -> None:
+        # load the model in every worker now instead of on the first request
+        executor = self._executor
+        if executor is None:
+            return
+        for _ in range(self.size):
+            try:
+                executor.submit(_task_ping)
+            except Exception:
+                break
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return  # another thread already replaced it
+            logger.warning("Simulation worker crashed, restarting pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            self.restarts += 1
+        self._warm_up()
+
+    def _call(self, fn: Callable, *args: Any) -> Any:
+        last_error: Exception | None = None
+        for _ in range(2):
+            executor = self._executor
+            if executor is None:
+                raise WorkerPoolError("Pool is not running")
+            try:
+                result = executor.submit(fn, *args).result()
+                self.tasks += 1
+                return result
+            except BrokenProcessPool as e:
+                last_error = e
+                self._restart(executor)
+        raise WorkerPoolError(f"Simulation worker failed: {last_error}")
+
+    def run(self, overrides: Dict[str, Any], columns: List[str] | None = None, horizon: Horizon | None = None) -> pd.DataFrame:
+        return self._call(_task_run, overrides, columns, horizon)
+
+    def run_batch(self, overrides_list: List[Dict[str, Any]], subscripts: Dict[str, Dict[str, str]]) -> List[Dict[str, List[float]]]:
+        if not overrides_list:
+            return []
+        # split across workers so a batch uses every core
+        n = min(self.size, len(overrides_list))
+        bounds = [len(overrides_list) * i // n for i in range(n + 1)]
+        chunks = [overrides_list[bounds[i]:bounds[i + 1]] for i in range(n)]
+        executor = self._executor
+        if executor is None:
+            raise WorkerPoolError("Pool is not running")
+        try:
+            futures = [executor.submit(_task_batch, chunk, subscripts) for chunk in chunks]
+            out: List[Dict[str, List[float]]] = []
+            for f in futures:
+                out.extend(f.result())
+            self.tasks += len(futures)
+            return out
+        except BrokenProcessPool:
+            self._restart(executor)
+            out = []
+            for chunk in chunks:
+                out.extend(self._call(_task_batch, chunk, subscripts))
+            return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "max_runs_per_worker": self.max_runs,
+            "tasks": self.tasks,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
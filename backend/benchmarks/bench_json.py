@@ -0,0 +1,73 @@
+"""
+JSON хариуны encode хийх CPU хугацаа: хуучин (pydantic + jsonable_encoder) vs wire.json_bytes.
+
+    cd backend
+    python -m benchmarks.bench_json [--series 5 70 350] [--points 27] [--repeat 200]
+
+The old path is what FastAPI did when an endpoint returned ``SeriesPayload``:
+arrays to lists, model validation, ``jsonable_encoder`` and ``JSONResponse``
+rendering. Series are synthetic float64 arrays of ``--points`` years, in both
+``baseline`` and ``simulation``. Times are process CPU time per request.
+"""
+import argparse
+import time as _time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import wire
+from app.schemas import SeriesPayload
+
+
+def _payload(series: int, points: int, rng: np.random.Generator) -> dict:
+    names = [f"series_{i}" for i in range(series)]
+    return {
+        "time": np.arange(2014.0, 2014.0 + points),
+        "baseline": {n: rng.random(points) * 1e6 for n in names},
+        "simulation": {n: rng.random(points) * 1e6 for n in names},
+        "applied_subscripts": {},
+    }
+
+
+def _old(result: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(SeriesPayload(**wire.as_lists(result)))).body
+
+
+def _new(result: dict) -> bytes:
+    return wire.json_bytes(result, SeriesPayload)
+
+
+def _cpu_us(func, result: dict, repeat: int) -> float:
+    func(result)
+    t0 = _time.process_time()
+    for _ in range(repeat):
+        func(result)
+    return (_time.process_time() - t0) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--series", type=int, nargs="+", default=[5, 70, 350])
+    parser.add_argument("--points", type=int, default=27)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"encoder: orjson {wire.orjson.__version__}, points={args.points}")
+    print(f"{'series':>7} {'bytes':>9} {'old us':>9} {'new us':>9} {'saved us':>9} {'speedup':>8}")
+    for series in args.series:
+        result = _payload(series, args.points, rng)
+        old_body, new_body = _old(result), _new(result)
+        if old_body != new_body:
+            raise SystemExit(f"{series} series: encoded bodies differ")
+        old_us = _cpu_us(_old, result, args.repeat)
+        new_us = _cpu_us(_new, result, args.repeat)
+        print(
+            f"{series:>7} {len(new_body):>9} {old_us:>9.0f} {new_us:>9.0f} "
+            f"{old_us - new_us:>9.0f} {old_us / new_us:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
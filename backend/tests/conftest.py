@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """app.main with the real model on the PySD engine (the path every API request takes)."""
+    from app.config import settings
+
+    settings.MODEL_PATH = str(BACKEND / "models" / "dornodjinkencopy2.mdl")
+    settings.CACHE_DIR = str(tmp_path_factory.mktemp("cache"))
+    settings.SIM_ENGINE = "pysd"
+    settings.SIM_WORKERS = 0
+    settings.EMULATOR_AXIS_POINTS = 0
+    from app import main
+
+    if main.engine.demo_mode:
+        pytest.skip("PySD model not available (demo mode)")
+    return main
+
+
+@pytest.fixture(scope="session")
+def engine(main):
+    return main.engine
+
+
+@pytest.fixture(scope="session")
+def client(main):
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def compile_kernel(engine):
+    """Шинэ CompiledModel; constant-уудыг model-ийн одоогийн утгаас уншдаг тул өмнөх run-ий override-ийг буцаана."""
+    from app.kernel import CompiledModel
+
+    def compile():
+        engine.model.set_components(dict(engine._param_defaults))
+        return CompiledModel(engine.model)
+
+    return compile
+
+
+@pytest.fixture(scope="session")
+def kernel(compile_kernel):
+    return compile_kernel()
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+OUTPUT = "herd_total_total"
+
+
+def reference(engine, params, timestamps=None, final_time=None):
+    """Plain ``model.run`` from INITIAL TIME, no resume, cache or stepping."""
+    overrides = engine._to_overrides(engine.canonical_params(params))
+    df = engine.model.run(
+        params={**engine._param_defaults, **overrides},
+        return_timestamps=timestamps,
+        initial_condition="original",
+        final_time=final_time or engine._final_time,
+    )
+    if timestamps is not None:
+        df = df.loc[np.isin(np.round(df.index.to_numpy(dtype=float), 9), np.round(timestamps, 9))]
+    return engine._extract_arrays(df, {}, [OUTPUT])[OUTPUT]
+
+
+def simulate(client, body):
+    r = client.post("/api/simulate", json={"outputs": [OUTPUT], **body})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+@pytest.mark.parametrize(
+    "share, window",
+    [
+        (0.53, {"time_start": 2020, "stride": 2}),
+        (0.31, {"final_time": 2030}),
+        (0.27, {"return_timestamps": [2014, 2016, 2024, 2033]}),
+    ],
+)
+def test_full_run_after_resumed_run(client, engine, share, window):
+    # repro_rate нь 2025-аас нөлөөлнө: энэ run baseline-ийн stock-оос үргэлжилнэ
+    simulate(client, {"params": {"repro_rate": share}, **window})
+    # slaughter_share нь эхнээс нөлөөлнө: INITIAL TIME-аас бүтэн run
+    params = {"slaughter_share": share}
+    out = simulate(client, {"params": params, **window})
+    series = out["simulation"][OUTPUT]
+    assert len(series) == len(out["time"])
+    expected = reference(engine, params, out["time"], window.get("final_time"))
+    np.testing.assert_allclose(series, expected, rtol=1e-9)
+
+
+def test_stop_after_resumed_run(client, engine):
+    simulate(client, {"params": {"repro_rate": 0.4}})
+    params = {"slaughter_share": 0.9}
+    out = simulate(client, {"params": params, "stop_when": [{"kind": "total_below", "output": OUTPUT, "threshold": 5e6}]})
+    series = out["simulation"][OUTPUT]
+    expected = reference(engine, params)
+    below = np.nonzero(np.asarray(expected) < 5e6)[0]
+    assert below.size, "the scenario must reach the threshold"
+    assert out["stopped"] == {"time": out["time"][below[0]], "condition": 0}
+    np.testing.assert_allclose(series, expected[: below[0] + 1], rtol=1e-9)
+
+
+def test_initial_time_rejects_overrides_that_act_earlier(client):
+    # repro_rate нь 2025-аас нөлөөлнө
+    r = client.post("/api/simulate", json={"params": {"repro_rate": 0.4}, "initial_time": 2030})
+    assert r.status_code == 400
+    assert "repro_rate" in r.json()["detail"] and "2025" in r.json()["detail"]
+    # initial_herd нь эхний оноос
+    r = client.post("/api/simulate", json={"params": {"initial_herd": 900000}, "initial_time": 2020})
+    assert r.status_code == 400
+    assert "initial_herd" in r.json()["detail"]
+
+
+def test_initial_time_accepts_overrides_from_that_year(client, engine):
+    params = {"repro_rate": 0.35}
+    out = simulate(client, {"params": params, "initial_time": 2025})
+    assert out["time"][0] == 2025
+    # 2025-аас нөлөөлөх тул baseline-ийн 2025 оны stock-оос эхэлсэн нь бүтэн run-тай ижил
+    expected = reference(engine, params, out["time"])
+    np.testing.assert_allclose(out["simulation"][OUTPUT], expected, rtol=1e-9)
+
+
+def test_initial_time_ignores_values_equal_to_the_model(client, engine):
+    # disaster_first_year-ийн model-ийн утга 2100 (гамшиггүй): юу ч өөрчлөхгүй
+    assert engine._param_defaults[engine.param_map["disaster_first_year"]] == 2100
+    out = simulate(client, {"params": {"disaster_first_year": 2100}, "initial_time": 2030})
+    assert out["time"][0] == 2030
+
+
+def test_reset_with_initial_time_ignores_params(client):
+    r = client.post("/api/reset", json={"params": {"initial_herd": 900000}, "initial_time": 2030})
+    assert r.status_code == 200, r.text
+
+
+def synthetic_horizon(conditions, timestamps=None, initial_time=None):
+    from app.columns import ColumnIndex
+    from app.horizon import Horizon, StopPlan
+    from app.schemas import StopCondition
+
+    index = ColumnIndex(["Herd[a,x]", "Herd[b,x]", "Loss"], {"herd": "Herd", "loss": "Loss"})
+    stop = StopPlan([StopCondition(**c) for c in conditions], index, ["herd", "loss"])
+    return Horizon(timestamps, None, initial_time, stop)
+
+
+def synthetic_frame():
+    import pandas as pd
+
+    return pd.DataFrame(
+        {"Herd[a,x]": [5.0, 3.0, 1.0, -1.0], "Herd[b,x]": [5.0, 4.0, 2.0, 0.0], "Loss": [0.0, 1.0, 2.0, 3.0]},
+        index=pd.Index([2020.0, 2021.0, 2022.0, 2023.0], name="time"),
+    )
+
+
+def test_stop_cuts_at_the_first_condition_met():
+    horizon = synthetic_horizon([
+        {"kind": "any_below", "output": "herd", "threshold": 0},
+        {"kind": "total_below", "output": "herd", "threshold": 4},
+    ])
+    out = horizon.finish(synthetic_frame())
+    # 2022: нийт 3 < 4 (нөхцөл 1); 2023-ийн сөрөг нүд хүртэл хүлээхгүй
+    assert out.index.tolist() == [2020.0, 2021.0, 2022.0]
+    assert out.attrs["stopped"] == {"time": 2022.0, "condition": 1}
+
+
+def test_stop_ignores_rows_before_initial_time():
+    horizon = synthetic_horizon([{"kind": "total_below", "output": "herd", "threshold": 10}], initial_time=2022.0)
+    out = horizon.finish(synthetic_frame())
+    # 2021-ийн нийт 7 < 10 боловч эхлэх оноос өмнө
+    assert out.attrs["stopped"] == {"time": 2022.0, "condition": 0}
+
+
+def test_finish_keeps_only_the_window_rows():
+    horizon = synthetic_horizon([{"kind": "any_below", "output": "loss", "threshold": -1}], timestamps=[2021.0, 2023.0])
+    df = synthetic_frame()
+    out = horizon.finish(df)
+    assert out.index.tolist() == [2021.0, 2023.0]
+    assert out.attrs["stopped"] is None
+    # cache-д буй frame-ийн attrs өөрчлөгдөхгүй
+    assert "stopped" not in df.attrs
+
+
+def test_time_mask_tolerates_float_steps():
+    from app.horizon import time_mask
+
+    times = 2014 + 0.1 * np.arange(31)
+    assert time_mask(times, [2015.0, 2017.0]).nonzero()[0].tolist() == [10, 30]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from app.kernel import KernelUnsupported
+
+
+def pysd_run(engine, overrides):
+    return engine.model.run(
+        params={**engine._param_defaults, **overrides},
+        initial_condition="original",
+        final_time=engine._final_time,
+    )
+
+
+def assert_same(df, reference):
+    assert list(df.columns) == [str(c) for c in reference.columns]
+    np.testing.assert_allclose(df.to_numpy(), reference.to_numpy(dtype=float), rtol=1e-9, atol=1e-6)
+
+
+def test_defaults_match_pysd(engine, kernel):
+    assert_same(kernel.run(), engine._baseline_df)
+
+
+@pytest.mark.parametrize("bound", ["min", "max"])
+def test_slider_overrides_match_pysd(main, engine, kernel, bound):
+    # slider бүрийг нэг нэгээр нь хязгаарын утгад (API-ийн scalar override)
+    for slider in main.SLIDERS:
+        overrides = engine._to_overrides({slider.key: getattr(slider, bound)})
+        assert_same(kernel.run(overrides), pysd_run(engine, overrides))
+
+
+def test_equation_numbers_come_from_the_model(kernel):
+    assert kernel.literals["nvs__22"] == {"history_end": 2024.0, "base_loss": 0.004}
+    assert kernel.literals["nvs__24"] == {"Адуу": 7.0, "Үхэр": 6.0, "Тэмээ": 5.0, "Ямаа": 0.9}
+
+
+def test_verify_probes_catch_numbers_off_the_default_path(engine, compile_kernel):
+    kernel = compile_kernel()
+    # гамшгийн дараах сэргэлт: default run-д гамшиг тохиолдохгүй
+    kernel.literals["nvs__19"] = {**kernel.literals["nvs__19"], "recovery_end": 3.0}
+    kernel.verify(engine._baseline_df)
+    with pytest.raises(KernelUnsupported):
+        kernel.verify(engine._baseline_df, engine._kernel_probes())
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+SLIDER_KEYS = [
+    "repro_rate",
+    "slaughter_share",
+    "initial_herd",
+    "sold_used_share",
+    "disaster_impact",
+    "disaster_first_year",
+    "disaster_freq",
+]
+
+
+def full_run(engine, overrides):
+    """INITIAL TIME-аас бүтэн PySD run, baseline-ийн stock ашиглахгүй."""
+    return engine.model.run(
+        params={**engine._param_defaults, **overrides},
+        initial_condition="original",
+        final_time=engine._final_time,
+    )
+
+
+@pytest.fixture(scope="module")
+def sliders(main):
+    return {s.key: s for s in main.SLIDERS}
+
+
+def test_slider_keys(sliders):
+    assert sorted(sliders) == sorted(SLIDER_KEYS)
+
+
+def moved(engine, slider):
+    """Slider-ийн model-ийн утгаас ялгаатай хязгаар (disaster_first_year-ийн max нь model-ийн утга)."""
+    default = np.asarray(engine._param_defaults[engine.param_map[slider.key]], dtype=float)
+    value = slider.max if not np.all(default == slider.max) else slider.min
+    return engine._to_overrides({slider.key: value})
+
+
+@pytest.mark.parametrize("key", SLIDER_KEYS)
+def test_resume_matches_full_run(engine, kernel, sliders, key):
+    overrides = moved(engine, sliders[key])
+    start = engine._resume_time(overrides)
+    influence = engine._influence[engine.param_map[key]]
+    if influence <= engine._baseline_time[0]:
+        assert start is None
+    else:
+        # нөлөөлөх оноос өмнөх сүүлийн хадгалсан он
+        assert start == max(t for t in engine._baseline_time if t <= influence)
+    reference = full_run(engine, overrides).to_numpy(dtype=float)
+    # PySD: baseline-ийн stock-оос үргэлжилсэн run; kernel: default run-ийн stock-оос
+    for df in (engine._run_local(overrides), kernel.run(overrides, start=start)):
+        assert list(df.columns) == [str(c) for c in engine._baseline_df.columns]
+        np.testing.assert_allclose(df.to_numpy(dtype=float), reference, rtol=1e-9, atol=1e-6)
+
+
+def test_resume_reuses_the_baseline_prefix(engine, sliders):
+    overrides = moved(engine, sliders["repro_rate"])
+    start = engine._resume_time(overrides)
+    assert start is not None and start > engine._baseline_time[0]
+    df = engine._run_local(overrides)
+    before = df.index.to_numpy(dtype=float) < start
+    stock = [c for c in df.columns if c in engine._baseline_df.columns and not c.startswith(engine.param_map["repro_rate"])]
+    np.testing.assert_array_equal(
+        df.loc[before, stock].to_numpy(dtype=float),
+        engine._baseline_df.loc[before, stock].to_numpy(dtype=float),
+    )
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useMemo, useRef, useState } from "react";
 import Header from "./components/Header.jsx";
 import SliderPanel from "./components/SliderPanel.jsx";
 import ChartCard from "./components/ChartCard.jsx";
@@ -6,7 +6,7 @@ import AiExplain from "./components/AiExplain.jsx";
 import ChatPanel from "./components/ChatPanel.jsx";
 import ChatbotWidget from "./components/ChatbotWidget.jsx";
 import { useChat } from "./hooks/useChat.js";
-import { apiGetConfig, apiSimulate, apiReset, apiExplain, apiChatGraph } from "./api.js";
+import { apiGetConfig, apiSimulate, apiSimulateStream, apiReset, apiBaseline, apiExplain, apiChatGraph, isAbortError, sliceCube } from "./api.js";
 
 function pct(a, b) {
   if (a === 0 || a === null || a === undefined) return null;
@@ -77,6 +77,8 @@ export default function App() {
   const [baseParams, setBaseParams] = useState({});
   const [subscripts, setSubscripts] = useState({}); // global subscript selection
   const [series, setSeries] = useState(null);
+  // бүтэн [time, сум, төрөл] cube: subscript солиход сервер дуудахгүй
+  const [cube, setCube] = useState(null);
   const [running, setRunning] = useState(false);
 
   const [aiText, setAiText] = useState("");
@@ -84,6 +86,14 @@ export default function App() {
   const [activeSeriesKey, setActiveSeriesKey] = useState(null);
   const [selectedTimePoint, setSelectedTimePoint] = useState(null);
 
+  // tab бүрийн session: сервер ижил session-ий хуучин run-уудыг орхино
+  const sessionId = useMemo(
+    () => globalThis.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+    []
+  );
+  const simSeqRef = useRef(0);
+  const simAbortRef = useRef(null);
+
   useEffect(() => {
     (async () => {
       const cfg = await apiGetConfig();
@@ -105,15 +115,10 @@ export default function App() {
       }
       setSubscripts(initSubs);
 
-      // baseline load (reset endpoint returns baseline, empty simulation)
-      const resetPayload = {
-        params: initParams,
-        subscripts: Object.fromEntries(
-          outputs ? Object.keys(outputs).map((k) => [k, initSubs]) : []
-        )
-      };
-      const sData = await apiReset(resetPayload);
-      setSeries(sData);
+      // baseline cube load (empty simulation; HTTP-cached by ETag)
+      const cData = await apiBaseline({ layout: "cube" });
+      setCube(cData);
+      setSeries(sliceCube(cData, initSubs));
       setActiveSeriesKey(Object.keys(outputs)[0] || null);
     })().catch((e) => {
       console.error(e);
@@ -189,6 +194,14 @@ export default function App() {
 
     setSubscripts(nextSubs);
 
+    if (cube) {
+      // cube байгаа бол browser дээр slice/sum хийнэ
+      setSeries(sliceCube(cube, nextSubs));
+      setAiText("");
+      resetMessages();
+      return;
+    }
+
     try {
       setRunning(true);
       const outputsMap = config?.available_subscripts?.outputs || {};
@@ -211,6 +224,13 @@ export default function App() {
   }
 
   async function runSimulation() {
+    // өмнөх дуусаагүй симуляцийг цуцална, зөвхөн сүүлийнх нь харагдана
+    simAbortRef.current?.abort();
+    const controller = new AbortController();
+    simAbortRef.current = controller;
+    const seq = ++simSeqRef.current;
+
+    setCube(null);
     setRunning(true);
     setAiText("");
     resetMessages();
@@ -228,20 +248,38 @@ export default function App() {
         params: changedParams,
         subscripts: Object.fromEntries(
           Object.keys(outputsMap).map((k) => [k, subscripts])
-        )
+        ),
+        session_id: sessionId,
+        seq
       };
+      const signal = controller.signal;
 
       // If no params changed, just return baseline (no sim change)
-      const sData = Object.keys(changedParams).length === 0
-        ? await apiReset(payload)
-        : await apiSimulate(payload);
+      if (Object.keys(changedParams).length === 0) {
+        const cData = await apiReset({ ...payload, layout: "cube" }, { signal, binary: true });
+        setCube(cData);
+        setSeries(sliceCube(cData, subscripts));
+        return;
+      }
 
+      // baseline шууд зурагдаж, simulation-ийн шугам алхам бүрээр уртсана
+      const sData = await apiSimulateStream(payload, {
+        onBaseline: setSeries,
+        onStep: setSeries,
+        signal
+      });
       setSeries(sData);
+      // дараагийн subscript сонголтуудад зориулж бүтэн cube (binary)
+      setCube(await apiSimulate({ ...payload, layout: "cube" }, { signal, binary: true }));
     } catch (e) {
+      if (isAbortError(e)) return;
       console.error(e);
       alert("Симуляци хийхэд алдаа гарлаа.");
     } finally {
-      setRunning(false);
+      if (simAbortRef.current === controller) {
+        simAbortRef.current = null;
+        setRunning(false);
+      }
     }
   }
 
@@ -289,14 +327,9 @@ export default function App() {
       setParams(initParams);
       setBaseParams(initParams);
 
-      const outputsMap = config?.available_subscripts?.outputs || {};
-      const sData = await apiReset({
-        params: initParams,
-        subscripts: Object.fromEntries(
-          Object.keys(outputsMap).map((k) => [k, subscripts])
-        )
-      });
-      setSeries(sData);
+      const cData = await apiBaseline({ layout: "cube" });
+      setCube(cData);
+      setSeries(sliceCube(cData, subscripts));
     } catch (e) {
       console.error(e);
       alert("Reset хийхэд алдаа гарлаа.");
@@ -31,23 +31,174 @@ export async function apiGetConfig() {
   return normalizeText(data);
 }
 
-export async function apiSimulate(payload) {
-  const res = await fetch(`${API_BASE}/api/simulate`, {
+// Шинэ хүсэлтээр орлогдсон (409 / "superseded" event) эсвэл AbortController-оор
+// цуцлагдсан хүсэлт: алдаа биш, зүгээр л орхино
+function supersededError() {
+  const err = new Error("Superseded");
+  err.name = "AbortError";
+  return err;
+}
+
+export function isAbortError(e) {
+  return e?.name === "AbortError";
+}
+
+// Binary хариу (Accept: application/octet-stream): "SDW1", uint32 header урт,
+// JSON header (8 байт хүртэл дүүргэсэн), дараа нь 8 байтад зэрэгцүүлсэн float buffer-ууд.
+// Series бүр ArrayBuffer дээрх Float64Array/Float32Array view болж ирнэ (хуулахгүй).
+export function decodeColumns(buffer) {
+  const bytes = new Uint8Array(buffer);
+  if (String.fromCharCode(...bytes.subarray(0, 4)) !== "SDW1") {
+    throw new Error("Binary хариуны формат буруу байна");
+  }
+  const headerLen = new DataView(buffer).getUint32(4, true);
+  const header = JSON.parse(new TextDecoder("utf-8").decode(bytes.subarray(8, 8 + headerLen)));
+  const base = 8 + Math.ceil(headerLen / 8) * 8;
+  const Typed = header.dtype === "float32" ? Float32Array : Float64Array;
+
+  const revive = (node) => {
+    if (Array.isArray(node)) return node.map(revive);
+    if (!node || typeof node !== "object") return node;
+    if (node.$buf) {
+      const [offset, length] = node.$buf;
+      const arr = new Typed(buffer, base + offset, length);
+      if (!node.shape || node.shape.length < 2) return arr;
+      // [rows, cols] -> мөр бүр subarray view; [time, сум, төрөл] cube бол nested
+      const nest = (view, shape) => {
+        if (shape.length < 2) return view;
+        const step = view.length / shape[0];
+        return Array.from({ length: shape[0] }, (_, i) => nest(view.subarray(i * step, (i + 1) * step), shape.slice(1)));
+      };
+      return nest(arr, node.shape);
+    }
+    return Object.fromEntries(Object.entries(node).map(([k, v]) => [k, revive(v)]));
+  };
+  return { ...header.meta, ...revive(header.data) };
+}
+
+// layout: "cube" хариу -> сонгосон subscript-ийн series (SeriesPayload хэлбэр), сүлжээгүй.
+// Сонгоогүй (эсвэл олдоогүй) тэнхлэг дээр нийлбэр авна; dims хоосон (нийт дүн) бол хэвээр.
+export function sliceCube(cube, subscripts = {}) {
+  const baseline = {};
+  const simulation = {};
+  const applied = {};
+  for (const [key, dims] of Object.entries(cube.dims || {})) {
+    const picks = dims.map((d) => d.values.indexOf(subscripts[d.name]));
+    applied[key] = Object.fromEntries(
+      dims.filter((_, i) => picks[i] >= 0).map((d) => [d.name, subscripts[d.name]])
+    );
+    const reduce = (node, axis) => {
+      if (axis === picks.length) return node;
+      if (picks[axis] >= 0) return reduce(node[picks[axis]], axis + 1);
+      let sum = 0;
+      for (const child of node) sum += reduce(child, axis + 1);
+      return sum;
+    };
+    const series = (rows) => Array.from(rows || [], (row) => reduce(row, 0));
+    baseline[key] = series(cube.baseline?.[key]);
+    simulation[key] = series(cube.simulation?.[key]);
+  }
+  return { time: Array.from(cube.time || []), baseline, simulation, applied_subscripts: applied };
+}
+
+async function readPayload(res, binary) {
+  return binary ? decodeColumns(await res.arrayBuffer()) : await res.json();
+}
+
+function acceptHeader(binary) {
+  if (!binary) return {};
+  return { Accept: binary === "float32" ? "application/octet-stream; dtype=float32" : "application/octet-stream" };
+}
+
+// mode: "approx" = emulator-оос хурдан ойролцоо хариу (approx, error талбартай)
+// signal: AbortController.signal - хуучин хүсэлтийг цуцлах
+// binary: true | "float32" - JSON биш typed array-тай хариу (decodeColumns)
+export async function apiSimulate(payload, { mode, signal, binary } = {}) {
+  const query = mode ? `?mode=${encodeURIComponent(mode)}` : "";
+  const res = await fetch(`${API_BASE}/api/simulate${query}`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload)
+    headers: { "Content-Type": "application/json", ...acceptHeader(binary) },
+    body: JSON.stringify(payload),
+    signal
   });
+  if (res.status === 409) throw supersededError();
   if (!res.ok) throw new Error("Симуляци хийхэд алдаа гарлаа");
-  return await res.json();
+  return await readPayload(res, binary);
 }
 
-export async function apiReset(payload) {
+// NDJSON stream: эхлээд baseline, дараа нь simulation-ийн алхмууд ирэнгүүт
+// onBaseline(series) / onStep(series) дуудна. Resolves with the full series.
+export async function apiSimulateStream(payload, { onBaseline, onStep, signal } = {}) {
+  const res = await fetch(`${API_BASE}/api/simulate_stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "application/x-ndjson" },
+    body: JSON.stringify(payload),
+    signal
+  });
+  if (res.status === 409) throw supersededError();
+  if (!res.ok) throw new Error("Симуляци хийхэд алдаа гарлаа");
+
+  let series = null;
+  const handle = (line) => {
+    if (!line.trim()) return;
+    const ev = JSON.parse(line);
+    if (ev.type === "baseline") {
+      const simulation = {};
+      for (const k of Object.keys(ev.baseline)) simulation[k] = [];
+      series = { time: ev.time, baseline: ev.baseline, simulation, applied_subscripts: ev.applied_subscripts };
+      onBaseline?.(series);
+    } else if (ev.type === "step" && series) {
+      const simulation = {};
+      for (const [k, prev] of Object.entries(series.simulation)) {
+        simulation[k] = prev.concat(ev.simulation[k] || []);
+      }
+      series = { ...series, simulation };
+      onStep?.(series);
+    } else if (ev.type === "superseded") {
+      throw supersededError();
+    } else if (ev.type === "error") {
+      throw new Error(ev.detail || "Симуляци хийхэд алдаа гарлаа");
+    }
+  };
+
+  if (!res.body?.getReader) {
+    (await res.text()).split("\n").forEach(handle);
+    return series;
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder("utf-8");
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buf += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buf.split("\n");
+    buf = lines.pop();
+    lines.forEach(handle);
+    if (done) break;
+  }
+  handle(buf);
+  return series;
+}
+
+export async function apiReset(payload, { signal, binary } = {}) {
   const res = await fetch(`${API_BASE}/api/reset`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload)
+    headers: { "Content-Type": "application/json", ...acceptHeader(binary) },
+    body: JSON.stringify(payload),
+    signal
   });
   if (!res.ok) throw new Error("Reset хийхэд алдаа гарлаа");
+  return await readPayload(res, binary);
+}
+
+// GET хувилбар: хариу нь ETag-тай тул хөтөч өөрчлөгдөөгүй baseline-ийг 304-өөр дахин ашиглана
+// layout: "cube" бол subscripts-гүй бүтэн cube (sliceCube-аар хэрэглэнэ)
+export async function apiBaseline({ subscripts = {}, outputs, layout } = {}) {
+  const query = new URLSearchParams({ subscripts: JSON.stringify(subscripts) });
+  for (const o of outputs || []) query.append("outputs", o);
+  if (layout) query.set("layout", layout);
+  const res = await fetch(`${API_BASE}/api/baseline?${query}`);
+  if (!res.ok) throw new Error("Reset хийхэд алдаа гарлаа");
   return await res.json();
 }
 